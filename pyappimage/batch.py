@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os
+import shutil
+import sys
+import time
+import traceback
+
+from functools import partial
+from multiprocessing import Pool
+
+import yaml
+
+from .project import (
+    find_assets,
+    find_config,
+    get_directories,
+    has_project_spec,
+    is_ignored_directory,
+)
+from .utils import human_size
+
+LOG_FILE = "pyappimage-build.log"
+
+
+def discover_projects(root="."):
+    """
+    Returns the directories below root which contain a pyappimage.yml
+    and a setup.py or pyproject.toml. Projects are not searched for
+    nested projects.
+    :param root:
+    :return:
+    """
+    projects = []
+    for directory, dirs, _ in os.walk(os.path.realpath(root)):
+        if find_config(directory)[1] is not None and \
+                has_project_spec(directory):
+            projects.append(directory)
+            dirs[:] = []
+            continue
+        dirs[:] = sorted(
+            d for d in dirs
+            if not is_ignored_directory(d, os.path.join(directory, d))
+        )
+    return projects
+
+
+def load_manifest(manifest):
+    """
+    Reads a YAML manifest listing project directories, relative to the
+    manifest. The manifest is either a list, or a mapping with a
+    projects list.
+    :param manifest:
+    :return:
+    """
+    with open(manifest, 'r') as r:
+        data = yaml.safe_load(r) or []
+    if isinstance(data, dict):
+        data = data.get("projects", [])
+    root = os.path.dirname(os.path.realpath(manifest))
+    return [os.path.realpath(os.path.join(root, i)) for i in data]
+
+
+def build_project(project_directory, has_fuse=True, use_cache=True,
+                  incremental=False, trace=None):
+    """
+    Builds the project in project_directory. This is run in a worker
+    process, which changes to the project directory, and sends all of
+    the output of the build to a log file in its build directory, so
+    that the log does not change the cache key of the project. Returns
+    a dict describing the result of the build
+    :param project_directory:
+    :param has_fuse:
+    :param use_cache:
+    :param incremental:
+    :param trace: name of the build trace, written in the project
+    :return:
+    """
+    # PyInstaller is only imported by the workers
+    from .build.build import build
+
+    started_at = time.time()
+    result = {
+        "project": project_directory,
+        "name": None,
+        "status": "failed",
+        "seconds": 0,
+        "appimage": None,
+        "size": None,
+        "log": None,
+        "error": None,
+    }
+    cwd = os.getcwd()
+    os.chdir(project_directory)
+    try:
+        path, config = find_config()
+        if config is None:
+            raise FileNotFoundError("Could not find a valid pyappimage.yml")
+        if not has_project_spec():
+            raise FileNotFoundError(
+                "Could not find setup.py or pyproject.toml")
+        name = result["name"] = config.get("name")
+        directories = get_directories(name)
+        if not incremental:
+            for i in directories:
+                shutil.rmtree(i, ignore_errors=True)
+        os.makedirs(directories[0], exist_ok=True)
+    except Exception as e:
+        os.chdir(cwd)
+        result["error"] = str(e) or e.__class__.__name__
+        result["seconds"] = time.time() - started_at
+        return result
+
+    result["log"] = os.path.join(directories[0], LOG_FILE)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    stdout, stderr = os.dup(1), os.dup(2)
+    with open(result["log"], 'w') as log:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            icon, appdata, desktop_file = find_assets(path, name)
+            appimage = build(
+                config, icon, appdata=appdata, desktop_file=desktop_file,
+                has_fuse=has_fuse, use_cache=use_cache,
+                incremental=incremental, quiet=True,
+                trace=trace and os.path.join(project_directory, trace))
+            result["appimage"] = appimage
+            result["size"] = os.path.getsize(appimage)
+            result["status"] = "ok"
+        except (Exception, SystemExit) as e:
+            traceback.print_exc()
+            result["error"] = str(e) or e.__class__.__name__
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(stdout, 1)
+            os.dup2(stderr, 2)
+            os.close(stdout)
+            os.close(stderr)
+            os.chdir(cwd)
+    result["seconds"] = time.time() - started_at
+    return result
+
+
+def build_many(projects, jobs=None, has_fuse=True, use_cache=True,
+               incremental=False, trace=None, callback=None):
+    """
+    Builds projects on a pool of at most jobs worker processes. Every
+    build gets a fresh worker, forked from this process, so that the
+    state PyInstaller keeps and the changes a build makes to os.environ
+    do not leak into the next build. The prefix cache and the wheelhouse
+    are shared by all the builds. callback is called with the result of
+    each build as it finishes. Returns the results in the order of
+    projects.
+    :param projects: list of project directories
+    :param jobs:
+    :param has_fuse:
+    :param use_cache:
+    :param incremental:
+    :param trace:
+    :param callback:
+    :return:
+    """
+    jobs = jobs or max(1, (os.cpu_count() or 1) // 2)
+    results = {}
+    _build = partial(build_project, has_fuse=has_fuse, use_cache=use_cache,
+                     incremental=incremental, trace=trace)
+    with Pool(min(jobs, len(projects)), maxtasksperchild=1) as pool:
+        for result in pool.imap_unordered(_build, projects):
+            results[result["project"]] = result
+            if callback is not None:
+                callback(result)
+    return [results[i] for i in projects]
+
+
+def format_results(results):
+    """
+    Returns the lines of a table summarizing the results of build_many
+    :param results:
+    :return:
+    """
+    lines = ["{:<24} {:<7} {:>9} {:>11}  {}".format(
+        "app", "status", "time", "size", "output")]
+    for i in results:
+        lines.append("{:<24} {:<7} {:>8.1f}s {:>11}  {}".format(
+            i["name"] or os.path.basename(i["project"]),
+            i["status"],
+            i["seconds"],
+            human_size(i["size"]) if i["size"] is not None else "-",
+            i["appimage"] or (
+                "{} (see {})".format(i["error"], i["log"]) if i["log"]
+                else i["error"])
+        ))
+    return lines
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import math
+import os
+import platform
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+from .version import __version__
+
+
+def get_command(target):
+    """
+    Returns the command which launches target, which can either be an
+    AppDir or an AppImage
+    :param target:
+    :return:
+    """
+    target = os.path.realpath(target)
+    if os.path.isdir(target):
+        apprun = os.path.join(target, "AppRun")
+        if not os.path.exists(apprun):
+            raise FileNotFoundError(
+                "{} is not an AppDir, it has no AppRun".format(target))
+        return [apprun]
+    if not os.access(target, os.X_OK):
+        raise PermissionError("{} is not executable".format(target))
+    return [target]
+
+
+def evict_page_cache(target):
+    """
+    Asks the kernel to drop the cached pages of every file in target, so
+    that the next launch reads them from disk again. This does not need
+    root, but the kernel is free to ignore it for pages in use.
+    :param target:
+    :return:
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    if os.path.isdir(target):
+        paths = (os.path.join(root, f)
+                 for root, _, files in os.walk(target) for f in files)
+    else:
+        paths = (target,)
+    for path in paths:
+        if os.path.islink(path):
+            continue
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def launch(command, env=None):
+    """
+    Launches command once, and waits for it to exit. Returns the wall
+    time in seconds, the peak resident set size in KiB of the process
+    and its children, and the exit code
+    :param command:
+    :param env:
+    :return:
+    """
+    started_at = time.perf_counter()
+    proc = subprocess.Popen(
+        command, env=env, stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - started_at
+    proc.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) \
+        else -os.WTERMSIG(status)
+    return wall, rusage.ru_maxrss, proc.returncode
+
+
+# lines of LD_DEBUG=statistics, and the key each one is counted in. The
+# loader reports them when an executable starts
+LOADER_STATISTICS = (
+    ("executables", re.compile(
+        r"total startup time in dynamic loader:\s+(\d+)")),
+    ("startup_cycles", re.compile(
+        r"total startup time in dynamic loader:\s+(\d+)")),
+    ("relocation_cycles", re.compile(
+        r"time needed for relocation:\s+(\d+)")),
+    ("load_cycles", re.compile(r"time needed to load objects:\s+(\d+)")),
+    ("relocations", re.compile(
+        r"(?<!final )number of relocations:\s+(\d+)")),
+    ("relative_relocations", re.compile(
+        r"number of relative relocations:\s+(\d+)")),
+)
+
+
+def parse_loader_statistics(text):
+    """
+    Returns the totals of the LD_DEBUG=statistics reports in text, one
+    for every executable started, including the ones a process replaced
+    itself with
+    :param text:
+    :return:
+    """
+    totals = {key: 0 for key, _ in LOADER_STATISTICS}
+    for line in text.splitlines():
+        for key, pattern in LOADER_STATISTICS:
+            match = pattern.search(line)
+            if match:
+                totals[key] += 1 if key == "executables" else \
+                    int(match.group(1))
+    return totals
+
+
+def loader_statistics(command, env=None):
+    """
+    Launches command once with LD_DEBUG=statistics, and returns the work
+    of the dynamic loader summed over every executable the launch ran,
+    e.g. the shell of the AppRun and the application
+    :param command:
+    :param env:
+    :return:
+    """
+    directory = tempfile.mkdtemp(prefix="pyappimage-loader-")
+    try:
+        env = dict(os.environ if env is None else env)
+        env["LD_DEBUG"] = "statistics"
+        env["LD_DEBUG_OUTPUT"] = os.path.join(directory, "ld")
+        launch(command, env=env)
+        # the loader appends to a file per process, suffixed by its pid
+        text = ""
+        for f in os.listdir(directory):
+            with open(os.path.join(directory, f), errors="replace") as r:
+                text += r.read()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return parse_loader_statistics(text)
+
+
+def percentile(values, pct):
+    """
+    Returns the pct percentile of values, using the nearest rank method
+    :param values:
+    :param pct:
+    :return:
+    """
+    values = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def summarize(samples):
+    walls = [i["wall"] for i in samples]
+    return {
+        "runs": len(samples),
+        "p50": percentile(walls, 50),
+        "p95": percentile(walls, 95),
+        "max": max(walls),
+        "peak_rss_kib": max(i["rss_kib"] for i in samples),
+        "failures": sum(1 for i in samples if i["returncode"] != 0),
+    }
+
+
+def benchmark(target, argv=("--pyappimage-runtime",), runs=10,
+              cold_runs=3, env=None, loader=False):
+    """
+    Launches target cold_runs times with the page cache evicted before
+    each launch, and then runs times with a warm page cache.
+    :param target: path to an AppDir or an AppImage
+    :param argv: arguments passed to the application
+    :param runs: number of warm launches
+    :param cold_runs: number of cold launches
+    :param env: environment of the launched application
+    :param loader: also report the median LD_DEBUG=statistics of runs
+        launches, see loader_statistics()
+    :return: a json serializable dict of the results
+    """
+    command = get_command(target) + list(argv)
+    result = {
+        "target": os.path.realpath(target),
+        "argv": list(argv),
+        "pyappimage": __version__,
+        "host": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.time(),
+    }
+    for phase, count in (("cold", cold_runs), ("warm", runs)):
+        samples = []
+        if phase == "warm" and count:
+            # populate the page cache, in case there were no cold runs
+            launch(command, env=env)
+        for _ in range(count):
+            if phase == "cold":
+                evict_page_cache(target)
+            wall, rss, returncode = launch(command, env=env)
+            samples.append(
+                {"wall": wall, "rss_kib": rss, "returncode": returncode})
+        if samples:
+            result[phase] = summarize(samples)
+            result[phase]["samples"] = samples
+    if loader:
+        samples = [loader_statistics(command, env=env)
+                   for _ in range(max(1, runs))]
+        result["loader"] = {
+            key: percentile([i[key] for i in samples], 50)
+            for key in samples[0]
+        }
+    return result
+
+
+def compare(result, baseline):
+    """
+    Returns the (metric, baseline, result) of the metrics of two results
+    of benchmark(), e.g. of an AppImage before and after a change
+    :param result:
+    :param baseline:
+    :return:
+    """
+    rows = []
+    for phase in ("cold", "warm"):
+        if phase in result and phase in baseline:
+            for key in ("p50", "p95"):
+                rows.append(("{} {} ms".format(phase, key),
+                             baseline[phase][key] * 1000,
+                             result[phase][key] * 1000))
+    if "loader" in result and "loader" in baseline:
+        for key in sorted(result["loader"]):
+            if key in baseline["loader"]:
+                rows.append(("loader " + key, baseline["loader"][key],
+                             result["loader"][key]))
+    return rows
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import ast
+import html
+import os
+import re
+
+from collections import deque
+
+from ..utils import human_size
+
+# an entry of a PyInstaller TOC file: (name, path, typecode)
+TOC_ENTRY = re.compile(
+    r"\(\s*('(?:[^'\\]|\\.)*'),\s*('(?:[^'\\]|\\.)*'|None),\s*'([A-Z_]+)'\s*\)")
+
+XREF_NODE = re.compile(r'<a name="([^"]+)"></a>')
+XREF_TYPE = re.compile(r'<span class="moduletype">([^<]*)</span>')
+XREF_LINK = re.compile(r'<a href="#([^"]+)" class="import">')
+IMPORTTIME_LINE = re.compile(
+    r"import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+# a file of the bundle named after the extension module it holds
+EXTENSION_FILE = re.compile(r"^([A-Za-z_]\w*)\..*\.so(\.\d+)*$")
+
+# groups of files which do not belong to a python package
+SHARED_LIBRARIES = "(shared libraries)"
+PYTHON_RUNTIME = "(python runtime)"
+
+# packages which are rarely needed at runtime, unless the app imports
+# them itself. Each rule is (reason, regular expression on module names)
+OPTIONAL_MODULES = (
+    ("test suite", re.compile(r"^(?:\w+\.)+(?:tests?|testing\.tests)$")),
+    ("GUI toolkit", re.compile(
+        r"^(?:tkinter|_tkinter|PyQt5|PyQt6|PySide2|PySide6|wx|gi)$")),
+    ("plotting backend", re.compile(
+        r"^matplotlib\.backends\.backend_(?!agg$|template$)\w+$")),
+    ("interactive shell", re.compile(r"^(?:IPython|jedi|parso|pydoc_data)$")),
+)
+
+
+def get_analysis_directory(workpath, name):
+    """
+    Returns the directory where PyInstaller wrote the analysis of the
+    app called name
+    :param workpath: the PyInstaller workpath of the build
+    :param name:
+    :return:
+    """
+    return os.path.join(workpath, name)
+
+
+def load_toc(path):
+    """
+    Reads the (name, path, typecode) entries of a TOC file written by
+    PyInstaller. The files are python literals, but not every version
+    writes them in a form ast.literal_eval accepts, so the entries are
+    matched one by one
+    :param path:
+    :return:
+    """
+    with open(path, 'r') as r:
+        data = r.read()
+    return [
+        (ast.literal_eval(name),
+         None if source == 'None' else ast.literal_eval(source),
+         typecode)
+        for name, source, typecode in TOC_ENTRY.findall(data)
+    ]
+
+
+def load_import_graph(xref):
+    """
+    Reads the module graph from the xref html file of PyInstaller.
+    Returns a dict mapping every module to the modules it imports, and
+    the names of the script nodes
+    :param xref:
+    :return:
+    """
+    with open(xref, 'r') as r:
+        data = r.read()
+    graph = {}
+    scripts = []
+    for node in data.split('<div class="node">')[1:]:
+        match = XREF_NODE.search(node)
+        if match is None:
+            continue
+        module = html.unescape(match.group(1))
+        imports = node.split("imports:", 1)[1].split("</div>", 1)[0] \
+            if "imports:" in node else ""
+        graph[module] = [html.unescape(i) for i in XREF_LINK.findall(imports)]
+        module_type = XREF_TYPE.search(node)
+        if module_type is not None and module_type.group(1) == "Script":
+            scripts.append(module)
+    return graph, scripts
+
+
+def find_import_edges(graph, roots):
+    """
+    Walks the module graph breadth first from roots, and returns the
+    import which first reached each module as a dict mapping the module
+    to the module importing it
+    :param graph:
+    :param roots:
+    :return:
+    """
+    parents = {i: None for i in roots}
+    queue = deque(roots)
+    while queue:
+        module = queue.popleft()
+        for i in graph.get(module, ()):
+            if i not in parents:
+                parents[i] = module
+                queue.append(i)
+    return parents
+
+
+def get_top_level(module):
+    return module.split('.')[0]
+
+
+def get_contents_directory(paths):
+    """
+    Returns the directory of the bundle PyInstaller collected the files
+    of the app to, relative to the bundle. It is _internal since
+    PyInstaller 6, unless set with --contents-directory, and the bundle
+    itself before. It is the one holding base_library.zip
+    :param paths: relative paths of the files of the bundle
+    :return:
+    """
+    for path in paths:
+        if os.path.basename(path) == "base_library.zip":
+            return os.path.dirname(path)
+    return ""
+
+
+def find_contents_directory(bundle):
+    """
+    Returns the contents directory of the bundle on disk, see
+    get_contents_directory()
+    :param bundle:
+    :return:
+    """
+    candidates = [""] + sorted(
+        i for i in os.listdir(bundle)
+        if os.path.isdir(os.path.join(bundle, i)))
+    return get_contents_directory(
+        os.path.join(i, "base_library.zip") for i in candidates
+        if os.path.exists(os.path.join(bundle, i, "base_library.zip")))
+
+
+def get_file_owner(rel_path, contents_directory=""):
+    """
+    Returns the package a file of the bundle belongs to, from its path
+    relative to the bundle
+    :param rel_path:
+    :param contents_directory: see get_contents_directory()
+    :return:
+    """
+    if contents_directory:
+        if not rel_path.startswith(contents_directory + os.sep):
+            # the executable, next to the contents directory
+            return PYTHON_RUNTIME
+        rel_path = rel_path[len(contents_directory) + 1:]
+    parts = rel_path.split(os.sep)
+    if len(parts) > 1:
+        return parts[0]
+    match = EXTENSION_FILE.match(parts[0])
+    if match is not None and not parts[0].startswith("lib"):
+        return match.group(1)
+    if ".so" in parts[0]:
+        return SHARED_LIBRARIES
+    return PYTHON_RUNTIME
+
+
+class PackageReport:
+    def __init__(self, name):
+        self.name = name
+        self.bytes = 0
+        self.files = 0
+        self.modules = 0
+        self.imported_by = None
+
+
+def attribute_sizes(bundle, analysis_directory):
+    """
+    Attributes the bytes of the bundle to the top-level packages they
+    belong to. Files collected to the bundle are attributed by their
+    path, and the modules archived in the executable by the size of
+    their source, which overestimates the compressed archive. Returns
+    a dict of PackageReport, and the import graph
+    :param bundle: the directory PyInstaller collected the app to
+    :param analysis_directory:
+    :return:
+    """
+    packages = {}
+    contents_directory = find_contents_directory(bundle)
+
+    def _get(name):
+        if name not in packages:
+            packages[name] = PackageReport(name)
+        return packages[name]
+
+    for root, _, files in os.walk(bundle):
+        for f in files:
+            path = os.path.join(root, f)
+            if os.path.islink(path):
+                continue
+            report = _get(get_file_owner(
+                os.path.relpath(path, bundle), contents_directory))
+            report.files += 1
+            report.bytes += os.path.getsize(path)
+
+    pyz = os.path.join(analysis_directory, "PYZ-00.toc")
+    modules = load_toc(pyz) if os.path.exists(pyz) else []
+    for module, source, typecode in modules:
+        report = _get(get_top_level(module))
+        report.modules += 1
+        if source and os.path.isfile(source):
+            report.bytes += os.path.getsize(source)
+
+    graph, scripts = {}, []
+    for i in os.listdir(analysis_directory):
+        if i.startswith("xref-") and i.endswith(".html"):
+            graph, scripts = load_import_graph(
+                os.path.join(analysis_directory, i))
+            break
+    parents = find_import_edges(graph, scripts)
+    # the first module of a package reached from the script tells which
+    # import pulled the package in
+    for module, parent in parents.items():
+        if parent is None:
+            continue
+        top_level = get_top_level(module)
+        if top_level in packages and \
+                packages[top_level].imported_by is None and \
+                get_top_level(parent) != top_level:
+            packages[top_level].imported_by = (parent, module)
+    return packages, graph
+
+
+def load_import_times(path):
+    """
+    Reads the self import time of every module, in seconds, from the
+    output of python -X importtime or --pyappimage-profile
+    :param path:
+    :return:
+    """
+    times = {}
+    with open(path, 'r') as r:
+        for line in r:
+            match = IMPORTTIME_LINE.search(line)
+            if match is not None:
+                times[match.group(4)] = int(match.group(1)) / 1e6
+    return times
+
+
+class Exclusion:
+    def __init__(self, module, reason):
+        self.module = module
+        self.reason = reason
+        self.bytes = 0
+        self.seconds = 0.0
+
+
+def propose_exclusions(bundle, analysis_directory, graph, own_packages=(),
+                       import_times=None):
+    """
+    Proposes modules to pass to --exclude-module, from OPTIONAL_MODULES.
+    Packages imported directly by own_packages, the packages of the app,
+    are never proposed. Each exclusion carries the bytes it would save,
+    and the startup time it would save, from import_times
+    :param bundle:
+    :param analysis_directory:
+    :param graph:
+    :param own_packages: top-level packages of the app
+    :param import_times: as returned by load_import_times
+    :return:
+    """
+    imported_by_app = set()
+    for module, imports in graph.items():
+        if get_top_level(module) in own_packages:
+            imported_by_app.update(imports)
+
+    exclusions = []
+    for module in sorted(graph):
+        if module in imported_by_app:
+            continue
+        for reason, pattern in OPTIONAL_MODULES:
+            if pattern.match(module):
+                exclusions.append(Exclusion(module, reason))
+                break
+    # a module excluded with its package is not listed again
+    exclusions = [
+        i for i in exclusions
+        if not any(i.module.startswith(j.module + ".") for j in exclusions)
+    ]
+    if not exclusions:
+        return exclusions
+
+    def _find(module):
+        for i in exclusions:
+            if module == i.module or module.startswith(i.module + "."):
+                return i
+        return None
+
+    pyz = os.path.join(analysis_directory, "PYZ-00.toc")
+    for module, source, _ in load_toc(pyz) if os.path.exists(pyz) else []:
+        exclusion = _find(module)
+        if exclusion is not None and source and os.path.isfile(source):
+            exclusion.bytes += os.path.getsize(source)
+    contents = os.path.join(bundle, find_contents_directory(bundle))
+    for root, _, files in os.walk(contents):
+        rel_root = os.path.relpath(root, contents)
+        if rel_root == ".":
+            continue
+        exclusion = _find(rel_root.replace(os.sep, "."))
+        if exclusion is None:
+            continue
+        for f in files:
+            path = os.path.join(root, f)
+            if not os.path.islink(path):
+                exclusion.bytes += os.path.getsize(path)
+    for module, seconds in (import_times or {}).items():
+        exclusion = _find(module)
+        if exclusion is not None:
+            exclusion.seconds += seconds
+    return exclusions
+
+
+def format_report(packages, exclusions, top=20):
+    """
+    Returns the lines of the size attribution report
+    :param packages: as returned by attribute_sizes
+    :param exclusions: as returned by propose_exclusions
+    :param top: number of packages listed
+    :return:
+    """
+    total = sum(i.bytes for i in packages.values()) or 1
+    lines = ["{:<28} {:>11} {:>6} {:>8}  {}".format(
+        "package", "size", "share", "modules", "pulled in by")]
+    for i in sorted(packages.values(), key=lambda x: -x.bytes)[:top]:
+        lines.append("{:<28} {:>11} {:>5.1f}% {:>8}  {}".format(
+            i.name, human_size(i.bytes), i.bytes * 100 / total, i.modules,
+            "{} -> {}".format(*i.imported_by) if i.imported_by else "-"))
+    if exclusions:
+        lines.append("")
+        lines.append("Proposed exclusions:")
+        for i in exclusions:
+            lines.append("  {:<40} {:>11} {:>9}  {}".format(
+                i.module, human_size(i.bytes),
+                "{:.1f}ms".format(i.seconds * 1000) if i.seconds else "-",
+                i.reason))
+        lines.append("Saves {} and {:.1f}ms of imports at startup".format(
+            human_size(sum(i.bytes for i in exclusions)),
+            sum(i.seconds for i in exclusions) * 1000))
+    return lines
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import urllib.request
+
+from .cache import get_cache_directory
+from ..constants import LAUNCHER
+from .zsync import embed_update_information, make_zsync
+from ..utils import hash_file, parse_size
+
+CODECS = ("gzip", "xz", "zstd", "lz4", "lzo")
+
+RUNTIME_URL = "https://github.com/AppImage/type2-runtime/releases/download/" \
+              "{release}/runtime-{arch}"
+
+# the pinned (release, sha256) of the runtime for each architecture. The
+# runtime is embedded in every AppImage, so it is only used once its
+# checksum matches. Releases are never taken from the moving continuous
+# tag, which would make builds depend on when the cache was filled
+RUNTIMES = {}
+
+
+def get_runtime_pin(arch):
+    """
+    Returns the (release, sha256) of the runtime for arch, from RUNTIMES,
+    or from the PYAPPIMAGE_RUNTIME_RELEASE and PYAPPIMAGE_RUNTIME_SHA256
+    environment variables, which pin another release
+    :param arch:
+    :return:
+    """
+    release, sha256 = RUNTIMES.get(arch, (None, None))
+    release = os.getenv("PYAPPIMAGE_RUNTIME_RELEASE") or release
+    sha256 = os.getenv("PYAPPIMAGE_RUNTIME_SHA256") or sha256
+    if not release or not sha256:
+        raise RuntimeError(
+            "No AppImage runtime is pinned for {arch}. Set "
+            "PYAPPIMAGE_RUNTIME_RELEASE and PYAPPIMAGE_RUNTIME_SHA256 to a "
+            "release of https://github.com/AppImage/type2-runtime and the "
+            "sha256 of its runtime-{arch}, or PYAPPIMAGE_RUNTIME to a "
+            "local runtime".format(arch=arch))
+    return release, sha256.lower()
+
+
+def get_runtime(arch=None):
+    """
+    Returns the path to the AppImage type 2 runtime for arch. The
+    PYAPPIMAGE_RUNTIME environment variable can point to a local runtime,
+    otherwise the pinned release is downloaded once, verified against its
+    sha256 and kept in the pyappimage cache
+    :param arch:
+    :return:
+    """
+    if os.getenv("PYAPPIMAGE_RUNTIME"):
+        return os.path.realpath(os.getenv("PYAPPIMAGE_RUNTIME"))
+    arch = arch or platform.machine()
+    release, sha256 = get_runtime_pin(arch)
+    runtime_directory = os.path.join(get_cache_directory(), "runtime")
+    # named after the checksum, so that a new pin is downloaded again
+    runtime = os.path.join(
+        runtime_directory, "runtime-{}-{}".format(arch, sha256[:16]))
+    if os.path.exists(runtime) and hash_file(runtime, "sha256") == sha256:
+        return runtime
+    os.makedirs(runtime_directory, exist_ok=True)
+    with urllib.request.urlopen(
+            RUNTIME_URL.format(release=release, arch=arch)) as r, \
+            open(runtime + ".part", 'wb') as w:
+        shutil.copyfileobj(r, w)
+    digest = hash_file(runtime + ".part", "sha256")
+    if digest != sha256:
+        os.remove(runtime + ".part")
+        raise RuntimeError(
+            "The runtime-{} of release {} has the sha256 {}, expected "
+            "{}".format(arch, release, digest, sha256))
+    os.replace(runtime + ".part", runtime)
+    return runtime
+
+
+def get_block_size(block_size):
+    """
+    Validates the squashfs block size, which must be a power of two
+    between 4K and 1M
+    :param block_size: a size like 128K or 1M
+    :return:
+    """
+    size = parse_size(block_size)
+    if size < 4096 or size > 1024 ** 2 or size & (size - 1):
+        raise ValueError(
+            "block-size must be a power of two between 4K and 1M, "
+            "got {}".format(block_size))
+    return size
+
+
+def make_squashfs(appdir, output, compression="zstd", block_size="1M",
+                  jobs=None, epoch=None):
+    """
+    Compresses appdir into a squashfs image at output. mksquashfs
+    compresses the blocks in parallel, on jobs processors
+    :param appdir:
+    :param output:
+    :param compression: one of CODECS
+    :param block_size:
+    :param jobs: number of processors used, defaults to the cpu count
+    :param epoch: timestamp recorded for the image and every file,
+        instead of their modification times
+    :return:
+    """
+    if compression not in CODECS:
+        raise ValueError("compression must be one of {}, got {}".format(
+            ", ".join(CODECS), compression))
+    mksquashfs = shutil.which("mksquashfs")
+    if mksquashfs is None:
+        raise FileNotFoundError(
+            "Could not find mksquashfs on PATH. Install squashfs-tools "
+            "and try again")
+    args = [
+        mksquashfs, appdir, output,
+        "-root-owned", "-noappend", "-no-progress", "-quiet",
+        "-comp", compression,
+        "-b", str(get_block_size(block_size)),
+        "-processors", str(jobs or os.cpu_count()),
+    ]
+    if epoch is not None:
+        args.extend(("-mkfs-time", str(epoch), "-all-time", str(epoch)))
+    subprocess.run(args, check=True, stdout=subprocess.DEVNULL)
+
+
+def build_appimage(appdir, output, compression="zstd", block_size="1M",
+                   jobs=None, runtime=None, update_information=None,
+                   epoch=None):
+    """
+    Creates the AppImage at output from appdir, by appending a squashfs
+    image of the AppDir to the AppImage runtime. With update_information,
+    it is embedded in the runtime, and a .zsync file is written next to
+    the AppImage.
+    :param appdir:
+    :param output:
+    :param compression:
+    :param block_size:
+    :param jobs:
+    :param runtime: path to the runtime, see get_runtime()
+    :param update_information: see embed_update_information()
+    :param epoch: timestamp recorded instead of modification times, for
+        reproducible builds
+    :return:
+    """
+    runtime = runtime or get_runtime()
+    output_directory = os.path.dirname(os.path.realpath(output))
+    with tempfile.TemporaryDirectory(dir=output_directory) as tmp:
+        squashfs = os.path.join(tmp, "image.squashfs")
+        make_squashfs(appdir, squashfs, compression=compression,
+                      block_size=block_size, jobs=jobs, epoch=epoch)
+        part = os.path.join(tmp, "image.AppImage")
+        with open(part, 'wb') as w:
+            for i in (runtime, squashfs):
+                with open(i, 'rb') as r:
+                    shutil.copyfileobj(r, w, 1024 * 1024)
+        os.chmod(part, 0o755)
+        if update_information:
+            embed_update_information(part, update_information)
+        os.replace(part, output)
+    if update_information:
+        make_zsync(output, mtime=epoch, jobs=jobs)
+    return output
+
+
+def write_launcher(appimage):
+    """
+    Writes the launcher of appimage next to it, which runs it from a
+    cache of its extracted contents on hosts without FUSE
+    :param appimage:
+    :return: the path to the launcher
+    """
+    launcher = appimage + ".sh"
+    with open(launcher, 'w') as w:
+        w.write(LAUNCHER)
+    os.chmod(launcher, 0o755)
+    return launcher
+
+
+def verify_appimage(appimage, timeout=60, env=None):
+    """
+    Runs the AppImage, and returns True if it printed its runtime
+    information. This mounts the image, so it needs FUSE, unless
+    appimage is its launcher.
+    :param appimage:
+    :param timeout:
+    :param env: environment of the AppImage
+    :return:
+    """
+    try:
+        subprocess.run(
+            [appimage, "--pyappimage-runtime"], check=True, timeout=timeout,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return True
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils import link_or_copy
+
+
+class Assembly:
+    """
+    Collects the files which have to be placed in a directory, and
+    materializes them on a thread pool with link_or_copy. Directories
+    and symlinks are created while the files are being added, so that
+    only the file transfers run concurrently.
+    """
+
+    def __init__(self, jobs=None):
+        self.jobs = jobs or min(32, (os.cpu_count() or 1) * 4)
+        self.files = []
+        self.linked = 0
+        self.copied = 0
+
+    def add_file(self, src, dest):
+        """
+        Schedules src to be placed at dest. Symlinks in src are followed.
+        :param src:
+        :param dest:
+        :return:
+        """
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        self.files.append((os.path.realpath(src), dest))
+
+    def add_tree(self, src, dest):
+        """
+        Schedules the contents of the directory src to be placed in dest,
+        like shutil.copytree with symlinks=True and dirs_exist_ok=True
+        :param src:
+        :param dest:
+        :return:
+        """
+        for root, dirs, files in os.walk(src):
+            target_root = os.path.normpath(
+                os.path.join(dest, os.path.relpath(root, src)))
+            os.makedirs(target_root, exist_ok=True)
+            for i in dirs + files:
+                _src = os.path.join(root, i)
+                _dest = os.path.join(target_root, i)
+                if os.path.islink(_src):
+                    if os.path.lexists(_dest):
+                        os.remove(_dest)
+                    os.symlink(os.readlink(_src), _dest)
+            for i in files:
+                _src = os.path.join(root, i)
+                if not os.path.islink(_src):
+                    self.files.append((_src, os.path.join(target_root, i)))
+
+    def run(self):
+        """
+        Materializes all the scheduled files. Returns a tuple of
+        (linked_bytes, copied_bytes)
+        :return:
+        """
+        def _place(task):
+            src, dest = task
+            size = os.path.getsize(src)
+            return size, link_or_copy(src, dest)
+
+        files, self.files = self.files, []
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            for size, linked in pool.map(_place, files):
+                if linked:
+                    self.linked += size
+                else:
+                    self.copied += size
+        return self.linked, self.copied
@@ -32,17 +32,58 @@ import shlex
 import shutil
 import subprocess
 import sys
-import time
+import tempfile
 
 from pathlib import Path
 from PyInstaller import __main__ as PyInstaller
 from halo import Halo
 
-from ..constants import APPRUN, DESKTOP_FILE, ENTRYPOINT, SEPARATOR
-from ..utils import replace_vars
+from .appimage import (
+    build_appimage,
+    get_runtime,
+    verify_appimage,
+    write_launcher,
+)
+from .assemble import Assembly
+from .bytecode import find_uncompiled, precompile
+from .cache import PrefixCache, hash_project
+from .dedup import deduplicate
+from .fingerprint import (
+    MANIFEST_FILE,
+    compute_fingerprint,
+    load_manifest,
+    save_manifest,
+)
+from .libraries import exclude_libraries, find_unresolved, get_library_path
+from .prune import prune
+from .reproducible import (
+    get_source_date_epoch,
+    keep_source_date_epoch,
+    normalize_modes,
+)
+from .trace import Tracer
+from .wheelhouse import (
+    build_project_wheel,
+    get_wheelhouse_directory,
+    install_offline,
+    populate_wheelhouse,
+    start_log,
+)
+from ..constants import (
+    APPRUN,
+    APPRUN_MINIMAL,
+    DESKTOP_FILE,
+    ENTRYPOINT,
+    PROFILER,
+)
+from ..project import get_appimage_path, get_directories
+from ..utils import get_tree_size, human_size, replace_vars
 from ..version import __version__
 _ = shlex.split
 
+# characters of pip output shown next to the spinner
+PROGRESS_WIDTH = 60
+
 
 def get_executable_path(executable, raise_error=True):
     """
@@ -92,67 +133,148 @@ def get_parameters(config, _vars):
 
     return kwargs
 
-def install_additional_requirements(requirements, build_directory):
+def get_pip():
+    """
+    Returns the pip command which should be used to install packages
+    :return:
+    """
     if os.getenv('APPIMAGE'):
-        pip = os.getenv('PYAPPIMAGE_PIP')
-    else:
-        pip = "{python} -m pip".format(python=get_executable_path('python3'))
+        return os.getenv('PYAPPIMAGE_PIP')
+    # PyInstaller runs in this interpreter, so the packages have to be
+    # installed for it too
+    return "{python} -m pip".format(python=sys.executable)
 
-    _pip_install_proc = subprocess.run(_(
-        "{pip} install --prefix={build} --ignore-installed {req}".format(
-            pip=pip,
-            build=build_directory,
-            req=' '.join(requirements)
-        )
-    ), capture_output=True)
-    log_file = os.path.join(build_directory, 'PIP_REQ.log')
-    with open(log_file, 'w') as fp:
-        fp.write("PyAppImage v{}\n".format(__version__))
-        fp.write(SEPARATOR)
-        fp.write("PIP LOGS: \n")
-        fp.write(_pip_install_proc.stdout.decode())
-        fp.write("\n\n")
-        fp.write(SEPARATOR)
-        if _pip_install_proc.stderr is not None:
-            fp.write(_pip_install_proc.stderr.decode())
-        fp.write("Build exited with {}\n".format(
-            _pip_install_proc.returncode))
-
-    _pip_install_proc.check_returncode()
-
-
-def install_packages(project_spec, build_directory):
-    if os.getenv('APPIMAGE'):
-        pip = os.getenv('PYAPPIMAGE_PIP')
-    else:
-        pip = "{python} -m pip".format(python=get_executable_path('python3'))
-    _pip_install_proc = subprocess.run(_(
-        "{pip} install --prefix={build} {proj_dir}".format(
-            pip=pip,
-            build=build_directory,
-            proj_dir=os.path.dirname(project_spec)
-        )
-    ), capture_output=True)
+
+def install_cached(cache, specs, pip, build_directory, install):
+    """
+    Materializes the prefix for specs from the cache into the build
+    directory. On a cache miss, install is called with a staging prefix
+    which is then committed to the cache.
+    :param cache: a PrefixCache instance
+    :param specs: list of strings identifying the requirement set
+    :param pip: the pip command used for the installation
+    :param build_directory:
+    :param install: callable which installs the packages to a prefix
+    :return:
+    """
+    key = cache.key(specs, pip)
+    prefix = cache.get(key)
+    if prefix is None:
+        staging = cache.staging_directory(key)
+        try:
+            install(staging)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        prefix = cache.put(key, staging, specs)
+    return cache.materialize(prefix, build_directory)
+
+
+def install_packages(project_spec, build_directory, requirements=(),
+                     cache=None, progress=None):
+    """
+    Installs the project and the additional requirements into the build
+    directory in a single pip pass, from the local wheelhouse. If the
+    wheelhouse is missing any of the distributions, they are downloaded
+    and built before retrying. Returns the path to site-packages
+    :param project_spec: path to the setup.py or pyproject.toml
+    :param build_directory:
+    :param requirements: additional requirement specifiers
+    :param cache: a PrefixCache instance, or None to disable caching
+    :param progress: called with every line of pip output
+    :return:
+    """
+    pip = get_pip()
+    proj_dir = os.path.dirname(project_spec)
+    wheelhouse = get_wheelhouse_directory()
     log_file = os.path.join(build_directory, 'PIP.log')
-    with open(log_file, 'w') as fp:
-        fp.write("PyAppImage v{}\n".format(__version__))
-        fp.write(SEPARATOR)
-        fp.write("PIP LOGS: \n")
-        fp.write(_pip_install_proc.stdout.decode())
-        fp.write("\n\n")
-        fp.write(SEPARATOR)
-        if _pip_install_proc.stderr is not None:
-            fp.write(_pip_install_proc.stderr.decode())
-        fp.write("Build exited with {}\n".format(
-            _pip_install_proc.returncode))
-
-    _pip_install_proc.check_returncode()
-    _sp = list(Path(build_directory)
-               .glob('lib/python*/site-packages'))[0].resolve()
-    return _sp
-
-
-def build(config, icon, appdata=None, desktop_file=None, has_fuse=True):
+    start_log(log_file)
+
+    def _install_offline(prefix, allow_index=False):
+        project_wheel = build_project_wheel(
+            pip, proj_dir, os.path.join(build_directory, 'wheels'),
+            wheelhouse, log_file, progress=progress, allow_index=allow_index)
+        install_offline(pip, [project_wheel] + list(requirements), prefix,
+                        wheelhouse, log_file, progress=progress)
+
+    def _install(prefix):
+        try:
+            _install_offline(prefix)
+        except subprocess.CalledProcessError:
+            populate_wheelhouse(
+                pip, [proj_dir] + list(requirements), wheelhouse, log_file,
+                progress=progress)
+            _install_offline(prefix, allow_index=True)
+
+    if cache is None:
+        _install(build_directory)
+    else:
+        # the project is keyed by its contents, so that any change to the
+        # sources or its dependency specification is a cache miss
+        install_cached(
+            cache, [proj_dir, hash_project(proj_dir)] + list(requirements),
+            pip, build_directory, _install)
+
+    return get_site_packages(build_directory)
+
+
+def get_site_packages(build_directory):
+    """
+    Returns the site-packages the dependencies were installed to, or
+    None before the first install
+    :param build_directory:
+    :return:
+    """
+    for i in Path(build_directory).glob('lib/python*/site-packages'):
+        return i.resolve()
+    return None
+
+
+def get_variables(build_directory, dist_directory):
+    """
+    Returns the variables which can be used in the paths of data
+    :param build_directory:
+    :param dist_directory:
+    :return:
+    """
+    return {
+        "APPDIR": os.getenv('APPDIR', ''),
+        "BUILD": build_directory,
+        "CWD": os.getcwd(),
+        "ROOT": os.path.realpath('/'),
+        "APPIMAGE": dist_directory
+    }
+
+
+def resolve_data(data, variables):
+    """
+    Returns the (source, destination directory) of every entry of data,
+    with the variables replaced
+    :param data: the data of pyappimage.yml
+    :param variables: as returned by get_variables()
+    :return:
+    """
+    return [
+        (os.path.realpath(replace_vars(src, variables)),
+         os.path.realpath(replace_vars(dest, variables)))
+        for src, dest in (data or {}).items()
+    ]
+
+
+@keep_source_date_epoch()
+def build(config, icon, appdata=None, desktop_file=None, has_fuse=True,
+          use_cache=True, incremental=False, quiet=False, tag=None,
+          trace=None, install=True, package=True):
+    """
+    Builds the AppImage of the project in the current directory, and
+    returns its path
+    :param install: install the dependencies, instead of reusing the
+        ones installed by the previous build
+    :param package: create the AppImage. Otherwise only the AppDir is
+        updated, and None is returned
+    """
+    # the keys are popped off, so that the rest can be passed to PyInstaller
+    config = dict(config)
     entrypoint = config.pop("entrypoint")
     name = config.pop('name', 'Python')
     bundle_id = config.pop('bundle_id', 'x.x.x')
@@ -160,11 +282,28 @@ def build(config, icon, appdata=None, desktop_file=None, has_fuse=True):
     description = config.pop('description', 'Python app generated using '
                                             'PyAppImage')
     ignored_binaries = config.pop('ignore-binaries', [])
+    excluded_libraries = config.pop('exclude-libraries', [])
+    strict_libraries = config.pop('strict-libraries', False)
+    apprun = config.pop('apprun', 'minimal')
+    export_library_path = config.pop('library-path', False)
     categories = config.pop('categories', [])
     requirements = config.pop('requirements', [])
     pyappimage_data = config.pop('data', None)
     environment_vars = config.pop('environment', None)
     updateinformation = config.pop('updateinformation', None)
+    launch_cache = config.pop('launch-cache', None)
+    if launch_cache is None:
+        launch_cache = not has_fuse
+    # matrix builds are driven by the cli, one interpreter at a time
+    config.pop('interpreters', None)
+    # container builds are started by the cli, see build/docker.py
+    config.pop('docker-image', None)
+    compression = config.pop('compression', 'zstd')
+    block_size = config.pop('block-size', '1M')
+    dedup = config.pop('dedup', True)
+    precompile_level = config.pop('precompile', None)
+    reproducible = config.pop('reproducible', False) or \
+        bool(os.getenv('SOURCE_DATE_EPOCH'))
     setup_py = os.path.realpath('setup.py')
     if os.path.exists(os.path.realpath('setup.py')):
         project_spec = os.path.realpath('setup.py')
@@ -174,20 +313,24 @@ def build(config, icon, appdata=None, desktop_file=None, has_fuse=True):
         raise FileNotFoundError("Could not find a setup.py or pyproject.toml in the current "
                                 "directory!")
 
-    build_started_at = time.asctime()
-    spinner = Halo("Building AppImage for {} ".format(name), spinner="dots")
+    epoch = None
+    if reproducible:
+        epoch = get_source_date_epoch()
+        # pip, setuptools and PyInstaller record this instead of the time,
+        # it is restored when build returns
+        os.environ['SOURCE_DATE_EPOCH'] = str(epoch)
+    runtime = None
+    if package:
+        # an unpinned runtime, or one which fails its checksum, fails the
+        # build before the dependencies are installed
+        runtime = get_runtime()
+    tracer = Tracer(name)
+    spinner = Halo("Building AppImage for {} ".format(name), spinner="dots",
+                   enabled=not quiet)
     spinner.start()
-    build_directory = os.path.realpath("{}.AppDir.BUILD".format(name))
-    dist_directory = os.path.realpath("{}.AppDir".format(name))
+    build_directory, dist_directory = get_directories(name, tag=tag)
 
-    # internal function to generate_vars
-    _vars = {
-        "APPDIR": os.getenv('APPDIR', ''),
-        "BUILD": build_directory,
-        "CWD": os.getcwd(),
-        "ROOT": os.path.realpath('/'),
-        "APPIMAGE": dist_directory
-    }
+    _vars = get_variables(build_directory, dist_directory)
 
     _pyinstaller_workpath = os.path.join(build_directory, 'build')
     for i in (build_directory, dist_directory, _pyinstaller_workpath):
@@ -198,51 +341,91 @@ def build(config, icon, appdata=None, desktop_file=None, has_fuse=True):
     entrypoint = "from {mod} import {func}; {func}()".format(
         mod=_import, func=_function)
 
-    with open(os.path.join(build_directory, "entrypoint.py"), 'w') as w:
-        w.write(ENTRYPOINT.format(
+    with tracer.span("entrypoint") as span, \
+            open(os.path.join(build_directory, "entrypoint.py"), 'w') as w:
+        span["bytes"] = w.write(ENTRYPOINT.format(
             pyappimage_version=__version__,
             python_runtime=sys.version.split('\n')[0],
-            platform_version=platform.platform(),
+            platform_version="{} {}".format(
+                platform.system(), platform.machine())
+            if reproducible else platform.platform(),
+            profiler=PROFILER,
             entrypoint=entrypoint
         ))
 
-    site_packages = \
-        install_packages(project_spec=project_spec, build_directory=build_directory)
-    
-    if len(requirements) >= 1:
-        install_additional_requirements(requirements, build_directory)
-
-    PyInstaller.run(_(
+    cache = PrefixCache() if use_cache else None
+
+    def _show_pip_progress(line):
+        if line.strip():
+            spinner.text = "Installing dependencies: {}".format(
+                line.strip()[:PROGRESS_WIDTH])
+
+    site_packages = None if install else get_site_packages(build_directory)
+    with tracer.span("install", requirements=len(requirements),
+                     cache=use_cache,
+                     reused=site_packages is not None) as span:
+        if site_packages is None:
+            site_packages = install_packages(
+                project_spec=project_spec, build_directory=build_directory,
+                requirements=requirements, cache=cache,
+                progress=_show_pip_progress)
+        span["files"], span["bytes"] = get_tree_size(site_packages)
+    spinner.text = "Building AppImage for {} ".format(name)
+
+    parameters = _(
         "{build}/entrypoint.py --log-level=WARN --name={name} "
         "--onedir {kwargs} --distpath={dist} --specpath={workpath} "
         "--workpath={workpath} --paths={site_packages} "
-        "--noconfirm --clean".format(
+        "--noconfirm".format(
             name=name,
-            entrypoint=entrypoint,
             kwargs=' '.join(get_parameters(config, _vars)),
             dist=dist_directory,
             build=build_directory,
             workpath=_pyinstaller_workpath,
             site_packages=site_packages
-        )))
+        ))
 
-    if not os.path.exists(os.path.join(dist_directory, name, name)):
+    manifest_file = os.path.join(_pyinstaller_workpath, MANIFEST_FILE)
+    binary = os.path.join(dist_directory, name, name)
+    with tracer.span("fingerprint"):
+        fingerprint = compute_fingerprint(
+            entrypoint=os.path.join(build_directory, "entrypoint.py"),
+            site_packages=site_packages,
+            parameters=parameters,
+            extra={"ignore-binaries": list(ignored_binaries),
+                   "exclude-libraries": list(excluded_libraries)}
+        )
+    with tracer.span("pyinstaller", reused=False) as span:
+        if incremental and os.path.exists(binary) and \
+                load_manifest(manifest_file) == fingerprint:
+            spinner.info("PyInstaller inputs unchanged, reusing {}".format(
+                os.path.join(dist_directory, name)))
+            span["reused"] = True
+        else:
+            if os.path.exists(manifest_file):
+                os.remove(manifest_file)
+            if not incremental:
+                # throw away PyInstaller's analysis cache for clean builds
+                parameters.append("--clean")
+            PyInstaller.run(parameters)
+        span["files"], span["bytes"] = \
+            get_tree_size(os.path.join(dist_directory, name))
+
+    if not os.path.exists(binary):
         spinner.fail("Build failed")
         spinner.stop()
+        raise RuntimeError("PyInstaller did not create {}".format(binary))
 
     # build has succeeded
     spinner.succeed("Build succeeded! ")
     spinner.info("Copying icons ")
+    assembly = Assembly()
     icon_name = icon.split(os.path.sep)[-1]
-    shutil.copyfile(
-        icon, os.path.join(dist_directory, icon_name), follow_symlinks=True)
+    assembly.add_file(icon, os.path.join(dist_directory, icon_name))
     if appdata is not None:
         spinner.info("Copying {}.appdata.xml".format(name))
-        appdata_dir = os.path.join(dist_directory, 'usr', 'share')
-        os.makedirs(appdata_dir, exist_ok=True)
-        shutil.copyfile(
-            appdata, os.path.join(appdata_dir, '{}.appdata.xml'.format(name)),
-            follow_symlinks=True)
+        assembly.add_file(appdata, os.path.join(
+            dist_directory, 'usr', 'share', '{}.appdata.xml'.format(name)))
     if desktop_file is None:
         with open(os.path.join(dist_directory, '{}.desktop'.format(name)),
                   'w') as w:
@@ -254,26 +437,71 @@ def build(config, icon, appdata=None, desktop_file=None, has_fuse=True):
                 icon=icon_name.split('.')[0]
             ))
     else:
-        shutil.copyfile(
+        assembly.add_file(
             desktop_file,
-            os.path.join(dist_directory, '{}.desktop'.format(name)),
-            follow_symlinks=True
+            os.path.join(dist_directory, '{}.desktop'.format(name))
         )
 
+    with tracer.span("assets", files=len(assembly.files)) as span:
+        linked, copied = assembly.run()
+        span.update(linked=linked, copied=copied)
+
+    assembly = Assembly()
     if pyappimage_data is not None:
-        for src in pyappimage_data:
-            dest = pyappimage_data[src]
-            src_fmt = replace_vars(src, _vars)
-            dest_fmt = replace_vars(dest, _vars)
-            src_data = os.path.realpath(src_fmt)
-            dest_folder = os.path.realpath(dest_fmt)
+        for src_data, dest_folder in resolve_data(pyappimage_data, _vars):
             os.makedirs(dest_folder, exist_ok=True)
             if os.path.isdir(src_data):
-
-                shutil.copytree(src_data, dest_folder, symlinks=True,
-                                dirs_exist_ok=True)
+                assembly.add_tree(src_data, dest_folder)
             else:
-                shutil.copy(src_data, dest_folder, follow_symlinks=True)
+                assembly.add_file(src_data, os.path.join(
+                    dest_folder, os.path.basename(src_data)))
+    with tracer.span("data", files=len(assembly.files)) as span:
+        _linked, _copied = assembly.run()
+        span.update(linked=_linked, copied=_copied)
+    linked += _linked
+    copied += _copied
+    spinner.info("Assembled AppDir: {} linked, {} copied".format(
+        human_size(linked), human_size(copied)))
+
+    spinner.start("Pruning ignored binaries")
+    with tracer.span("prune", patterns=len(ignored_binaries)) as span:
+        report = prune(os.path.join(dist_directory, name), ignored_binaries)
+        span.update(files=report.files, bytes=report.bytes)
+    spinner.info("Removed {} files, {}".format(
+        report.files, human_size(report.bytes)))
+
+    spinner.start("Excluding libraries provided by the host")
+    with tracer.span("libraries", patterns=len(excluded_libraries)) as span:
+        report = exclude_libraries(
+            os.path.join(dist_directory, name), excluded_libraries)
+        # LD_LIBRARY_PATH is inherited by the processes the app starts,
+        # so by default the libraries are only looked up on their
+        # RUNPATH and in the directory the bootloader adds
+        library_path = []
+        if apprun == 'minimal' and export_library_path:
+            library_path = get_library_path(
+                os.path.join(dist_directory, name), excluded_libraries)
+        unresolved = find_unresolved(
+            os.path.join(dist_directory, name), excluded_libraries,
+            library_path=library_path)
+        span.update(files=report.files, bytes=report.bytes,
+                    unresolved=len(unresolved))
+    spinner.info("Excluded {} libraries, {}".format(
+        report.files, human_size(report.bytes)))
+    if unresolved:
+        message = "{} libraries are needed, but neither bundled nor " \
+            "provided by the host".format(len({i[1] for i in unresolved}))
+        if strict_libraries:
+            spinner.fail(message)
+        else:
+            spinner.warn(message)
+        for path, needed in unresolved:
+            print("  {}: {}".format(path, needed))
+        if strict_libraries:
+            spinner.stop()
+            raise RuntimeError(
+                "Bundle the libraries, or add them to exclude-libraries if "
+                "every host provides them")
 
     env_vars = []
     if environment_vars is not None:
@@ -283,31 +511,106 @@ def build(config, icon, appdata=None, desktop_file=None, has_fuse=True):
     # writing Entrypoint
     spinner.info("Writing AppRun appimagetool")
     path_to_apprun = os.path.join(dist_directory, 'AppRun')
-    with open(path_to_apprun, 'w') as w:
-        w.write(APPRUN)
-        w.write('\n'.join(env_vars))  # add the environment variables
-        w.write("\n${APPDIR}/" + name + "/" + name + " $@")  # add the binary
-        # entrypoint
+    with tracer.span("apprun", environment=len(env_vars),
+                     library_path=len(library_path)), \
+            open(path_to_apprun, 'w') as w:
+        if apprun == 'minimal':
+            w.write(APPRUN_MINIMAL)
+            if library_path:
+                w.write('export LD_LIBRARY_PATH="{}'.format(':'.join(
+                    os.path.normpath('${APPDIR}/' + name + '/' + i)
+                    for i in library_path)))
+                w.write('${LD_LIBRARY_PATH:+:$LD_LIBRARY_PATH}"\n')
+            w.write('\n'.join(env_vars))
+            # the binary replaces the shell
+            w.write('\nexec "${APPDIR}/' + name + '/' + name + '" "$@"\n')
+        else:
+            w.write(APPRUN)
+            w.write('\n'.join(env_vars))  # add the environment variables
+            w.write('\n"${APPDIR}/' + name + '/' + name + '" "$@"')
+            # add the binary entrypoint
 
     # chmod the apprun on 755
     os.chmod(path_to_apprun, 0o755)
 
-    _libz = os.path.join(dist_directory, name, 'libz.so.1')
-    if os.path.exists(_libz):
-        os.remove(_libz)
-
-    _libs_path = os.path.join(dist_directory, name)
-    for lib in ignored_binaries:
-        lib_path = os.path.join(_libs_path, lib)
-        if os.path.exists(lib_path) and os.path.isdir(lib_path):
-            shutil.rmtree(lib_path)
-
-        for i in Path(_libs_path).glob(lib):
-            print("Unlinking {}".format(i))
-            i.unlink(missing_ok=True)
+    if precompile_level is not None and precompile_level is not False:
+        spinner.start("Compiling Python sources")
+        with tracer.span("precompile") as span:
+            compiled, failures = precompile(
+                dist_directory,
+                optimize=0 if precompile_level is True
+                else int(precompile_level))
+            span.update(files=compiled, failures=len(failures))
+        spinner.info("Compiled {} Python sources".format(compiled))
+        uncompiled = find_uncompiled(dist_directory)
+        if uncompiled:
+            spinner.warn(
+                "{} Python sources have no bytecode, and will be compiled "
+                "on every launch".format(len(uncompiled)))
+            for i in uncompiled:
+                print("  {}: {}".format(
+                    os.path.relpath(i, dist_directory),
+                    failures.get(i, "not compiled")))
+
+    if reproducible:
+        with tracer.span("normalize") as span:
+            span["files"] = normalize_modes(dist_directory)
+
+    if dedup:
+        spinner.start("Deduplicating AppDir")
+        with tracer.span("dedup") as span:
+            replaced, saved = deduplicate(
+                dist_directory, symlinks=dedup == 'symlink')
+            span.update(files=replaced, bytes=saved)
+        spinner.info("Deduplicated {} files, saved {}".format(
+            replaced, human_size(saved)))
+
+    save_manifest(manifest_file, fingerprint)
+
+    appimage = None
+    if package:
+        spinner.start("Building AppImage")
+        with tracer.span("package", compression=compression,
+                         block_size=block_size) as span:
+            span["files"], span["input_bytes"] = get_tree_size(dist_directory)
+            appimage = build_appimage(
+                dist_directory,
+                get_appimage_path(name, tag=tag),
+                compression=compression,
+                block_size=block_size,
+                runtime=runtime,
+                update_information=updateinformation,
+                epoch=epoch
+            )
+            span["bytes"] = os.path.getsize(appimage)
+        spinner.succeed("Written {}".format(appimage))
+        if updateinformation:
+            spinner.info("Written {}.zsync, upload it next to {}".format(
+                appimage, os.path.basename(appimage)))
+        launcher = None
+        if launch_cache:
+            launcher = write_launcher(appimage)
+            spinner.info("Written {}, which runs the AppImage without "
+                         "FUSE".format(launcher))
+        if has_fuse:
+            if not verify_appimage(appimage):
+                spinner.warn("{} failed to run".format(appimage))
+        elif launcher is not None:
+            # extracted to a throwaway cache, not the one of the user
+            with tempfile.TemporaryDirectory() as tmp:
+                if not verify_appimage(launcher, env=dict(
+                        os.environ, PYAPPIMAGE_LAUNCH_CACHE=tmp)):
+                    spinner.warn("{} failed to run".format(launcher))
+        else:
+            spinner.info(
+                "FUSE is not available, skipping AppImage verification")
+    else:
+        spinner.info("Updated {}".format(dist_directory))
 
-    spinner.start("Building AppImage")
+    if trace is not None:
+        tracer.write(trace)
+        spinner.info("Written build trace to {}".format(trace))
 
     spinner.succeed("PyAppImage Succeeded.")
     spinner.stop()
-    return
+    return appimage
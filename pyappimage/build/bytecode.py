@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import importlib.util
+import os
+import py_compile
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+
+def get_cache_file(source):
+    """
+    Returns the path of the bytecode the frozen interpreter looks up for
+    source. PyInstaller carries the optimization flag of the interpreter
+    it runs in over to the frozen application.
+    :param source:
+    :return:
+    """
+    return importlib.util.cache_from_source(
+        source, optimization=sys.flags.optimize or '')
+
+
+def find_sources(directory):
+    sources = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for f in sorted(files):
+            path = os.path.join(root, f)
+            if f.endswith('.py') and not os.path.islink(path):
+                sources.append(path)
+    return sources
+
+
+def _compile(task):
+    source, optimize = task
+    try:
+        # the image is read only, so the bytecode never has to be
+        # revalidated against the source
+        py_compile.compile(
+            source, cfile=get_cache_file(source), optimize=optimize,
+            doraise=True,
+            invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+    except (py_compile.PyCompileError, SyntaxError, ValueError) as e:
+        return source, str(e).strip().splitlines()[-1]
+    return source, None
+
+
+def precompile(directory, optimize=0, jobs=None):
+    """
+    Compiles every loose Python source in directory on a process pool.
+    optimize is the optimization level the code is compiled with, 2
+    strips docstrings. The bytecode is written where the frozen
+    interpreter looks it up, regardless of optimize. Returns a tuple of
+    (compiled, failures), where failures maps the sources which could
+    not be compiled to the error
+    :param directory:
+    :param optimize: 0, 1 or 2
+    :param jobs: number of processes, defaults to the cpu count
+    :return:
+    """
+    if optimize not in (0, 1, 2):
+        raise ValueError(
+            "precompile must be 0, 1 or 2, got {}".format(optimize))
+    sources = find_sources(directory)
+    failures = {}
+    compiled = 0
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        for source, error in pool.map(
+                _compile, [(i, optimize) for i in sources], chunksize=32):
+            if error is None:
+                compiled += 1
+            else:
+                failures[source] = error
+    return compiled, failures
+
+
+def find_uncompiled(directory):
+    """
+    Returns the loose Python sources in directory which have no bytecode
+    the frozen interpreter can use. Importing any of them would compile
+    it again on every launch, and attempt to write the bytecode to the
+    read only image.
+    :param directory:
+    :return:
+    """
+    return [i for i in find_sources(directory)
+            if not os.path.exists(get_cache_file(i))]
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import sys
+import sysconfig
+import time
+
+from .assemble import Assembly
+from ..project import PROJECT_SPEC_FILES, is_ignored_directory
+from ..utils import get_tree_size
+from ..version import __version__
+
+# 5 GiB
+DEFAULT_CACHE_SIZE = 5 * 1024 ** 3
+
+META_FILE = "pyappimage-cache.json"
+
+
+def get_cache_directory():
+    """
+    Returns the root directory of the pyappimage cache. This can be
+    overridden by the PYAPPIMAGE_CACHE_DIR environment variable, otherwise
+    it follows the XDG base directory specification
+    :return:
+    """
+    if os.getenv("PYAPPIMAGE_CACHE_DIR"):
+        return os.path.realpath(os.getenv("PYAPPIMAGE_CACHE_DIR"))
+    xdg_cache = os.getenv("XDG_CACHE_HOME") or \
+        os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(xdg_cache, "pyappimage")
+
+
+def get_interpreter_tag():
+    """
+    Returns a string uniquely identifying the interpreter, its ABI and
+    the platform the prefixes are built for
+    :return:
+    """
+    return "{impl}-{version}-{abi}-{platform}".format(
+        impl=sys.implementation.cache_tag,
+        version=sys.version.split()[0],
+        abi=sysconfig.get_config_var("SOABI"),
+        platform=sysconfig.get_platform()
+    )
+
+
+def get_project_inputs(project_directory):
+    """
+    Yields the files of the project directory which are installed with
+    the project, or change how it is installed: the files declaring its
+    dependencies and its build, its top level modules, and the files of
+    its packages, the directories with an __init__.py and the src
+    directory. Everything else, like the logs, traces and AppImages
+    pyappimage writes next to the project, is skipped
+    :param project_directory:
+    :return:
+    """
+    packages = set()
+    for root, dirs, files in os.walk(project_directory):
+        dirs[:] = sorted(
+            d for d in dirs
+            if not is_ignored_directory(d, os.path.join(root, d))
+        )
+        if root == project_directory:
+            for f in sorted(files):
+                if f.endswith('.py') or any(
+                        fnmatch.fnmatch(f, i) for i in PROJECT_SPEC_FILES):
+                    yield os.path.join(root, f)
+            packages.update(
+                os.path.join(root, d) for d in dirs if d == 'src')
+            continue
+        # directories below a package hold its data
+        if '__init__.py' not in files and \
+                os.path.dirname(root) not in packages and \
+                root not in packages:
+            continue
+        packages.add(root)
+        for f in sorted(files):
+            path = os.path.join(root, f)
+            if not os.path.islink(path):
+                yield path
+
+
+def hash_project(project_directory):
+    """
+    Returns a sha256 digest over the relative paths and contents of the
+    files returned by get_project_inputs()
+    :param project_directory:
+    :return:
+    """
+    digest = hashlib.sha256()
+    for path in get_project_inputs(project_directory):
+        digest.update(os.path.relpath(path, project_directory).encode())
+        digest.update(b'\0')
+        with open(path, 'rb') as r:
+            for chunk in iter(lambda: r.read(1024 * 1024), b''):
+                digest.update(chunk)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class PrefixCache:
+    """
+    A persistent, content addressed cache of pip install prefixes.
+    Each entry is a directory named after the hash of the requirement
+    set, the pip command and the interpreter it was installed with.
+    Entries are evicted in least-recently-used order once the total size
+    of the cache exceeds max_size.
+    """
+
+    def __init__(self, root=None, max_size=None):
+        self.root = os.path.join(root or get_cache_directory(), "prefixes")
+        if max_size is None:
+            max_size = int(os.getenv(
+                "PYAPPIMAGE_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+        self.max_size = max_size
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key(specs, pip):
+        """
+        Computes the cache key of a requirement set
+        :param specs: list of requirement specifiers
+        :param pip: the pip command used to install them
+        :return:
+        """
+        digest = hashlib.sha256()
+        for part in [__version__, pip, get_interpreter_tag()] + \
+                sorted(specs):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def _read_meta(self, key):
+        try:
+            with open(os.path.join(self.path(key), META_FILE), 'r') as r:
+                return json.load(r)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, key, meta):
+        meta_file = os.path.join(self.path(key), META_FILE)
+        with open(meta_file + ".tmp", 'w') as w:
+            json.dump(meta, w, indent=2)
+        os.replace(meta_file + ".tmp", meta_file)
+
+    def get(self, key):
+        """
+        Returns the path to the cached prefix for key, or None on a miss.
+        Updates the last used timestamp of the entry on a hit
+        :param key:
+        :return:
+        """
+        meta = self._read_meta(key)
+        if meta is None:
+            return None
+        meta["last_used"] = time.time()
+        self._write_meta(key, meta)
+        return os.path.join(self.path(key), "prefix")
+
+    def staging_directory(self, key):
+        """
+        Returns an empty directory pip can install a prefix into, before
+        it gets committed to the cache with put()
+        :param key:
+        :return:
+        """
+        staging = os.path.join(
+            self.root, ".staging-{}-{}".format(key[:16], os.getpid()))
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+        os.makedirs(staging)
+        return staging
+
+    def put(self, key, staging, specs):
+        """
+        Atomically moves the installed prefix at staging into the cache
+        and evicts old entries if the cache has grown too large
+        :param key:
+        :param staging:
+        :param specs:
+        :return:
+        """
+        entry = self.path(key)
+        tmp_entry = staging + ".entry"
+        os.makedirs(tmp_entry)
+        os.rename(staging, os.path.join(tmp_entry, "prefix"))
+        now = time.time()
+        meta = {
+            "key": key,
+            "specs": sorted(specs),
+            "interpreter": get_interpreter_tag(),
+            "size": get_tree_size(tmp_entry)[1],
+            "created": now,
+            "last_used": now,
+        }
+        with open(os.path.join(tmp_entry, META_FILE), 'w') as w:
+            json.dump(meta, w, indent=2)
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:
+            # another build committed the same entry concurrently
+            shutil.rmtree(tmp_entry)
+        self.prune(keep=(key,))
+        return os.path.join(entry, "prefix")
+
+    @staticmethod
+    def materialize(prefix, build_directory):
+        """
+        Links the cached prefix into the build directory. Returns a tuple
+        of (linked_bytes, copied_bytes)
+        :param prefix:
+        :param build_directory:
+        :return:
+        """
+        assembly = Assembly()
+        assembly.add_tree(prefix, build_directory)
+        return assembly.run()
+
+    def entries(self):
+        """
+        Returns the metadata of all the entries in the cache, least
+        recently used first
+        :return:
+        """
+        entries = []
+        for key in os.listdir(self.root):
+            if key.startswith('.'):
+                continue
+            meta = self._read_meta(key)
+            if meta is not None:
+                entries.append(meta)
+        return sorted(entries, key=lambda x: x["last_used"])
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            "directory": self.root,
+            "entries": len(entries),
+            "size": sum(i["size"] for i in entries),
+            "max_size": self.max_size,
+        }
+
+    def prune(self, max_size=None, keep=()):
+        """
+        Removes least recently used entries until the cache fits in
+        max_size. Stale staging directories are removed too. Returns a
+        tuple of (removed_entries, freed_bytes)
+        :param max_size:
+        :param keep: keys which should not be evicted
+        :return:
+        """
+        if max_size is None:
+            max_size = self.max_size
+        for i in os.listdir(self.root):
+            if i.startswith('.staging-'):
+                path = os.path.join(self.root, i)
+                if time.time() - os.path.getmtime(path) > 24 * 60 * 60:
+                    shutil.rmtree(path, ignore_errors=True)
+
+        entries = self.entries()
+        total = sum(i["size"] for i in entries)
+        removed = freed = 0
+        for meta in entries:
+            if total <= max_size:
+                break
+            if meta["key"] in keep:
+                continue
+            shutil.rmtree(self.path(meta["key"]), ignore_errors=True)
+            total -= meta["size"]
+            freed += meta["size"]
+            removed += 1
+        return removed, freed
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import os
+import stat
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils import hash_file
+
+
+def find_duplicates(directory, jobs=None):
+    """
+    Returns a list of groups of files with identical content and
+    permissions. Files are grouped by size first, so that only files
+    which can be duplicates are hashed. Files which are already
+    hardlinked together are counted once.
+    :param directory:
+    :param jobs: number of threads used for hashing
+    :return:
+    """
+    by_size = defaultdict(list)
+    seen_inodes = set()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for f in sorted(files):
+            path = os.path.join(root, f)
+            st = os.lstat(path)
+            if not stat.S_ISREG(st.st_mode) or st.st_size == 0:
+                continue
+            if (st.st_dev, st.st_ino) in seen_inodes:
+                continue
+            seen_inodes.add((st.st_dev, st.st_ino))
+            by_size[(st.st_size, stat.S_IMODE(st.st_mode))].append(path)
+
+    candidates = [p for paths in by_size.values() if len(paths) > 1
+                  for p in paths]
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        digests = dict(zip(candidates, pool.map(hash_file, candidates)))
+
+    groups = defaultdict(list)
+    for key, paths in by_size.items():
+        if len(paths) < 2:
+            continue
+        for path in paths:
+            groups[(key, digests[path])].append(path)
+    return [paths for paths in groups.values() if len(paths) > 1]
+
+
+def deduplicate(directory, symlinks=False, jobs=None):
+    """
+    Replaces duplicate files in directory with hardlinks, or relative
+    symlinks, to the first of their copies. Returns a tuple of
+    (replaced_files, saved_bytes)
+    :param directory:
+    :param symlinks: use relative symlinks instead of hardlinks
+    :param jobs:
+    :return:
+    """
+    replaced = saved = 0
+    for paths in find_duplicates(directory, jobs=jobs):
+        original, duplicates = paths[0], paths[1:]
+        for path in duplicates:
+            tmp = path + ".pyappimage-dedup"
+            if symlinks:
+                os.symlink(
+                    os.path.relpath(original, os.path.dirname(path)), tmp)
+            else:
+                os.link(original, tmp)
+            os.replace(tmp, path)
+            replaced += 1
+            saved += os.path.getsize(original)
+    return replaced, saved
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from .appimage import get_runtime
+from ..version import __requirements__, __version__
+
+# an old glibc keeps the AppImage running on older distributions, while
+# bullseye is the oldest Debian whose mksquashfs supports zstd. This is a
+# tag, which moves when the image is rebuilt; docker-image pins one with
+# name@sha256:digest. The dependency layer is keyed to the id of the
+# local image, so a moved tag builds it again
+DEFAULT_IMAGE = "python:3.9-slim-bullseye"
+
+# the files of a project which declare its dependencies. Only these are
+# copied into the dependency layer, so that editing the sources does
+# not invalidate it
+DEPENDENCY_FILES = (
+    "setup.py", "setup.cfg", "pyproject.toml", "requirements.txt"
+)
+
+# the pyappimage cache of the image, holding the wheelhouse
+IMAGE_CACHE_DIRECTORY = "/var/cache/pyappimage"
+IMAGE_SOURCE_DIRECTORY = "/opt/pyappimage/src"
+IMAGE_DEPS_DIRECTORY = "/opt/pyappimage/deps"
+IMAGE_RUNTIME = "/opt/pyappimage/runtime"
+
+DOCKERFILE = """\
+FROM {image}
+RUN apt-get update \\
+    && apt-get install -y --no-install-recommends squashfs-tools \\
+    && rm -rf /var/lib/apt/lists/*
+RUN pip install --no-cache-dir {requirements}
+COPY pyappimage {source}/pyappimage
+ENV PYTHONPATH={source} PYAPPIMAGE_CACHE_DIR={cache}
+COPY deps {deps}
+RUN python -m pyappimage.build.docker {deps} \\
+    && chmod -R a+rwX {cache}
+"""
+
+
+def get_engine():
+    """
+    Returns the container engine, from the PYAPPIMAGE_CONTAINER_ENGINE
+    environment variable, or docker or podman, whichever is on PATH
+    :return:
+    """
+    engine = os.getenv("PYAPPIMAGE_CONTAINER_ENGINE")
+    if engine:
+        return shutil.which(engine) or engine
+    for i in ("docker", "podman"):
+        if shutil.which(i) is not None:
+            return shutil.which(i)
+    raise FileNotFoundError(
+        "Could not find docker or podman on PATH. Install one of them, or "
+        "set PYAPPIMAGE_CONTAINER_ENGINE")
+
+
+def get_image_id(engine, image):
+    """
+    Returns the id of image in the local store of engine, or None if it
+    is not there. Images are never pulled, so that builds work without
+    registry access
+    :param engine:
+    :param image:
+    :return:
+    """
+    proc = subprocess.run(
+        [engine, "image", "inspect", "--format", "{{.Id}}", image],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    if proc.returncode != 0:
+        return None
+    return proc.stdout.decode().strip()
+
+
+def get_requirements():
+    """
+    Returns the requirements of pyappimage, from __requirements__, pinned
+    to the versions installed on the host, so that the container builds
+    with the PyInstaller the host does. Requirements which are not
+    installed on the host are left unpinned
+    :return:
+    """
+    try:
+        from importlib import metadata
+    except ImportError:
+        return list(__requirements__)
+    requirements = []
+    for i in __requirements__:
+        try:
+            requirements.append("{}=={}".format(i, metadata.version(i)))
+        except metadata.PackageNotFoundError:
+            requirements.append(i)
+    return requirements
+
+
+def get_dependency_files(project_directory):
+    return [
+        i for i in DEPENDENCY_FILES
+        if os.path.isfile(os.path.join(project_directory, i))
+    ]
+
+
+def hash_dependencies(image_id, project_directory, requirements=()):
+    """
+    Hashes everything which goes into the dependency layer: the base
+    image, pyappimage, the dependency files of the project and the
+    additional requirements
+    :param image_id:
+    :param project_directory:
+    :param requirements:
+    :return:
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(image_id.encode())
+    h.update(__version__.encode())
+    h.update("\0".join(get_requirements()).encode())
+    for i in get_dependency_files(project_directory):
+        h.update(i.encode() + b"\0")
+        with open(os.path.join(project_directory, i), 'rb') as r:
+            h.update(r.read())
+    h.update("\0".join(requirements).encode())
+    return h.hexdigest()
+
+
+def build_image(engine, image, project_directory, requirements=()):
+    """
+    Returns the tag of the image holding pyappimage and a wheelhouse with
+    the dependencies of the project, building it if it does not exist.
+    The image is tagged with the hash of the dependencies, so it is only
+    rebuilt when they change
+    :param engine:
+    :param image: the base image, which must be in the local store
+    :param project_directory:
+    :param requirements: additional requirements from pyappimage.yml
+    :return:
+    """
+    image_id = get_image_id(engine, image)
+    if image_id is None:
+        raise FileNotFoundError(
+            "The image {image} is not available locally. Pull it with "
+            "`{engine} pull {image}`, or load it with `{engine} load`".format(
+                image=image, engine=os.path.basename(engine)))
+    tag = "pyappimage-deps:{}".format(
+        hash_dependencies(image_id, project_directory, requirements))
+    if get_image_id(engine, tag) is not None:
+        return tag
+
+    with tempfile.TemporaryDirectory(prefix="pyappimage-docker-") as context:
+        shutil.copytree(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            os.path.join(context, "pyappimage"),
+            ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+        deps = os.path.join(context, "deps")
+        os.makedirs(deps)
+        for i in get_dependency_files(project_directory):
+            shutil.copy2(os.path.join(project_directory, i), deps)
+        with open(os.path.join(deps, "pyappimage-requirements.txt"), 'w') as w:
+            w.write("".join("{}\n".format(i) for i in requirements))
+        with open(os.path.join(context, "Dockerfile"), 'w') as w:
+            w.write(DOCKERFILE.format(
+                image=image,
+                requirements=" ".join(get_requirements()),
+                source=IMAGE_SOURCE_DIRECTORY,
+                cache=IMAGE_CACHE_DIRECTORY,
+                deps=IMAGE_DEPS_DIRECTORY,
+            ))
+        subprocess.run([
+            engine, "build", "--tag", tag,
+            "--label", "pyappimage.version={}".format(__version__),
+            context
+        ], check=True)
+    return tag
+
+
+def build_in_container(config, project_directory, force=False,
+                       use_cache=True, incremental=False):
+    """
+    Builds the project in a container, from the docker-image of config.
+    The project directory is mounted at the same path in the container,
+    so the AppImage is written next to it, owned by the current user.
+    Returns the exit status of the build
+    :param config: the parsed pyappimage.yml
+    :param project_directory:
+    :param force:
+    :param use_cache:
+    :param incremental:
+    :return:
+    """
+    engine = get_engine()
+    # resolved on the host, where the pin and the cache are, before the
+    # image is built
+    runtime = get_runtime()
+    image = build_image(
+        engine, config.get("docker-image", DEFAULT_IMAGE), project_directory,
+        requirements=config.get("requirements", []))
+
+    command = [
+        engine, "run", "--rm",
+        "--volume", "{0}:{0}".format(project_directory),
+        "--workdir", project_directory,
+        "--volume", "{}:{}:ro".format(runtime, IMAGE_RUNTIME),
+        "--env", "PYAPPIMAGE_RUNTIME={}".format(IMAGE_RUNTIME),
+        "--env", "HOME=/tmp",
+    ]
+    if os.path.basename(engine) == "podman":
+        command.append("--userns=keep-id")
+    else:
+        command.extend(["--user", "{}:{}".format(os.getuid(), os.getgid())])
+    if sys.stdin.isatty():
+        # lets the build ask before overwriting a previous build
+        command.append("--interactive")
+    command.extend([
+        image, "python", "-m", "pyappimage.cli", "build", "--no-daemon"
+    ])
+    if force:
+        command.append("--always-confirm")
+    if not use_cache:
+        command.append("--no-cache")
+    if incremental:
+        command.append("--incremental")
+    return subprocess.run(command).returncode
+
+
+def prefetch_dependencies(deps_directory):
+    """
+    Fills the wheelhouse of the image with the dependencies declared in
+    deps_directory. This runs while the image is built. If the metadata
+    of the project cannot be read from its dependency files alone, only
+    the requirements files are used, and the rest is downloaded during
+    the build
+    :param deps_directory:
+    :return:
+    """
+    from .build import get_pip
+    from .wheelhouse import get_wheelhouse_directory, populate_wheelhouse
+
+    pip = get_pip()
+    wheelhouse = get_wheelhouse_directory()
+    log_file = os.path.join(deps_directory, "PIP.log")
+    specs = [
+        ["-r", os.path.join(deps_directory, i)]
+        for i in ("pyappimage-requirements.txt", "requirements.txt")
+        if os.path.exists(os.path.join(deps_directory, i))
+    ]
+    # from the most to the least complete set of dependencies, as
+    # requirements files may refer to paths which are not in the layer
+    candidates = [sum(specs, []) + [deps_directory], sum(specs, []),
+                  specs[0] if specs else []]
+    for i in candidates:
+        try:
+            populate_wheelhouse(pip, i, wheelhouse, log_file)
+            return
+        except subprocess.CalledProcessError:
+            print("Could not prefetch {}, see {}".format(
+                " ".join(i) or "the build requirements", log_file))
+
+
+if __name__ == "__main__":
+    prefetch_dependencies(sys.argv[1])
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import struct
+
+ELF_MAGIC = b"\x7fELF"
+
+SHT_DYNAMIC = 6
+
+# tags of the entries of the dynamic section
+DT_NULL = 0
+DT_NEEDED = 1
+DT_SONAME = 14
+DT_RPATH = 15
+DT_RUNPATH = 29
+
+
+class ElfHeader:
+    """
+    The parts of the ELF header needed to find the sections of a file
+    """
+
+    def __init__(self, fp):
+        fp.seek(0)
+        ident = fp.read(16)
+        if ident[:4] != ELF_MAGIC:
+            raise ValueError("Not an ELF file")
+        self.is_64 = ident[4] == 2
+        self.endian = "<" if ident[5] == 1 else ">"
+        if self.is_64:
+            fp.seek(0x28)
+            self.shoff, = struct.unpack(self.endian + "Q", fp.read(8))
+            fp.seek(0x3a)
+        else:
+            fp.seek(0x20)
+            self.shoff, = struct.unpack(self.endian + "I", fp.read(4))
+            fp.seek(0x2e)
+        self.shentsize, self.shnum, self.shstrndx = struct.unpack(
+            self.endian + "HHH", fp.read(6))
+
+
+def get_elf_size(fp):
+    """
+    Returns the size of the ELF file at the start of fp, which is where
+    the squashfs image of a type 2 AppImage starts. The section header
+    table is the last part of the runtime
+    :param fp:
+    :return:
+    """
+    header = ElfHeader(fp)
+    return header.shoff + header.shentsize * header.shnum
+
+
+def _read_section_headers(fp, header):
+    """
+    Returns the (name, type, offset, size, link) of every section, where
+    name is the offset of the name in the section name table
+    """
+    # sh_name, sh_type, sh_flags, sh_addr, sh_offset, sh_size, sh_link
+    fmt = header.endian + ("IIQQQQI" if header.is_64 else "IIIIIII")
+    sections = []
+    for i in range(header.shnum):
+        fp.seek(header.shoff + i * header.shentsize)
+        name, kind, _, _, offset, size, link = struct.unpack(
+            fmt, fp.read(struct.calcsize(fmt)))
+        sections.append((name, kind, offset, size, link))
+    return sections
+
+
+def _get_string(table, offset):
+    return table[offset:table.index(b"\0", offset)].decode(errors="replace")
+
+
+def get_sections(fp):
+    """
+    Returns a dict mapping the name of every section of the ELF file fp
+    to its (type, offset, size)
+    :param fp:
+    :return:
+    """
+    header = ElfHeader(fp)
+    sections = _read_section_headers(fp, header)
+    if header.shstrndx >= len(sections):
+        return {}
+    _, _, strtab_offset, strtab_size, _ = sections[header.shstrndx]
+    fp.seek(strtab_offset)
+    strtab = fp.read(strtab_size)
+    return {
+        _get_string(strtab, name): (kind, offset, size)
+        for name, kind, offset, size, _ in sections
+    }
+
+
+def get_dynamic(fp):
+    """
+    Reads the dynamic section of the ELF file fp. Returns its SONAME, or
+    None, the list of its DT_NEEDED libraries, and its RUNPATH, or RPATH,
+    split into directories. Static executables have no dynamic section,
+    and return (None, [], [])
+    :param fp:
+    :return:
+    """
+    header = ElfHeader(fp)
+    sections = _read_section_headers(fp, header)
+    dynamic = [i for i in sections if i[1] == SHT_DYNAMIC]
+    if not dynamic:
+        return None, [], []
+    _, _, offset, size, link = dynamic[0]
+    if link >= len(sections):
+        return None, [], []
+    _, _, strtab_offset, strtab_size, _ = sections[link]
+    fp.seek(strtab_offset)
+    strtab = fp.read(strtab_size)
+
+    entry = struct.Struct(header.endian + ("qQ" if header.is_64 else "iI"))
+    fp.seek(offset)
+    data = fp.read(size)
+    data = data[:len(data) - len(data) % entry.size]
+    soname, needed, rpath, runpath = None, [], None, None
+    for tag, value in entry.iter_unpack(data):
+        if tag == DT_NULL:
+            break
+        if tag == DT_NEEDED:
+            needed.append(_get_string(strtab, value))
+        elif tag == DT_SONAME:
+            soname = _get_string(strtab, value)
+        elif tag == DT_RPATH:
+            rpath = _get_string(strtab, value)
+        elif tag == DT_RUNPATH:
+            runpath = _get_string(strtab, value)
+    # the loader ignores RPATH when there is a RUNPATH
+    path = runpath if runpath is not None else rpath
+    return soname, needed, [i for i in (path or "").split(":") if i]
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import hashlib
+import json
+import os
+
+from .cache import get_interpreter_tag
+from ..utils import hash_file
+from ..version import __version__
+
+MANIFEST_FILE = "pyappimage-manifest.json"
+
+
+def hash_directory(directory):
+    """
+    Returns a sha256 digest over the relative paths, symlink targets and
+    file contents of a directory, in a stable order. Bytecode caches are
+    ignored as they are regenerated on import
+    :param directory:
+    :return:
+    """
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for f in sorted(files):
+            path = os.path.join(root, f)
+            digest.update(os.path.relpath(path, directory).encode())
+            digest.update(b'\0')
+            if os.path.islink(path):
+                digest.update(os.readlink(path).encode())
+            else:
+                digest.update(hash_file(path, "sha256").encode())
+            digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def compute_fingerprint(entrypoint, site_packages, parameters, extra=None):
+    """
+    Computes the fingerprint of every input which affects the output of
+    PyInstaller. If the fingerprint of two builds are equal, the
+    PyInstaller output of the former can be reused.
+    :param entrypoint: path to the generated entrypoint.py
+    :param site_packages: path to the installed site-packages
+    :param parameters: list of arguments passed to PyInstaller
+    :param extra: additional json serializable data affecting the output
+    :return:
+    """
+    try:
+        from PyInstaller import __version__ as pyinstaller_version
+    except ImportError:
+        pyinstaller_version = None
+    return {
+        "pyappimage": __version__,
+        "pyinstaller": pyinstaller_version,
+        "interpreter": get_interpreter_tag(),
+        "parameters": list(parameters),
+        "entrypoint": hash_file(entrypoint, "sha256"),
+        "site_packages": hash_directory(site_packages),
+        "extra": extra,
+    }
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r') as r:
+            return json.load(r)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(path, manifest):
+    with open(path + ".tmp", 'w') as w:
+        json.dump(manifest, w, indent=2)
+    os.replace(path + ".tmp", path)
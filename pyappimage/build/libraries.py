@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import functools
+import os
+
+from .elf import ELF_MAGIC, get_dynamic
+from .prune import PruneReport, compile_patterns
+
+# libraries which must come from the host, to match its kernel, its
+# drivers or its C library. Based on the excludelist of the AppImage
+# project
+EXCLUDELIST = (
+    # the C library and the dynamic loader
+    "ld-linux.so.2",
+    "ld-linux-x86-64.so.2",
+    "ld-linux-aarch64.so.1",
+    "ld-linux-armhf.so.3",
+    "libanl.so.1",
+    "libBrokenLocale.so.1",
+    "libc.so.6",
+    "libdl.so.2",
+    "libm.so.6",
+    "libmvec.so.1",
+    "libnsl.so.1",
+    "libnss_*.so.2",
+    "libpthread.so.0",
+    "libresolv.so.2",
+    "librt.so.1",
+    "libthread_db.so.1",
+    "libutil.so.1",
+    # OpenGL, which has to match the graphics driver of the host
+    "libdrm.so.2",
+    "libEGL.so.1",
+    "libgbm.so.1",
+    "libGL.so.1",
+    "libglapi.so.0",
+    "libGLdispatch.so.0",
+    "libGLX.so.0",
+    "libOpenGL.so.0",
+)
+
+# libraries which desktop distributions provide, but minimal and
+# container images often do not. They are only excluded when the name
+# of the set is added to exclude-libraries
+EXCLUDE_SETS = {
+    "desktop": (
+        # X11 and sound
+        "libasound.so.2",
+        "libxcb.so.1",
+        "libxcb-dri2.so.0",
+        "libxcb-dri3.so.0",
+        "libX11.so.6",
+        "libX11-xcb.so.1",
+        "libICE.so.6",
+        "libSM.so.6",
+        "libfontconfig.so.1",
+        "libfreetype.so.6",
+        "libharfbuzz.so.0",
+        "libjack.so.0",
+        "libpipewire-0.3.so.0",
+        # conflicting with the libraries of the host when bundled
+        "libcom_err.so.2",
+        "libexpat.so.1",
+        "libgpg-error.so.0",
+        "libusb-1.0.so.0",
+        "libuuid.so.1",
+        "libz.so.1",
+    ),
+}
+
+
+# libraries PyInstaller never collects, as it expects every host to
+# provide them. They are not removed from the bundle, but a file needing
+# them is not reported as unresolved. Only used when PyInstaller cannot
+# be imported, see is_collected_by_pyinstaller()
+PYINSTALLER_EXCLUDES = (
+    "ld-linux*.so*",
+    "libanl.so*",
+    "libBrokenLocale.so*",
+    "libc.so*",
+    "libcidn.so*",
+    "libcrypt.so*",
+    "libdl.so*",
+    "libdrm.so*",
+    "libEGL.so*",
+    "libGL.so*",
+    "libGLESv1_CM.so*",
+    "libGLESv2.so*",
+    "libGLX.so*",
+    "libOpenGL.so*",
+    "libglapi.so*",
+    "libGLdispatch.so*",
+    "libm.so*",
+    "libnsl.so*",
+    "libnss_*.so*",
+    "libpthread.so*",
+    "libresolv.so*",
+    "librt.so*",
+    "libthread_db.so*",
+    "libutil.so*",
+    "libxcb.so*",
+    "libxcb-dri*.so*",
+)
+
+
+def is_elf(path):
+    with open(path, 'rb') as r:
+        return r.read(4) == ELF_MAGIC
+
+
+def get_excludelist(patterns=()):
+    """
+    Returns the regular expressions matching the names of the libraries
+    to exclude, and the ones to keep. patterns are added to EXCLUDELIST,
+    names of EXCLUDE_SETS add the libraries of the set, and patterns
+    prefixed with ! keep the libraries of the baseline they match
+    :param patterns: the exclude-libraries of pyappimage.yml
+    :return:
+    """
+    excludelist = list(EXCLUDELIST)
+    for pattern in patterns:
+        excludelist.extend(EXCLUDE_SETS.get(pattern, (pattern,)))
+    return compile_patterns(excludelist)
+
+
+def _is_excluded(name, excludelist):
+    include, exclude = excludelist
+    return bool(include.match(name)) and not (exclude and exclude.match(name))
+
+
+@functools.lru_cache(maxsize=None)
+def is_collected_by_pyinstaller(name):
+    """
+    Returns whether PyInstaller would collect the library name, asking
+    the installed PyInstaller, whose excludes change between its
+    versions, or PYINSTALLER_EXCLUDES without it
+    :param name:
+    :return:
+    """
+    try:
+        from PyInstaller.depend.dylib import include_library
+    except ImportError:
+        include, _ = compile_patterns(PYINSTALLER_EXCLUDES)
+        return not include.match(name)
+    return bool(include_library(name))
+
+
+def _is_host_library(name, excludelist):
+    return _is_excluded(name, excludelist) or \
+        not is_collected_by_pyinstaller(name)
+
+
+def scan_libraries(directory):
+    """
+    Reads the dynamic section of every ELF file below directory. Returns
+    a dict mapping their paths to their (soname, needed, runpath)
+    :param directory:
+    :return:
+    """
+    libraries = {}
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for f in sorted(files):
+            path = os.path.join(root, f)
+            if os.path.islink(path) or not os.path.isfile(path):
+                continue
+            with open(path, 'rb') as r:
+                if r.read(4) != ELF_MAGIC:
+                    continue
+                try:
+                    libraries[path] = get_dynamic(r)
+                except Exception:
+                    # a truncated or unusual file, which the loader would
+                    # not load either
+                    continue
+    return libraries
+
+
+def exclude_libraries(directory, patterns=(), dry_run=False):
+    """
+    Removes the shared libraries below directory whose file name, or
+    SONAME, is on the excludelist, so that the ones of the host are
+    loaded instead. Returns a PruneReport
+    :param directory: the directory PyInstaller collected the app to
+    :param patterns: see get_excludelist()
+    :param dry_run: only report what would be removed
+    :return:
+    """
+    report = PruneReport()
+    excludelist = get_excludelist(patterns)
+    removed = set()
+    for path, (soname, _, _) in scan_libraries(directory).items():
+        if not any(_is_excluded(i, excludelist)
+                   for i in (os.path.basename(path), soname) if i):
+            continue
+        removed.add(os.path.realpath(path))
+        report.paths.append(path)
+        report.files += 1
+        report.bytes += os.path.getsize(path)
+    # symlinks to the removed libraries would be left dangling
+    for root, _, files in os.walk(directory):
+        for f in files:
+            path = os.path.join(root, f)
+            if os.path.islink(path) and os.path.realpath(path) in removed:
+                report.paths.append(path)
+                report.files += 1
+    if not dry_run:
+        for path in report.paths:
+            os.unlink(path)
+    return report
+
+
+def _get_search_path(path, runpath, root):
+    origin = os.path.dirname(path)
+    search = [
+        i.replace("$ORIGIN", origin).replace("${ORIGIN}", origin)
+        for i in runpath
+    ]
+    # directories of the build machine do not exist where the AppImage
+    # runs
+    return [i for i in search
+            if os.path.realpath(i).startswith(root + os.sep)]
+
+
+def get_library_path(directory, patterns=()):
+    """
+    Returns the directories below directory the loader has to search
+    for the libraries of the bundle, relative to directory. Libraries
+    found on the RUNPATH of the file needing them, or provided by the
+    host, do not need one. The directories are ordered by the number of
+    libraries found in them, with directory itself first, so that the
+    loader finds most libraries in the first directory it tries
+    :param directory: the directory PyInstaller collected the app to
+    :param patterns: see get_excludelist()
+    :return:
+    """
+    excludelist = get_excludelist(patterns)
+    root = os.path.realpath(directory)
+    libraries = scan_libraries(directory)
+    directories = sorted({os.path.dirname(i) for i in libraries})
+    found = {}
+    for path, (_, needed, runpath) in libraries.items():
+        search = _get_search_path(path, runpath, root)
+        for name in needed:
+            if _is_host_library(name, excludelist) or any(
+                    os.path.exists(os.path.join(i, name)) for i in search):
+                continue
+            for i in directories:
+                if os.path.exists(os.path.join(i, name)):
+                    found[i] = found.get(i, 0) + 1
+                    break
+    return [
+        os.path.relpath(i, directory) for i in sorted(
+            found, key=lambda x: (x != directory, -found[x], x))
+    ]
+
+
+def find_unresolved(directory, patterns=(), library_path=()):
+    """
+    Checks that every DT_NEEDED entry of the ELF files below directory
+    resolves, to a library of the bundle found on the RUNPATH of the file
+    or in directory, which the bootloader puts on the library path, or
+    to a library the host provides: one of the excludelist, or one
+    which PyInstaller never collects. Returns a
+    sorted list of (path, needed) which do not resolve
+    :param directory:
+    :param patterns: see get_excludelist()
+    :param library_path: other directories on the library path, relative
+        to directory, as returned by get_library_path()
+    :return:
+    """
+    excludelist = get_excludelist(patterns)
+    root = os.path.realpath(directory)
+    unresolved = []
+    for path, (_, needed, runpath) in scan_libraries(directory).items():
+        search = _get_search_path(path, runpath, root) + [directory] + [
+            os.path.join(directory, i) for i in library_path]
+        for name in needed:
+            if _is_host_library(name, excludelist):
+                continue
+            if not any(os.path.exists(os.path.join(i, name)) for i in search):
+                unresolved.append((os.path.relpath(path, directory), name))
+    return sorted(unresolved)
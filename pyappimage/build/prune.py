@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import os
+import re
+import shutil
+
+from ..utils import get_tree_size
+
+
+def translate(pattern):
+    """
+    Translates a glob pattern, relative to the pruned directory, into a
+    regular expression. * and ? do not match across directories, while
+    ** matches any number of directories
+    :param pattern:
+    :return:
+    """
+    pattern = pattern.strip('/')
+    i, n = 0, len(pattern)
+    regex = []
+    while i < n:
+        if pattern.startswith('**/', i):
+            regex.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            regex.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            regex.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            regex.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 1:]:
+            end = pattern.index(']', i + 2 if pattern[i + 1:i + 2] in
+                                ('!', ']') else i + 1)
+            group = pattern[i + 1:end]
+            if group.startswith('!'):
+                group = '^' + group[1:]
+            regex.append('[{}]'.format(group.replace('\\', '\\\\')))
+            i = end + 1
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(regex)
+
+
+def compile_patterns(patterns):
+    """
+    Compiles a list of patterns into a pair of regular expressions, one
+    matching the paths to remove and one matching the paths to keep.
+    Patterns prefixed with ! are kept, even if another pattern matches
+    them.
+    :param patterns:
+    :return:
+    """
+    include = [translate(i) for i in patterns if not i.startswith('!')]
+    exclude = [translate(i[1:]) for i in patterns if i.startswith('!')]
+
+    def _compile(regexes):
+        if not regexes:
+            return None
+        return re.compile('(?:{})$'.format('|'.join(regexes)))
+    return _compile(include), _compile(exclude)
+
+
+class PruneReport:
+    def __init__(self):
+        self.paths = []
+        self.files = 0
+        self.bytes = 0
+
+
+def prune(directory, patterns, dry_run=False):
+    """
+    Removes every file and directory in directory which matches one of
+    patterns, in a single walk of the tree. Matched directories are
+    removed with their contents. Returns a PruneReport
+    :param directory:
+    :param patterns: list of glob patterns, relative to directory
+    :param dry_run: only report what would be removed
+    :return:
+    """
+    report = PruneReport()
+    include, exclude = compile_patterns(patterns)
+    if include is None:
+        return report
+
+    def _matches(rel):
+        return include.match(rel) and not (exclude and exclude.match(rel))
+
+    for root, dirs, files in os.walk(directory):
+        rel_root = os.path.relpath(root, directory)
+        rel_root = '' if rel_root == '.' else rel_root + '/'
+        for d in list(dirs):
+            path = os.path.join(root, d)
+            if not _matches(rel_root + d):
+                continue
+            dirs.remove(d)
+            report.paths.append(path)
+            if os.path.islink(path):
+                report.files += 1
+                if not dry_run:
+                    os.unlink(path)
+                continue
+            files_count, size = get_tree_size(path)
+            report.files += files_count
+            report.bytes += size
+            if not dry_run:
+                shutil.rmtree(path)
+        for f in files:
+            if not _matches(rel_root + f):
+                continue
+            path = os.path.join(root, f)
+            report.paths.append(path)
+            report.files += 1
+            report.bytes += os.lstat(path).st_size
+            if not dry_run:
+                os.unlink(path)
+    return report
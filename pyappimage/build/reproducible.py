@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import hashlib
+import os
+import shutil
+import stat
+import subprocess
+
+from contextlib import contextmanager
+
+from ..utils import hash_file
+
+
+def get_source_date_epoch(directory="."):
+    """
+    Returns the timestamp reproducible builds record instead of the
+    current time: $SOURCE_DATE_EPOCH, else the time of the last commit
+    of the git repository at directory, else 0
+    :param directory:
+    :return:
+    """
+    epoch = os.getenv("SOURCE_DATE_EPOCH")
+    if epoch:
+        return int(epoch)
+    try:
+        output = subprocess.run(
+            ["git", "log", "-1", "--format=%ct"], cwd=directory,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 0
+    return int(output) if output else 0
+
+
+@contextmanager
+def keep_source_date_epoch():
+    """
+    Restores $SOURCE_DATE_EPOCH when the block, or the function it
+    decorates, returns, as builds set it for PyInstaller, which runs in
+    the same process, and a daemon or batch worker builds more than one
+    project
+    :return:
+    """
+    previous = os.environ.get("SOURCE_DATE_EPOCH")
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop("SOURCE_DATE_EPOCH", None)
+        else:
+            os.environ["SOURCE_DATE_EPOCH"] = previous
+
+
+def get_normalized_mode(mode):
+    if stat.S_ISDIR(mode) or mode & 0o111:
+        return 0o755
+    return 0o644
+
+
+def normalize_modes(directory):
+    """
+    Sets the permissions of every file and directory below directory to
+    0755 or 0644, depending on whether it is executable. Files are
+    hardlinked from the dependency cache and from the project, so a file
+    with other links is copied before its permissions are changed,
+    instead of changing them everywhere. Returns the number of files
+    changed
+    :param directory:
+    :return:
+    """
+    changed = 0
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for f in sorted(dirs + files):
+            path = os.path.join(root, f)
+            st = os.lstat(path)
+            if stat.S_ISLNK(st.st_mode):
+                continue
+            mode = get_normalized_mode(st.st_mode)
+            if stat.S_IMODE(st.st_mode) == mode:
+                continue
+            if stat.S_ISREG(st.st_mode) and st.st_nlink > 1:
+                tmp = path + ".pyappimage-copy"
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, path)
+            os.chmod(path, mode)
+            changed += 1
+    return changed
+
+
+def hash_tree(directory):
+    """
+    Returns a dict mapping the path of every entry below directory to
+    a digest of its type, permissions and content, or link target.
+    Timestamps and ownership are left out, mksquashfs normalizes them
+    :param directory:
+    :return:
+    """
+    digests = {}
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for f in sorted(dirs + files):
+            path = os.path.join(root, f)
+            st = os.lstat(path)
+            if stat.S_ISLNK(st.st_mode):
+                content = "link:" + os.readlink(path)
+            elif stat.S_ISREG(st.st_mode):
+                content = "file:" + hash_file(path)
+            else:
+                content = "dir"
+            digests[os.path.relpath(path, directory)] = hashlib.blake2b(
+                "{:o}:{}".format(stat.S_IMODE(st.st_mode), content).encode()
+            ).hexdigest()
+    return digests
+
+
+def compare_trees(first, second):
+    """
+    Returns the sorted paths whose digests differ between first and
+    second, as returned by hash_tree, including paths missing from
+    either
+    :param first:
+    :param second:
+    :return:
+    """
+    return sorted(
+        i for i in set(first) | set(second)
+        if first.get(i) != second.get(i))
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import lzma
+import struct
+import zlib
+
+from .elf import get_elf_size
+
+SQUASHFS_MAGIC = b"hsqs"
+
+SUPERBLOCK = struct.Struct("<4sIIIIHHHHHHQQQQQQQQ")
+SUPERBLOCK_FIELDS = (
+    "magic", "inode_count", "mod_time", "block_size", "fragment_count",
+    "compressor", "block_log", "flags", "id_count", "version_major",
+    "version_minor", "root_inode", "bytes_used", "id_table",
+    "xattr_table", "inode_table", "directory_table", "fragment_table",
+    "export_table",
+)
+
+COMPRESSORS = {1: "gzip", 2: "lzma", 3: "lzo", 4: "xz", 5: "lz4", 6: "zstd"}
+
+# inode types, the extended types are the basic ones plus 7
+DIRECTORY, FILE, SYMLINK = 1, 2, 3
+EXTENDED = 7
+
+INODE_HEADER = struct.Struct("<HHHHII")
+DIRECTORY_INODE = struct.Struct("<IIHHI")
+EXTENDED_DIRECTORY_INODE = struct.Struct("<IIIIHHI")
+FILE_INODE = struct.Struct("<IIII")
+EXTENDED_FILE_INODE = struct.Struct("<QQQIIII")
+DIRECTORY_HEADER = struct.Struct("<III")
+DIRECTORY_ENTRY = struct.Struct("<HhHH")
+
+METADATA_SIZE = 8192
+METADATA_UNCOMPRESSED = 0x8000
+DATA_UNCOMPRESSED = 1 << 24
+NO_FRAGMENT = 0xffffffff
+
+
+def get_decompressor(compressor):
+    """
+    Returns a function decompressing a block of compressor. zstd needs
+    the zstandard module
+    :param compressor: the compressor id of the superblock
+    :return:
+    """
+    name = COMPRESSORS.get(compressor, str(compressor))
+    if name == "gzip":
+        return zlib.decompress
+    if name in ("xz", "lzma"):
+        return lzma.decompress
+    if name == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError(
+                "Reading zstd compressed images needs the zstandard module, "
+                "install it with pip install zstandard")
+        decompressor = zstandard.ZstdDecompressor()
+        return lambda data: decompressor.decompress(
+            data, max_output_size=METADATA_SIZE)
+    raise RuntimeError("{} compressed images are not supported".format(name))
+
+
+class SquashfsFile:
+    def __init__(self, path, mode, size, stored, start_block, link=None):
+        self.path = path
+        self.mode = mode
+        self.size = size
+        # bytes of the data blocks, without the tail packed in a fragment
+        self.stored = stored
+        self.start_block = start_block
+        self.link = link
+
+
+class SquashfsImage:
+    """
+    Reads the superblock, the inode table and the directory table of a
+    squashfs image, which is enough to list every file with its size
+    without reading or decompressing any file data.
+    """
+
+    def __init__(self, fp, offset=0):
+        self.fp = fp
+        self.offset = offset
+        fp.seek(offset)
+        data = fp.read(SUPERBLOCK.size)
+        if len(data) < SUPERBLOCK.size or data[:4] != SQUASHFS_MAGIC:
+            raise ValueError("No squashfs image at offset {}".format(offset))
+        self.superblock = dict(zip(SUPERBLOCK_FIELDS, SUPERBLOCK.unpack(data)))
+        if self.superblock["version_major"] != 4:
+            raise ValueError("Only squashfs 4.0 images are supported")
+        self.block_size = self.superblock["block_size"]
+        self.compression = COMPRESSORS.get(
+            self.superblock["compressor"], "unknown")
+        self._decompress = None
+        self._blocks = {}
+
+    @classmethod
+    def from_appimage(cls, fp):
+        return cls(fp, offset=get_elf_size(fp))
+
+    def _read_block(self, position):
+        """
+        Returns the uncompressed metadata block at position, relative to
+        the image, and the position of the next block
+        """
+        if position not in self._blocks:
+            self.fp.seek(self.offset + position)
+            header, = struct.unpack("<H", self.fp.read(2))
+            size = header & ~METADATA_UNCOMPRESSED
+            data = self.fp.read(size)
+            if not header & METADATA_UNCOMPRESSED:
+                if self._decompress is None:
+                    self._decompress = get_decompressor(
+                        self.superblock["compressor"])
+                data = self._decompress(data)
+            self._blocks[position] = (data, position + 2 + size)
+        return self._blocks[position]
+
+    class _Cursor:
+        def __init__(self, image, table, block, offset):
+            self.image, self.table = image, table
+            self.block, self.offset = block, offset
+
+        def read(self, size):
+            result = b""
+            while len(result) < size:
+                data, position_next = self.image._read_block(
+                    self.table + self.block)
+                chunk = data[self.offset:self.offset + size - len(result)]
+                result += chunk
+                self.offset += len(chunk)
+                if self.offset >= len(data):
+                    self.block = position_next - self.table
+                    self.offset = 0
+            return result
+
+    def _read_inode(self, block, offset):
+        cursor = self._Cursor(
+            self, self.superblock["inode_table"], block, offset)
+        kind, mode, _, _, _, _ = INODE_HEADER.unpack(
+            cursor.read(INODE_HEADER.size))
+        inode = {"type": kind, "mode": mode}
+        if kind == DIRECTORY:
+            start, _, size, dir_offset, _ = DIRECTORY_INODE.unpack(
+                cursor.read(DIRECTORY_INODE.size))
+            inode.update(start=start, size=size, offset=dir_offset)
+        elif kind == DIRECTORY + EXTENDED:
+            _, size, start, _, _, dir_offset, _ = \
+                EXTENDED_DIRECTORY_INODE.unpack(
+                    cursor.read(EXTENDED_DIRECTORY_INODE.size))
+            inode.update(start=start, size=size, offset=dir_offset)
+        elif kind in (FILE, FILE + EXTENDED):
+            if kind == FILE:
+                start, fragment, _, size = FILE_INODE.unpack(
+                    cursor.read(FILE_INODE.size))
+            else:
+                start, size, _, _, fragment, _, _ = \
+                    EXTENDED_FILE_INODE.unpack(
+                        cursor.read(EXTENDED_FILE_INODE.size))
+            if fragment == NO_FRAGMENT:
+                blocks = -(-size // self.block_size)
+            else:
+                blocks = size // self.block_size
+            sizes = struct.unpack(
+                "<{}I".format(blocks), cursor.read(4 * blocks))
+            inode.update(
+                start=start, size=size,
+                stored=sum(i & ~DATA_UNCOMPRESSED for i in sizes))
+        elif kind in (SYMLINK, SYMLINK + EXTENDED):
+            _, target_size = struct.unpack("<II", cursor.read(8))
+            inode.update(link=cursor.read(target_size).decode(
+                errors="replace"))
+        return inode
+
+    def _list_directory(self, inode):
+        """
+        Yields the (name, inode block, inode offset) of the entries of a
+        directory inode
+        """
+        # the listing size of a directory counts 3 bytes for . and ..
+        remaining = inode["size"] - 3
+        cursor = self._Cursor(
+            self, self.superblock["directory_table"], inode["start"],
+            inode["offset"])
+        while remaining > 0:
+            count, start, _ = DIRECTORY_HEADER.unpack(
+                cursor.read(DIRECTORY_HEADER.size))
+            remaining -= DIRECTORY_HEADER.size
+            for _ in range(count + 1):
+                offset, _, _, name_size = DIRECTORY_ENTRY.unpack(
+                    cursor.read(DIRECTORY_ENTRY.size))
+                name = cursor.read(name_size + 1).decode(errors="replace")
+                remaining -= DIRECTORY_ENTRY.size + name_size + 1
+                yield name, start, offset
+
+    def walk(self):
+        """
+        Yields a SquashfsFile for every regular file and symlink in the
+        image, with its path relative to the root of the image
+        :return:
+        """
+        root = self.superblock["root_inode"]
+        stack = [("", root >> 16, root & 0xffff)]
+        while stack:
+            path, block, offset = stack.pop()
+            inode = self._read_inode(block, offset)
+            kind = inode["type"]
+            if kind in (DIRECTORY, DIRECTORY + EXTENDED):
+                for name, i_block, i_offset in self._list_directory(inode):
+                    stack.append(
+                        (path + "/" + name if path else name,
+                         i_block, i_offset))
+            elif kind in (FILE, FILE + EXTENDED):
+                yield SquashfsFile(
+                    path, inode["mode"], inode["size"], inode["stored"],
+                    inode["start"])
+            elif kind in (SYMLINK, SYMLINK + EXTENDED):
+                yield SquashfsFile(
+                    path, inode["mode"], 0, 0, None, link=inode["link"])
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import json
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+
+from ..version import __version__
+
+
+class Tracer:
+    """
+    Records the duration of the phases of a build as spans. Each span
+    has a name and a dict of arguments, like the number of files or
+    bytes it processed, which the phase fills in while it runs.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.spans = []
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, **args):
+        """
+        Times the body of the with statement. The yielded dict is stored
+        as the arguments of the span.
+        :param name:
+        :param args: initial arguments of the span
+        :return:
+        """
+        start = time.perf_counter() - self._origin
+        try:
+            yield args
+        finally:
+            self.spans.append({
+                "name": name,
+                "start": start,
+                "duration": time.perf_counter() - self._origin - start,
+                "tid": threading.get_ident(),
+                "args": args,
+            })
+
+    def to_chrome_trace(self):
+        """
+        Returns the spans in the Chrome trace event format, which can be
+        loaded in chrome://tracing or Perfetto. The plain spans are kept
+        under the spans key for scripts comparing builds.
+        :return:
+        """
+        pid = os.getpid()
+        events = [{
+            "name": "process_name", "ph": "M", "pid": pid,
+            "args": {"name": "pyappimage {}".format(self.name or "")},
+        }]
+        for span in self.spans:
+            events.append({
+                "name": span["name"],
+                "cat": "build",
+                "ph": "X",
+                "ts": span["start"] * 1e6,
+                "dur": span["duration"] * 1e6,
+                "pid": pid,
+                "tid": span["tid"],
+                "args": span["args"],
+            })
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "pyappimage": __version__,
+            "app": self.name,
+            "started_at": self.started_at,
+            "spans": [
+                {"name": i["name"], "start": i["start"],
+                 "duration": i["duration"], "args": i["args"]}
+                for i in self.spans
+            ],
+        }
+
+    def write(self, path):
+        with open(path, 'w') as w:
+            json.dump(self.to_chrome_trace(), w, indent=2, default=str)
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import fcntl
+import hashlib
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from .cache import get_cache_directory, get_interpreter_tag
+from ..constants import SEPARATOR
+from ..version import __version__
+
+_ = shlex.split
+
+SDIST_EXTENSIONS = ('.tar.gz', '.tar.bz2', '.tar.xz', '.tgz', '.zip')
+
+# packages needed to build the project wheel without network access,
+# the build requirements of projects which do not declare theirs
+BUILD_REQUIREMENTS = ('setuptools', 'wheel')
+
+# lines of pip output kept in memory for the error of a failed run
+TAIL_LINES = 50
+MAX_LINE_LENGTH = 64 * 1024
+
+_log_lock = threading.Lock()
+
+
+def get_wheelhouse_directory():
+    """
+    Returns the directory where the wheels of the dependencies are
+    stored. Wheels are not portable across interpreters, so each
+    interpreter gets a wheelhouse of its own
+    :return:
+    """
+    wheelhouse = os.path.join(
+        get_cache_directory(), "wheelhouse", get_interpreter_tag())
+    os.makedirs(wheelhouse, exist_ok=True)
+    return wheelhouse
+
+
+@contextmanager
+def wheelhouse_lock(wheelhouse, exclusive=False):
+    """
+    Locks the wheelhouse, so that concurrent builds can share it. Builds
+    reading from the wheelhouse hold a shared lock, while builds adding
+    wheels to it hold an exclusive lock
+    :param wheelhouse:
+    :param exclusive:
+    :return:
+    """
+    with open(os.path.join(wheelhouse, ".lock"), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+@contextmanager
+def project_lock(project_directory):
+    """
+    Locks the source tree of a project while its wheel is built, as
+    setuptools writes its build directory and egg-info into the tree,
+    and concurrent builds of the project, like the ones of a matrix
+    build, would race on them
+    :param project_directory:
+    :return:
+    """
+    lock_directory = os.path.join(get_cache_directory(), "locks")
+    os.makedirs(lock_directory, exist_ok=True)
+    name = hashlib.sha256(
+        os.path.realpath(project_directory).encode()).hexdigest()[:32]
+    with open(os.path.join(lock_directory, name + ".lock"), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def start_log(log_file):
+    with open(log_file, 'w') as fp:
+        fp.write("PyAppImage v{}\n".format(__version__))
+
+
+def run_pip(pip, args, log_file, check=True, label=None, progress=None):
+    """
+    Runs pip with args, and streams its output to log_file line by line
+    as it is produced, so that the log of a hung or long install can be
+    followed while it runs. Only the last lines of the output are kept
+    in memory, to be reported if pip fails
+    :param pip: the pip command
+    :param args: list of arguments passed to pip
+    :param log_file:
+    :param check: raise CalledProcessError if pip fails
+    :param label: prefixed to every line, to tell concurrent runs apart
+    :param progress: called with every line of output, e.g. to display it
+    :return:
+    """
+    command = _(pip) + list(args)
+    prefix = "[{}] ".format(label) if label else ""
+    tail = deque(maxlen=TAIL_LINES)
+    with _log_lock, open(log_file, 'a') as fp:
+        fp.write(SEPARATOR)
+        fp.write("{}$ {}\n".format(prefix, ' '.join(command)))
+    _pip_proc = subprocess.Popen(
+        command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT)
+    try:
+        with open(log_file, 'a') as fp:
+            while True:
+                # lines are bounded, in case a progress bar never ends one
+                line = _pip_proc.stdout.readline(MAX_LINE_LENGTH)
+                if not line:
+                    break
+                line = line.decode(errors='replace').rstrip('\r\n')
+                tail.append(line)
+                with _log_lock:
+                    fp.write("{}{}\n".format(prefix, line))
+                    fp.flush()
+                if progress is not None:
+                    progress(line)
+            returncode = _pip_proc.wait()
+            with _log_lock:
+                fp.write("{}pip exited with {}\n".format(prefix, returncode))
+    except BaseException:
+        _pip_proc.kill()
+        _pip_proc.wait()
+        raise
+    finally:
+        _pip_proc.stdout.close()
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(
+            returncode, command, output='\n'.join(tail))
+    return subprocess.CompletedProcess(command, returncode, '\n'.join(tail))
+
+
+def _parse_build_requires(text):
+    """
+    Reads the requires array of the build-system table of pyproject.toml,
+    for interpreters without tomllib or tomli
+    """
+    table = re.search(
+        r'^\[build-system\][ \t]*$(.*?)(?=^\[|\Z)', text, re.M | re.S)
+    if table is None:
+        return None
+    requires = re.search(r'^requires\s*=\s*\[(.*?)\]', table.group(1),
+                         re.M | re.S)
+    if requires is None:
+        return None
+    return [i[1] for i in re.findall(
+        r'(["\'])(.*?)\1', re.sub(r'#[^\n]*', '', requires.group(1)))]
+
+
+def get_build_requirements(project_directory):
+    """
+    Returns the build requirements of the project, from the build-system
+    table of its pyproject.toml. Projects which do not declare them are
+    built with setuptools. The requirements every project needs for
+    setuptools are included too
+    :param project_directory:
+    :return:
+    """
+    requires = None
+    pyproject = os.path.join(project_directory, 'pyproject.toml')
+    if os.path.exists(pyproject):
+        with open(pyproject, 'r') as r:
+            text = r.read()
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                tomllib = None
+        if tomllib is None:
+            requires = _parse_build_requires(text)
+        else:
+            requires = tomllib.loads(text).get(
+                'build-system', {}).get('requires')
+    return list(BUILD_REQUIREMENTS) + [
+        i for i in requires or () if i not in BUILD_REQUIREMENTS]
+
+
+def build_wheels(pip, wheelhouse, log_file, jobs=None, progress=None):
+    """
+    Builds a wheel for every source distribution in the wheelhouse,
+    in parallel. The source distributions are removed once their wheel
+    is built, so that only wheels are left in the wheelhouse.
+    :param pip:
+    :param wheelhouse:
+    :param log_file:
+    :param jobs: number of concurrent builds, defaults to the cpu count
+    :param progress: called with every line of pip output
+    :return:
+    """
+    sdists = [
+        os.path.join(wheelhouse, i) for i in sorted(os.listdir(wheelhouse))
+        if i.endswith(SDIST_EXTENSIONS)
+    ]
+
+    def _build(sdist):
+        run_pip(pip, [
+            'wheel', '--no-deps', '--wheel-dir', wheelhouse, sdist
+        ], log_file, label=os.path.basename(sdist), progress=progress)
+        os.remove(sdist)
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        # list() re-raises the first build failure
+        list(pool.map(_build, sdists))
+
+
+def populate_wheelhouse(pip, specs, wheelhouse, log_file, jobs=None,
+                        progress=None):
+    """
+    Resolves specs, and stores a wheel for each of them and their
+    dependencies in the wheelhouse, along with the build requirements of
+    the projects, which pip download does not keep. This is the only
+    step which needs network access.
+    :param pip:
+    :param specs: requirement specifiers or project directories
+    :param wheelhouse:
+    :param log_file:
+    :param jobs:
+    :param progress:
+    :return:
+    """
+    build_requirements = list(BUILD_REQUIREMENTS)
+    for i in specs:
+        if os.path.isdir(i):
+            build_requirements += [
+                j for j in get_build_requirements(i)
+                if j not in build_requirements]
+    with wheelhouse_lock(wheelhouse, exclusive=True):
+        run_pip(pip, [
+            'download', '--dest', wheelhouse, '--find-links', wheelhouse
+        ] + build_requirements + list(specs), log_file,
+            progress=progress)
+        build_wheels(pip, wheelhouse, log_file, jobs=jobs, progress=progress)
+
+
+def build_project_wheel(pip, project_directory, wheel_directory,
+                        wheelhouse, log_file, progress=None,
+                        allow_index=False):
+    """
+    Builds the wheel of the project without network access, using the
+    build requirements from the wheelhouse. Returns the path to the
+    wheel
+    :param pip:
+    :param project_directory:
+    :param wheel_directory:
+    :param wheelhouse:
+    :param log_file:
+    :param progress:
+    :param allow_index: if the offline build fails, build again with the
+        package index, for backends which ask for more requirements at
+        build time than they declare
+    :return:
+    """
+    if os.path.exists(wheel_directory):
+        shutil.rmtree(wheel_directory)
+    os.makedirs(wheel_directory)
+    args = ['wheel', '--no-deps', '--find-links', wheelhouse,
+            '--wheel-dir', wheel_directory, project_directory]
+    with project_lock(project_directory), wheelhouse_lock(wheelhouse):
+        try:
+            run_pip(pip, args + ['--no-index'], log_file, progress=progress)
+        except subprocess.CalledProcessError:
+            if not allow_index:
+                raise
+            run_pip(pip, args, log_file, progress=progress)
+    return [
+        os.path.join(wheel_directory, i)
+        for i in os.listdir(wheel_directory) if i.endswith('.whl')
+    ][0]
+
+
+def install_offline(pip, specs, prefix, wheelhouse, log_file,
+                    progress=None):
+    """
+    Installs specs and all their dependencies into prefix in a single
+    pass, using only the wheels in the wheelhouse
+    :param pip:
+    :param specs:
+    :param prefix:
+    :param wheelhouse:
+    :param log_file:
+    :param progress:
+    :return:
+    """
+    with wheelhouse_lock(wheelhouse):
+        run_pip(pip, [
+            'install', '--prefix', prefix, '--ignore-installed',
+            '--no-index', '--find-links', wheelhouse
+        ] + list(specs), log_file, progress=progress)
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+--------------
+This file is a part of the PyAppImage Python AppImage builder
+"""
+
+import hashlib
+import itertools
+import math
+import mmap
+import operator
+import os
+import struct
+
+from concurrent.futures import ProcessPoolExecutor
+from email.utils import formatdate
+
+from .elf import get_sections
+
+ZSYNC_VERSION = "0.6.2"
+
+# the section of the type 2 runtime reserved for the update information
+UPDATE_INFORMATION_SECTION = ".upd_info"
+
+# blocks checksummed by each worker
+CHUNK_BLOCKS = 4096
+
+# offsets of the seed whose rolling checksums are computed at once
+SEED_CHUNK = 1024 * 1024
+
+_MASK = 0xffffffff
+
+
+def _rotl(x, s):
+    return ((x << s) | (x >> (32 - s))) & _MASK
+
+
+def _md4(data):
+    """
+    MD4, which zsync uses for its block checksums, for when hashlib is
+    built against an OpenSSL without it
+    """
+    length = len(data)
+    data = bytes(data) + b"\x80" + b"\0" * ((55 - length) % 64) + \
+        struct.pack("<Q", length * 8)
+    h = [0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476]
+    for offset in range(0, len(data), 64):
+        x = struct.unpack("<16I", data[offset:offset + 64])
+        a, b, c, d = h
+        for i in range(16):
+            a = _rotl((a + ((b & c) | (~b & d)) + x[i]) & _MASK,
+                      (3, 7, 11, 19)[i % 4])
+            a, b, c, d = d, a, b, c
+        for i in range(16):
+            a = _rotl((a + ((b & c) | (b & d) | (c & d)) +
+                       x[(i % 4) * 4 + i // 4] + 0x5a827999) & _MASK,
+                      (3, 5, 9, 13)[i % 4])
+            a, b, c, d = d, a, b, c
+        for i in range(16):
+            a = _rotl((a + (b ^ c ^ d) +
+                       x[(0, 8, 4, 12, 2, 10, 6, 14,
+                          1, 9, 5, 13, 3, 11, 7, 15)[i]] +
+                       0x6ed9eba1) & _MASK,
+                      (3, 9, 11, 15)[i % 4])
+            a, b, c, d = d, a, b, c
+        h = [(i + j) & _MASK for i, j in zip(h, (a, b, c, d))]
+    return struct.pack("<4I", *h)
+
+
+def get_md4():
+    try:
+        hashlib.new("md4")
+    except ValueError:
+        return _md4
+    return lambda data: hashlib.new("md4", data).digest()
+
+
+def rsum(block):
+    """
+    Returns the rolling checksum of zsync for block, as a 32 bit integer.
+    a is the sum of the bytes, and b the sum of the running sums of a
+    :param block:
+    :return:
+    """
+    a = sum(block) & 0xffff
+    b = sum(itertools.accumulate(block)) & 0xffff
+    return (a << 16) | b
+
+
+def get_block_size(length):
+    return 2048 if length < 100000000 else 4096
+
+
+def get_hash_lengths(length, block_size):
+    """
+    Returns the number of sequential matches, and the bytes of the rolling
+    checksum and of the MD4 checksum stored per block, as zsyncmake
+    computes them for a file of length
+    :param length:
+    :param block_size:
+    :return:
+    """
+    seq_matches = 2 if length > block_size else 1
+    length = max(length, 1)
+    rsum_bytes = math.ceil(
+        ((math.log(length) + math.log(block_size)) / math.log(2) - 8.6)
+        / seq_matches / 8)
+    rsum_bytes = min(4, max(2, rsum_bytes))
+    checksum_bytes = math.ceil(
+        (20 + (math.log(length) + math.log(1 + length // block_size))
+         / math.log(2)) / seq_matches / 8)
+    checksum_bytes = max(checksum_bytes, int(
+        (7.9 + (20 + math.log(1 + length // block_size) / math.log(2))) / 8))
+    return seq_matches, rsum_bytes, min(16, checksum_bytes)
+
+
+def _checksum_blocks(path, block_size, first, last, rsum_bytes,
+                     checksum_bytes):
+    """
+    Returns the checksums of blocks first to last of path. The last block
+    is padded with zeros. Runs in a worker process, which maps the file,
+    so only the blocks being checksummed are in memory
+    """
+    md4 = get_md4()
+    result = []
+    with open(path, 'rb') as r, \
+            mmap.mmap(r.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        for i in range(first, last):
+            block = m[i * block_size:(i + 1) * block_size]
+            if len(block) < block_size:
+                block += b"\0" * (block_size - len(block))
+            result.append(
+                struct.pack(">I", rsum(block))[4 - rsum_bytes:] +
+                md4(block)[:checksum_bytes])
+    return b"".join(result)
+
+
+def make_zsync(path, output=None, url=None, block_size=None, mtime=None,
+               jobs=None):
+    """
+    Writes the .zsync control file of path, which lets zsync clients
+    download only the blocks which changed since the version they have.
+    The file is hashed in a streaming pass, and the block checksums are
+    computed on a pool of processes, so memory use does not grow with
+    the size of the file
+    :param path:
+    :param output: defaults to path with a .zsync suffix
+    :param url: URL of the file, relative to the .zsync file by default
+    :param block_size: defaults to the block size zsyncmake would use
+    :param mtime: modification time recorded, defaults to the file's
+    :param jobs:
+    :return: the path to the .zsync file
+    """
+    output = output or path + ".zsync"
+    length = os.path.getsize(path)
+    block_size = block_size or get_block_size(length)
+    seq_matches, rsum_bytes, checksum_bytes = \
+        get_hash_lengths(length, block_size)
+    blocks = -(-length // block_size)
+
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as r:
+        for chunk in iter(lambda: r.read(1024 * 1024), b""):
+            sha1.update(chunk)
+
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        futures = [
+            pool.submit(_checksum_blocks, path, block_size, i,
+                        min(blocks, i + CHUNK_BLOCKS), rsum_bytes,
+                        checksum_bytes)
+            for i in range(0, blocks, CHUNK_BLOCKS)
+        ]
+        checksums = [i.result() for i in futures]
+
+    if mtime is None:
+        mtime = os.path.getmtime(path)
+    header = (
+        "zsync: {version}\n"
+        "Filename: {filename}\n"
+        "MTime: {mtime}\n"
+        "Blocksize: {block_size}\n"
+        "Length: {length}\n"
+        "Hash-Lengths: {seq_matches},{rsum_bytes},{checksum_bytes}\n"
+        "URL: {url}\n"
+        "SHA-1: {sha1}\n"
+        "\n"
+    ).format(
+        version=ZSYNC_VERSION,
+        filename=os.path.basename(path),
+        mtime=formatdate(mtime)[:-5] + "+0000",
+        block_size=block_size,
+        length=length,
+        seq_matches=seq_matches,
+        rsum_bytes=rsum_bytes,
+        checksum_bytes=checksum_bytes,
+        url=url or os.path.basename(path),
+        sha1=sha1.hexdigest(),
+    )
+    with open(output + ".part", 'wb') as w:
+        w.write(header.encode())
+        for i in checksums:
+            w.write(i)
+    os.replace(output + ".part", output)
+    return output
+
+
+def load_zsync(path):
+    """
+    Reads a .zsync file. Returns its headers, and the (rsum, checksum) of
+    every block
+    :param path:
+    :return:
+    """
+    headers = {}
+    with open(path, 'rb') as r:
+        for line in iter(r.readline, b""):
+            line = line.decode().rstrip("\n")
+            if not line:
+                break
+            key, _, value = line.partition(": ")
+            headers[key] = value
+        data = r.read()
+    _, rsum_bytes, checksum_bytes = (
+        int(i) for i in headers["Hash-Lengths"].split(","))
+    size = rsum_bytes + checksum_bytes
+    blocks = [
+        (int.from_bytes(data[i:i + rsum_bytes], "big"),
+         data[i + rsum_bytes:i + size])
+        for i in range(0, len(data), size)
+    ]
+    return headers, blocks
+
+
+def rolling_sums(data, block_size):
+    """
+    Yields the rsum() of the block at every offset of data, in order.
+    The sums of every window are derived from prefix sums of data, like
+    the rolling update of zsync does byte by byte, but with map and
+    accumulate doing the iteration instead of a Python loop
+    :param data: a bytes-like object
+    :param block_size:
+    :return:
+    """
+    count = len(data) - block_size + 1
+    if count <= 0:
+        return iter(())
+    # a is the sum of the window, and b the sum of its running sums,
+    # which is the difference of the prefix sums of the prefix sums
+    sums = [0]
+    sums.extend(itertools.accumulate(data))
+    sums_of_sums = [0]
+    sums_of_sums.extend(itertools.accumulate(itertools.islice(sums, 1, None)))
+    a = map(operator.sub, sums[block_size:], sums[:count])
+    b = map(operator.sub,
+            map(operator.sub, sums_of_sums[block_size:],
+                sums_of_sums[:count]),
+            map(operator.mul, sums[:count], itertools.repeat(block_size)))
+    mask = itertools.repeat(0xffff)
+    return map(operator.or_,
+               map(operator.lshift, map(operator.and_, a, mask),
+                   itertools.repeat(16)),
+               map(operator.and_, b, mask))
+
+
+def plan_update(zsync_file, seed):
+    """
+    Works out which blocks of the file described by zsync_file a zsync
+    client holding seed, e.g. the previous release, would download.
+    Blocks are looked up at every offset of seed with the rolling
+    checksum, and confirmed with their MD4 checksum. A match continues
+    after the matched block, like zsync does. Returns the number of
+    blocks, the number of blocks found in seed, the bytes left to
+    download, and the (start, end) byte ranges they are in
+    :param zsync_file:
+    :param seed:
+    :return:
+    """
+    headers, blocks = load_zsync(zsync_file)
+    block_size = int(headers["Blocksize"])
+    length = int(headers["Length"])
+    _, rsum_bytes, checksum_bytes = (
+        int(i) for i in headers["Hash-Lengths"].split(","))
+    mask = (1 << (8 * rsum_bytes)) - 1
+    md4 = get_md4()
+
+    wanted = {}
+    for index, (r, checksum) in enumerate(blocks):
+        wanted.setdefault(r, []).append((index, checksum))
+    found = set()
+
+    def _match(block):
+        candidates = wanted.get(rsum(block) & mask) if block else None
+        matched = False
+        if candidates:
+            checksum = md4(block)[:checksum_bytes]
+            for index, expected in candidates:
+                if index not in found and checksum == expected:
+                    found.add(index)
+                    matched = True
+        return matched
+
+    with open(seed, 'rb') as fp:
+        size = os.fstat(fp.fileno()).st_size
+        m = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) \
+            if size else b""
+
+        def _scan(start):
+            """
+            Returns the first offset from start where a block of the file
+            is found, or None. The chunks scanned grow, as a block found
+            after a few bytes, e.g. after an insertion, is the common case
+            """
+            chunk = 4 * block_size
+            while start + block_size <= size:
+                sums = map(operator.and_, rolling_sums(
+                    m[start:start + chunk + block_size - 1], block_size),
+                    itertools.repeat(mask))
+                for offset in itertools.compress(
+                        itertools.count(start),
+                        map(wanted.__contains__, sums)):
+                    if _match(m[offset:offset + block_size]):
+                        return offset
+                start += chunk
+                chunk = min(2 * chunk, SEED_CHUNK)
+            return None
+
+        try:
+            position = 0
+            while position + block_size <= size:
+                # blocks which did not move are found without scanning
+                if _match(m[position:position + block_size]):
+                    position += block_size
+                    continue
+                offset = _scan(position + 1)
+                if offset is None:
+                    break
+                position = offset + block_size
+            # the last block of the file is padded with zeros, so it is
+            # found at the end of seed if seed ends with the same bytes
+            tail_length = length % block_size
+            if tail_length and size >= tail_length:
+                _match(m[size - tail_length:] +
+                       b"\0" * (block_size - tail_length))
+        finally:
+            if size:
+                m.close()
+
+    ranges = []
+    for i in range(len(blocks)):
+        if i in found:
+            continue
+        start, end = i * block_size, min(length, (i + 1) * block_size)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    download = sum(end - start for start, end in ranges)
+    return len(blocks), len(found), download, ranges
+
+
+def embed_update_information(appimage, update_information):
+    """
+    Writes update_information to the section of the runtime reserved for
+    it, so that AppImageUpdate and the runtime can find the update
+    :param appimage:
+    :param update_information: e.g.
+        gh-releases-zsync|user|repo|latest|myapp-*x86_64.AppImage.zsync
+    :return:
+    """
+    data = update_information.encode()
+    with open(appimage, 'r+b') as fp:
+        sections = get_sections(fp)
+        if UPDATE_INFORMATION_SECTION not in sections:
+            raise ValueError(
+                "The AppImage runtime has no {} section".format(
+                    UPDATE_INFORMATION_SECTION))
+        _, offset, size = sections[UPDATE_INFORMATION_SECTION]
+        if len(data) > size:
+            raise ValueError(
+                "The update information is longer than {} bytes".format(size))
+        fp.seek(offset)
+        fp.write(data + b"\0" * (size - len(data)))
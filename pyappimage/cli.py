@@ -27,6 +27,7 @@ This file is a part of the PyAppImage Python AppImage builder
 """
 
 
+import json
 import os
 import shutil
 import sys
@@ -34,19 +35,19 @@ import sys
 import click
 from .version import __version__
 from . import __doc__ as lic
-from .build.build import build as pyappimage_build
 from .utils import (
     get_input_else_default,
+    get_tree_size,
+    human_size,
+    parse_size,
     verify_bundle_id,
     verify_categories,
     verify_entrypoint,
 )
 
-try:
-    from yaml import CLoader as Loader, CDumper as Dumper
-except ImportError:
-    from yaml import Loader, Dumper
-import yaml
+# the subcommands import what they need themselves, so that the light ones,
+# like --version, do not pay for importing yaml, PyInstaller and the build
+# modules
 
 
 def show_version(ctx, param, value):
@@ -131,6 +132,8 @@ def generate():
         _type=str,
         verify=os.path.exists,
     )
+    import yaml
+
     pyappimage_yml = os.path.join("pyappimage", "pyappimage.yml")
     _data = {
         "name": name,
@@ -155,59 +158,125 @@ def generate():
     default=False,
     help="Do not ask for confirmation",
 )
-def build(force=False):
+@click.option(
+    "--cache/--no-cache",
+    "use_cache",
+    default=True,
+    help="Reuse previously installed dependency prefixes",
+)
+@click.option(
+    "-i",
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Keep the previous build, and skip PyInstaller if its inputs "
+    "are unchanged",
+)
+@click.option(
+    "-a",
+    "--all",
+    "build_all",
+    is_flag=True,
+    default=False,
+    help="Build every project below the current directory",
+)
+@click.option(
+    "-m",
+    "--manifest",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Build the projects listed in this YAML file",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=None,
+    help="Number of projects built concurrently",
+)
+@click.option(
+    "--trace",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the timings of the build phases to this file, "
+    "in the Chrome trace event format",
+)
+@click.option(
+    "--docker",
+    "use_docker",
+    is_flag=True,
+    default=False,
+    help="Build inside a container of docker-image, with docker or podman",
+)
+@click.option(
+    "--daemon/--no-daemon",
+    "use_daemon",
+    default=True,
+    help="Send the build to a running pyappimage daemon, if there is one",
+)
+@click.option(
+    "-w",
+    "--watch",
+    "watch_changes",
+    is_flag=True,
+    default=False,
+    help="Keep the AppDir up to date with changes to the project",
+)
+@click.option(
+    "--check-reproducible",
+    is_flag=True,
+    default=False,
+    help="Build twice in reproducible mode, and compare the outputs",
+)
+@click.option(
+    "--tag",
+    default=None,
+    hidden=True,
+    help="Suffix of the build directories, used by matrix builds",
+)
+def build(
+    force=False,
+    use_cache=True,
+    incremental=False,
+    build_all=False,
+    manifest=None,
+    jobs=None,
+    tag=None,
+    trace=None,
+    use_daemon=True,
+    use_docker=False,
+    watch_changes=False,
+    check_reproducible=False,
+):
     """Build an Python AppImage"""
-    for path in (".", "pyappimage"):
-        if os.path.isdir(os.path.realpath(path)):
-            pyappimage_yml = os.path.join(path, "pyappimage.yml")
-            if os.path.exists(pyappimage_yml):
-                with open(pyappimage_yml, "r") as r:
-                    config = yaml.load(r, Loader=Loader)
-                name = config.get("name")
-                for image_type in ("png", "svg"):
-                    _icon = os.path.join(
-                        path, "{appname}.{type}".format(appname=name, type=image_type)
-                    )
-                    if os.path.exists(_icon):
-                        icon_path = _icon
-                        break
-                else:
-                    print(
-                        "Warning: No icon file was provided. The default "
-                        "Python icon will be used. To add an icon, place a "
-                        "{appname}.svg or {appname}.png in {path}".format(
-                            appname=name, path=path
-                        )
-                    )
-                    icon_path = os.path.join(
-                        os.path.dirname(__file__), "assets", "pyappimage.png"
-                    )
-
-                _appdata = os.path.join(path, "{}.appdata.xml".format(name))
-                if os.path.exists(_appdata):
-                    appdata = _appdata
-                else:
-                    print(
-                        "Warning: No Appdata file provided. Please add {} "
-                        "for desktop integration, and indexing.".format(_appdata)
-                    )
-                    appdata = None
-                _desktop_file = os.path.join(path, "{}.desktop")
-                if os.path.exists(_desktop_file):
-                    desktop_file = _desktop_file
-                else:
-                    desktop_file = None
-                break
-    else:
-        print("Could not find a valid pyappimage.yml")
-        print(
-            "Please create pyappimage.yml in ./pyappimage folder or at "
-            "the root directory"
+    from .build.docker import build_in_container
+    from .daemon import request_build
+    from .project import (
+        find_assets,
+        find_config,
+        get_directories,
+        has_project_spec,
+        print_config_not_found,
+    )
+
+    if build_all or manifest is not None:
+        build_batch(
+            manifest=manifest,
+            force=force,
+            use_cache=use_cache,
+            incremental=incremental,
+            jobs=jobs,
+            trace=trace,
         )
-        print("\nAlternatively, interactively generate a pyappimage file by:")
-        print("\n\t $ pyappimage generate\n")
+        return
+
+    path, config = find_config()
+    if config is None:
+        print_config_not_found()
         sys.exit(1)
-    if not os.path.exists("setup.py") and not os.path.exists("pyproject.toml"):
+    name = config.get("name")
+    icon_path, appdata, desktop_file = find_assets(path, name)
+    if not has_project_spec():
         print("Could not find setup.py or pyproject.toml in {}".format(os.getcwd()))
         print(
             "Make sure that the setup.py or pyproject.toml exists in the current directory, "
@@ -215,27 +284,614 @@ def build(force=False):
         )
         sys.exit(1)
 
-    build_directory = os.path.realpath("{}.AppDir.BUILD".format(name))
-    dist_directory = os.path.realpath("{}.AppDir".format(name))
-    if force:
-        shutil.rmtree(build_directory)
-        shutil.rmtree(dist_directory)
-    for dir in (build_directory, dist_directory):
-        if os.path.exists(dir):
-            cf = click.confirm("{} exists. Do you want to overwrite it?".format(dir))
-            if cf:
-                shutil.rmtree(dir)
-            elif dir != build_directory:
-                print("Aborted!")
-                sys.exit(0)
-    pyappimage_build(
-        config,
+    if use_docker:
+        try:
+            returncode = build_in_container(
+                config,
+                os.getcwd(),
+                force=force,
+                use_cache=use_cache,
+                incremental=incremental,
+            )
+        except (FileNotFoundError, RuntimeError) as e:
+            print(e)
+            sys.exit(1)
+        sys.exit(returncode)
+
+    if config.get("interpreters") and tag is None:
+        build_interpreters(
+            config["interpreters"],
+            name,
+            force=force,
+            use_cache=use_cache,
+            incremental=incremental,
+            jobs=jobs,
+            trace=trace,
+        )
+        return
+
+    build_directory, dist_directory = get_directories(name, tag=tag)
+    if force and not incremental:
+        shutil.rmtree(build_directory, ignore_errors=True)
+        shutil.rmtree(dist_directory, ignore_errors=True)
+    if not incremental:
+        for dir in (build_directory, dist_directory):
+            if os.path.exists(dir):
+                cf = click.confirm(
+                    "{} exists. Do you want to overwrite it?".format(dir)
+                )
+                if cf:
+                    shutil.rmtree(dir)
+                elif dir != build_directory:
+                    print("Aborted!")
+                    sys.exit(0)
+    build_kwargs = dict(
+        config=config,
         appdata=appdata,
         icon=icon_path,
         desktop_file=desktop_file,
         has_fuse=is_fuse_supported(),
+        use_cache=use_cache,
+        incremental=incremental,
+        tag=tag,
+        trace=trace and os.path.realpath(trace),
     )
-    print("done!")
+    if check_reproducible:
+        try:
+            build_twice(build_kwargs, build_directory, dist_directory)
+        except RuntimeError as e:
+            print(e)
+            sys.exit(1)
+        return
+    returncode = request_build(build_kwargs) if use_daemon else None
+    if returncode is None:
+        # PyInstaller is only imported when the build runs in this process
+        from .build.build import build as pyappimage_build
+
+        try:
+            pyappimage_build(**build_kwargs)
+        except RuntimeError as e:
+            print(e)
+            sys.exit(1)
+        print("done!")
+    elif returncode != 0:
+        sys.exit(returncode)
+    if watch_changes:
+        from .watch import watch
+
+        try:
+            watch(build_kwargs)
+        except (OSError, RuntimeError) as e:
+            print("Could not watch {}: {}".format(os.getcwd(), e))
+            sys.exit(1)
+
+
+def build_twice(build_kwargs, build_directory, dist_directory):
+    """Builds from scratch twice in reproducible mode, and compares the outputs"""
+    import copy
+
+    from .build.build import build as pyappimage_build
+    from .utils import hash_file
+    from .build.reproducible import compare_trees, hash_tree
+
+    results = []
+    for _ in range(2):
+        shutil.rmtree(build_directory, ignore_errors=True)
+        shutil.rmtree(dist_directory, ignore_errors=True)
+        config = copy.deepcopy(build_kwargs["config"])
+        config["reproducible"] = True
+        appimage = pyappimage_build(**dict(build_kwargs, config=config, incremental=False))
+        results.append((hash_tree(dist_directory), hash_file(appimage)))
+
+    (first, first_image), (second, second_image) = results
+    if first_image == second_image:
+        print("{} is reproducible: {}".format(appimage, first_image))
+        return
+    differences = compare_trees(first, second)
+    if differences:
+        print("{} files of the AppDir differ between the builds:".format(len(differences)))
+        for i in differences:
+            print("  {}".format(i))
+    else:
+        print(
+            "The AppDirs are identical, but the AppImages differ. "
+            "Reproducible images need squashfs-tools 4.4 or later"
+        )
+    sys.exit(1)
+
+
+def build_interpreters(
+    interpreters,
+    name,
+    force=False,
+    use_cache=True,
+    incremental=False,
+    jobs=None,
+    trace=None,
+):
+    """Builds the project once per interpreter, and prints a summary table"""
+    from .matrix import build_matrix, format_results as format_matrix_results
+
+    print("Building {} with {}".format(name, ", ".join(interpreters)))
+    if not (force or incremental) and not click.confirm(
+        "Existing AppDirs of these builds will be overwritten. Continue?"
+    ):
+        print("Aborted!")
+        sys.exit(0)
+
+    def _progress(result):
+        print(
+            "{} {} in {:.1f}s".format(
+                result["tag"],
+                "succeeded" if result["status"] == "ok" else "failed",
+                result["seconds"],
+            )
+        )
+
+    try:
+        results = build_matrix(
+            interpreters,
+            name,
+            jobs=jobs,
+            use_cache=use_cache,
+            incremental=incremental,
+            trace=trace,
+            callback=_progress,
+        )
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        sys.exit(1)
+    print()
+    for line in format_matrix_results(results):
+        print(line)
+    if any(i["status"] != "ok" for i in results):
+        sys.exit(1)
+
+
+def build_batch(
+    manifest=None, force=False, use_cache=True, incremental=False, jobs=None, trace=None
+):
+    """Builds several projects concurrently, and prints a summary table"""
+    from .batch import build_many, discover_projects, format_results, load_manifest
+
+    if manifest is not None:
+        projects = load_manifest(manifest)
+    else:
+        projects = discover_projects(".")
+    if not projects:
+        print("Could not find any projects with a pyappimage.yml")
+        sys.exit(1)
+    print("Building {} projects:".format(len(projects)))
+    for i in projects:
+        print("  {}".format(i))
+    if not (force or incremental) and not click.confirm(
+        "Existing AppDirs of these projects will be overwritten. Continue?"
+    ):
+        print("Aborted!")
+        sys.exit(0)
+
+    finished = []
+
+    def _progress(result):
+        finished.append(result)
+        print(
+            "[{}/{}] {} {} in {:.1f}s".format(
+                len(finished),
+                len(projects),
+                result["name"] or result["project"],
+                "succeeded" if result["status"] == "ok" else "failed",
+                result["seconds"],
+            )
+        )
+
+    results = build_many(
+        projects,
+        jobs=jobs,
+        has_fuse=is_fuse_supported(),
+        use_cache=use_cache,
+        incremental=incremental,
+        trace=trace,
+        callback=_progress,
+    )
+    print()
+    for line in format_results(results):
+        print(line)
+    if any(i["status"] != "ok" for i in results):
+        sys.exit(1)
+
+
+@cli.command()
+@click.option(
+    "-n",
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Only show what would be removed",
+)
+@click.option("-v", "--verbose", is_flag=True, default=False, help="List every path")
+def prune(dry_run=False, verbose=False):
+    """Remove the ignore-binaries patterns from a built AppDir"""
+    from .build.prune import prune as prune_directory
+    from .project import find_config, get_directories, print_config_not_found
+
+    _, config = find_config()
+    if config is None:
+        print_config_not_found()
+        sys.exit(1)
+    name = config.get("name")
+    libs_path = os.path.join(get_directories(name)[1], name)
+    if not os.path.isdir(libs_path):
+        print("Could not find {}. Build the AppImage first.".format(libs_path))
+        sys.exit(1)
+    report = prune_directory(
+        libs_path, config.get("ignore-binaries", []), dry_run=dry_run
+    )
+    if verbose or dry_run:
+        for i in report.paths:
+            print(i)
+    print(
+        "{} {} files, {}".format(
+            "Would remove" if dry_run else "Removed",
+            report.files,
+            human_size(report.bytes),
+        )
+    )
+
+
+@cli.command()
+@click.option(
+    "--imports",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Import times from --pyappimage-profile or python -X importtime, "
+    "to estimate the startup savings",
+)
+@click.option("-n", "--top", default=20, help="Number of packages listed")
+@click.option(
+    "--apply",
+    is_flag=True,
+    default=False,
+    help="Add the proposed exclusions to exclude-module in pyappimage.yml",
+)
+def analyze(imports=None, top=20, apply=False):
+    """Attribute the size of a built AppDir to the packages in it"""
+    import yaml
+
+    from .build.analysis import (
+        attribute_sizes,
+        format_report,
+        get_analysis_directory,
+        get_top_level,
+        load_import_times,
+        propose_exclusions,
+    )
+    from .project import (
+        Dumper,
+        find_config,
+        get_directories,
+        print_config_not_found,
+        set_config_key,
+    )
+
+    path, config = find_config()
+    if config is None:
+        print_config_not_found()
+        sys.exit(1)
+    name = config.get("name")
+    build_directory, dist_directory = get_directories(name)
+    analysis_directory = get_analysis_directory(
+        os.path.join(build_directory, "build"), name
+    )
+    bundle = os.path.join(dist_directory, name)
+    if not os.path.isdir(analysis_directory) or not os.path.isdir(bundle):
+        print("Could not find {}. Build the AppImage first.".format(bundle))
+        sys.exit(1)
+    packages, graph = attribute_sizes(bundle, analysis_directory)
+    own_packages = {get_top_level(config["entrypoint"].split(":")[0])}
+    exclusions = propose_exclusions(
+        bundle,
+        analysis_directory,
+        graph,
+        own_packages=own_packages,
+        import_times=load_import_times(imports) if imports else None,
+    )
+    for line in format_report(packages, exclusions, top=top):
+        print(line)
+    if not apply or not exclusions:
+        return
+
+    excluded = config.get("exclude-module", [])
+    if not isinstance(excluded, list):
+        excluded = [excluded]
+    excluded = excluded + [i.module for i in exclusions if i.module not in excluded]
+    pyappimage_yml = os.path.join(path, "pyappimage.yml")
+    if not set_config_key(pyappimage_yml, "exclude-module", excluded):
+        print(
+            "Could not edit exclude-module in {}, replace it with:\n".format(
+                pyappimage_yml
+            )
+        )
+        print(yaml.dump({"exclude-module": excluded}, Dumper=Dumper))
+        sys.exit(1)
+    print(
+        "Added {} modules to exclude-module in {}. Rebuild to apply them.".format(
+            len(exclusions), pyappimage_yml
+        )
+    )
+
+
+@cli.command(name="inspect")
+@click.argument("target", type=click.Path(exists=True))
+@click.option("-n", "--top", default=10, help="Number of rows in each table")
+@click.option(
+    "-b",
+    "--block-size",
+    default="1M",
+    help="Squashfs block size used to estimate the compressed size of an AppDir",
+)
+@click.option(
+    "-j", "--jobs", type=int, default=None, help="Number of files read concurrently"
+)
+@click.option(
+    "--budget",
+    default=None,
+    help="Fail if the AppImage, or the estimated compressed AppDir, is larger, "
+    "e.g. 80M",
+)
+@click.option(
+    "--compression",
+    default=None,
+    help="Codec the budget of an AppDir is estimated for, defaults to the "
+    "compression of pyappimage.yml, or zstd",
+)
+@click.option(
+    "--json",
+    "json_output",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the composition as JSON to this file",
+)
+def inspect_command(
+    target,
+    top=10,
+    block_size="1M",
+    jobs=None,
+    budget=None,
+    json_output=None,
+    compression=None,
+):
+    """Report what an AppDir or AppImage is made of"""
+    from .inspector import format_composition, inspect
+
+    try:
+        composition = inspect(target, block_size=block_size, jobs=jobs)
+    except (ValueError, RuntimeError) as e:
+        print("Could not read {}: {}".format(target, e))
+        sys.exit(1)
+    for line in format_composition(composition, top=top):
+        print(line)
+    if json_output is not None:
+        with open(json_output, "w") as w:
+            json.dump(composition.to_dict(top=top), w, indent=2)
+    if budget is None:
+        return
+    size = composition.size
+    if size is None:
+        from .project import find_config
+
+        if compression is None:
+            # the codec a build of the project in the current directory uses
+            compression = (find_config()[1] or {}).get("compression", "zstd")
+        if compression not in composition.compressed:
+            print(
+                "Cannot estimate the {} compressed size of {}{}".format(
+                    compression,
+                    target,
+                    ", install the zstandard module"
+                    if compression == "zstd"
+                    else "",
+                )
+            )
+            sys.exit(1)
+        size = composition.compressed[compression]
+    if size > parse_size(budget):
+        print("{} is over the budget of {}".format(human_size(size), budget))
+        sys.exit(1)
+
+
+@cli.command()
+@click.argument("seed", type=click.Path(exists=True, dir_okay=False))
+@click.argument("zsync_file", type=click.Path(exists=True, dir_okay=False))
+def delta(seed, zsync_file):
+    """Show what an update from SEED to the file of ZSYNC_FILE downloads
+
+    SEED is usually the previous release, and ZSYNC_FILE the .zsync file
+    written next to the new one
+    """
+    from .build.zsync import plan_update
+
+    try:
+        blocks, found, download, _ = plan_update(zsync_file, seed)
+    except (KeyError, ValueError) as e:
+        print("Could not read {}: {}".format(zsync_file, e))
+        sys.exit(1)
+    print(
+        "{} of {} blocks found in {}, {} to download".format(
+            found, blocks, seed, human_size(download)
+        )
+    )
+
+
+@cli.command(context_settings={"ignore_unknown_options": True})
+@click.argument("target", type=click.Path(exists=True))
+@click.argument("argv", nargs=-1, type=click.UNPROCESSED)
+@click.option("-n", "--runs", default=10, help="Number of warm launches")
+@click.option("-c", "--cold-runs", default=3, help="Number of cold launches")
+@click.option(
+    "-o",
+    "--json",
+    "json_output",
+    type=click.Path(),
+    default=None,
+    help="Write the results as JSON to this file",
+)
+@click.option(
+    "--loader",
+    is_flag=True,
+    default=False,
+    help="Report the work of the dynamic loader, from LD_DEBUG=statistics",
+)
+@click.option(
+    "-b",
+    "--baseline",
+    type=click.Path(exists=True),
+    default=None,
+    help="Compare with the JSON results of a previous run",
+)
+def bench(
+    target,
+    argv,
+    runs=10,
+    cold_runs=3,
+    json_output=None,
+    loader=False,
+    baseline=None,
+):
+    """Measure the startup latency of an AppDir or AppImage
+
+    ARGV is passed to the application, it defaults to --pyappimage-runtime
+    """
+    from .bench import benchmark, compare
+
+    result = benchmark(
+        target,
+        argv=argv or ("--pyappimage-runtime",),
+        runs=runs,
+        cold_runs=cold_runs,
+        loader=loader,
+    )
+    print(
+        "{:<6} {:>5} {:>10} {:>10} {:>10} {:>12}".format(
+            "", "runs", "p50", "p95", "max", "peak rss"
+        )
+    )
+    for phase in ("cold", "warm"):
+        if phase not in result:
+            continue
+        _summary = result[phase]
+        print(
+            "{:<6} {:>5} {:>8.1f}ms {:>8.1f}ms {:>8.1f}ms {:>12}".format(
+                phase,
+                _summary["runs"],
+                _summary["p50"] * 1000,
+                _summary["p95"] * 1000,
+                _summary["max"] * 1000,
+                human_size(_summary["peak_rss_kib"] * 1024),
+            )
+        )
+        if _summary["failures"]:
+            print("Warning: {} {} launches failed".format(_summary["failures"], phase))
+    if "loader" in result:
+        print()
+        for key, value in sorted(result["loader"].items()):
+            print("{:<24} {:>14}".format(key.replace("_", " "), value))
+    if baseline is not None:
+        with open(baseline) as r:
+            _rows = compare(result, json.load(r))
+        print()
+        print("{:<32} {:>14} {:>14} {:>8}".format("", "baseline", "now", "change"))
+        for key, before, after in _rows:
+            print(
+                "{:<32} {:>14} {:>14} {:>7.1f}%".format(
+                    key,
+                    "{:.4g}".format(before),
+                    "{:.4g}".format(after),
+                    (after - before) * 100 / before if before else 0,
+                )
+            )
+    if json_output is not None:
+        with open(json_output, "w") as w:
+            json.dump(result, w, indent=2)
+        print("Written {}".format(json_output))
+
+
+@cli.group()
+def cache():
+    """Manage the cache of installed dependency prefixes"""
+    pass
+
+
+@cache.command()
+def stats():
+    """Show the size and location of the cache"""
+    from .build.cache import PrefixCache
+    from .build.wheelhouse import get_wheelhouse_directory
+
+    _stats = PrefixCache().stats()
+    print("Cache directory: {}".format(_stats["directory"]))
+    print("Entries: {}".format(_stats["entries"]))
+    print(
+        "Size: {} / {}".format(
+            human_size(_stats["size"]), human_size(_stats["max_size"])
+        )
+    )
+    wheelhouse = get_wheelhouse_directory()
+    print(
+        "Wheelhouse: {} ({})".format(
+            wheelhouse, human_size(get_tree_size(wheelhouse)[1])
+        )
+    )
+
+
+@cache.command(name="prune")
+@click.option(
+    "--max-size",
+    default=None,
+    help="Evict least recently used entries until the cache fits, e.g. 2G",
+)
+@click.option("--all", "prune_all", is_flag=True, help="Remove every entry")
+@click.option(
+    "--wheelhouse", is_flag=True, help="Also remove the downloaded wheels"
+)
+def cache_prune(max_size=None, prune_all=False, wheelhouse=False):
+    """Evict least recently used entries from the cache"""
+    from .build.cache import PrefixCache
+    from .build.wheelhouse import get_wheelhouse_directory
+
+    if wheelhouse:
+        shutil.rmtree(get_wheelhouse_directory(), ignore_errors=True)
+    if prune_all:
+        max_size = 0
+    elif max_size is not None:
+        max_size = parse_size(max_size)
+    removed, freed = PrefixCache().prune(max_size=max_size)
+    print("Removed {} entries, freed {}".format(removed, human_size(freed)))
+
+
+@cli.command()
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=None,
+    help="Number of builds run concurrently",
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Path of the socket to listen on",
+)
+def daemon(jobs=None, socket_path=None):
+    """Keep PyInstaller loaded, and run builds sent by pyappimage build"""
+    from .daemon import serve
+
+    try:
+        serve(socket_path=socket_path, jobs=jobs)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 APPRUN = r"""#! /bin/bash
 
 # Export APPRUN if running from an extracted image
-self="$(readlink -f -- $0)"
+self="$(readlink -f -- "$0")"
 here="${self%/*}"
 APPDIR="${APPDIR:-${here}}"
 
@@ -9,6 +9,84 @@ export PYAPPIMAGE="TRUE"
 
 """
 
+# AppRun which starts no subshell. APPDIR is set by the runtime and by the
+# launcher, so the path of the script is only resolved when it is run
+# directly, and the binary is exec'd instead of being waited for
+APPRUN_MINIMAL = r"""#!/bin/sh
+
+if [ -z "$APPDIR" ]; then
+    if [ -L "$0" ]; then
+        APPDIR="$(dirname "$(readlink -f -- "$0")")"
+    else
+        case "$0" in
+            */*) APPDIR="${0%/*}" ;;
+            *) APPDIR="$PWD" ;;
+        esac
+    fi
+    case "$APPDIR" in
+        /*) ;;
+        .) APPDIR="$PWD" ;;
+        *) APPDIR="$PWD/${APPDIR#./}" ;;
+    esac
+fi
+export APPDIR
+export PYAPPIMAGE="TRUE"
+"""
+
+LAUNCHER = r"""#!/bin/sh
+# Runs the AppImage next to this script from a cache of its extracted
+# contents, for hosts without FUSE. The first launch extracts the image
+# into a directory keyed by its content hash, later launches run it from
+# there. Generated by PyAppImage
+set -e
+
+self="$(readlink -f -- "$0")"
+APPIMAGE="${self%.sh}"
+cache="${PYAPPIMAGE_LAUNCH_CACHE:-${XDG_CACHE_HOME:-$HOME/.cache}/pyappimage/launch}"
+# entries unused for this many days are removed
+max_age="${PYAPPIMAGE_LAUNCH_CACHE_DAYS:-14}"
+# MiB the cache is kept under, by removing the least recently used entries
+max_size="${PYAPPIMAGE_LAUNCH_CACHE_SIZE:-2048}"
+
+mkdir -p "$cache/index"
+# the content hash is computed once for every path, size, mtime and inode
+key="$(stat -L -c '%n %s %Y %i' "$APPIMAGE" | cksum | cut -d ' ' -f 1)"
+id="$(cat "$cache/index/$key" 2>/dev/null || true)"
+if [ -z "$id" ] || [ ! -x "$cache/$id/AppRun" ]; then
+    id="$(sha256sum "$APPIMAGE" | cut -c 1-32)"
+    if [ ! -x "$cache/$id/AppRun" ]; then
+        tmp="$(mktemp -d "$cache/.extract.XXXXXX")"
+        (cd "$tmp" && "$APPIMAGE" --appimage-extract > /dev/null)
+        # another launch may have extracted it meanwhile
+        [ -e "$cache/$id" ] || mv "$tmp/squashfs-root" "$cache/$id"
+        rm -rf "$tmp"
+    fi
+    echo "$id" > "$cache/index/$key"
+
+    # eviction only runs when the cache changes, so that hits stay cheap
+    find "$cache" -mindepth 1 -maxdepth 1 -name '.extract.*' -mtime +0 \
+        -exec rm -rf {} +
+    find "$cache" -mindepth 1 -maxdepth 1 -type d ! -name index \
+        ! -name "$id" ! -name '.*' -mtime "+$max_age" -exec rm -rf {} +
+    used=0
+    for entry in $(ls -1t "$cache"); do
+        [ "$entry" = index ] && continue
+        used=$((used + $(du -sk "$cache/$entry" | cut -f 1)))
+        if [ "$entry" != "$id" ] && [ "$used" -gt $((max_size * 1024)) ]; then
+            rm -rf "${cache:?}/$entry"
+        fi
+    done
+    for entry in "$cache"/index/*; do
+        [ -d "$cache/$(cat "$entry" 2>/dev/null)" ] || rm -f "$entry"
+    done
+fi
+touch "$cache/$id"
+
+export APPIMAGE
+export APPDIR="$cache/$id"
+exec "$APPDIR/AppRun" "$@"
+"""
+
 SEPARATOR = "\n========================\n"
 
 CATEGORIES = [
@@ -39,10 +117,91 @@ StartupWMClass={bin}
 """
 
 
+PROFILER = r'''
+def pyappimage_profile_path():
+    """
+    Returns the path the profile should be written to, or None if
+    profiling was not requested by --pyappimage-profile[=path] or the
+    PYAPPIMAGE_PROFILE environment variable
+    """
+    import os
+    path = os.getenv("PYAPPIMAGE_PROFILE")
+    for arg in list(sys.argv[1:]):
+        if arg == "--pyappimage-profile" or \
+                arg.startswith("--pyappimage-profile="):
+            sys.argv.remove(arg)
+            path = arg.partition("=")[2] or "1"
+    if not path:
+        return None
+    if path == "1":
+        path = "pyappimage-{}.prof".format(os.getpid())
+    return os.path.abspath(path)
+
+
+def pyappimage_run(main):
+    """
+    Runs main, under cProfile and with import time tracing if profiling
+    was requested. The cProfile stats are written to the profile path,
+    and the import times, in the format of python -X importtime, to the
+    profile path with an .imports suffix when the process exits.
+    """
+    path = pyappimage_profile_path()
+    if path is None:
+        return main()
+
+    import atexit
+    import cProfile
+    import importlib._bootstrap as bootstrap
+    import time
+
+    imports = []
+    stack = []
+    find_and_load = bootstrap._find_and_load
+
+    def _find_and_load(name, import_):
+        started_at = time.perf_counter()
+        stack.append(0.0)
+        try:
+            return find_and_load(name, import_)
+        finally:
+            cumulative = time.perf_counter() - started_at
+            children = stack.pop()
+            if stack:
+                stack[-1] += cumulative
+            imports.append(
+                (len(stack), name, cumulative - children, cumulative))
+
+    profiler = cProfile.Profile()
+
+    def dump():
+        profiler.disable()
+        bootstrap._find_and_load = find_and_load
+        profiler.dump_stats(path)
+        with open(path + ".imports", "w") as w:
+            w.write("import time: self [us] | cumulative | imported package\n")
+            for depth, name, self_time, cumulative in imports:
+                w.write("import time: {:>9} | {:>10} | {}{}\n".format(
+                    int(self_time * 1e6), int(cumulative * 1e6),
+                    "  " * depth, name))
+        sys.stderr.write("pyappimage: profile written to {}\n".format(path))
+
+    atexit.register(dump)
+    bootstrap._find_and_load = _find_and_load
+    profiler.enable()
+    return main()
+'''
+
+
 ENTRYPOINT = """import sys
 BUILT_INFO = "{platform_version}"
 PYAPPIMAGE_VERSION = "{pyappimage_version}"
 PYTHON_RUNTIME = "{python_runtime}"
+{profiler}
+
+def pyappimage_main():
+    {entrypoint}
+
+
 if '--pyappimage-runtime' in sys.argv:
     print("Built on:")
     print(" - OS:", BUILT_INFO)
@@ -50,4 +209,5 @@ if '--pyappimage-runtime' in sys.argv:
     print("Built using:", PYAPPIMAGE_VERSION)
     print("Python runtime:", sys.version)
 else:
-    {entrypoint}"""
+    pyappimage_run(pyappimage_main)
+"""
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import time
+import traceback
+
+from collections import deque
+
+from .build.cache import get_cache_directory, get_interpreter_tag
+from .version import __version__
+
+# modules imported before the first build, so that every build forked
+# from the daemon starts with them loaded
+PRELOAD = (
+    "yaml",
+    "halo",
+    "PyInstaller.__main__",
+    "PyInstaller.building.build_main",
+    "PyInstaller.depend.analysis",
+    "PyInstaller.depend.bindepend",
+    "pyappimage.build.build",
+)
+
+# separates the output of a build from its status in the stream sent
+# to the client
+STATUS_MARKER = b"\0"
+
+# seconds a client has to send its request
+REQUEST_TIMEOUT = 10
+
+
+def get_socket_path():
+    """
+    Returns the path of the socket of the daemon. PyInstaller can only
+    freeze the interpreter it runs in, so each interpreter has a daemon
+    of its own. The socket is named after a short hash of the interpreter
+    tag, as the path of a Unix socket is limited to about 100 bytes
+    :return:
+    """
+    if os.getenv("PYAPPIMAGE_DAEMON_SOCKET"):
+        return os.getenv("PYAPPIMAGE_DAEMON_SOCKET")
+    directory = os.getenv("XDG_RUNTIME_DIR") or get_cache_directory()
+    tag = hashlib.blake2b(
+        get_interpreter_tag().encode(), digest_size=6).hexdigest()
+    return os.path.join(directory, "pyappimage-{}.sock".format(tag))
+
+
+def preload():
+    """
+    Imports PRELOAD, and warms up the PyInstaller hook registry and the
+    scan of the interpreter, which are otherwise paid by every build
+    :return: the modules which could not be imported
+    """
+    missing = []
+    for module in PRELOAD:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            missing.append(module)
+    try:
+        from PyInstaller.depend import bindepend
+        bindepend.get_python_library_path()
+    except Exception:
+        pass
+    return missing
+
+
+def request_build(kwargs, socket_path=None):
+    """
+    Sends a build to the daemon, and copies its output to stdout while
+    it runs. Returns the exit status of the build, or None if no daemon
+    is running or the daemon cannot run it, in which case the caller
+    builds in-process
+    :param kwargs: keyword arguments of pyappimage.build.build.build
+    :param socket_path:
+    :return:
+    """
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_path or get_socket_path())
+    except OSError:
+        # no daemon, or a socket path the kernel refuses, e.g. one which
+        # is too long
+        conn.close()
+        return None
+    request = {
+        "version": __version__,
+        "executable": sys.executable,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        "kwargs": kwargs,
+    }
+    with conn:
+        conn.sendall(json.dumps(request).encode() + b"\n")
+        status = b""
+        while True:
+            data = conn.recv(65536)
+            if not data:
+                break
+            if status or STATUS_MARKER in data:
+                output, _, rest = data.partition(STATUS_MARKER)
+                status += rest
+                data = output
+            if data:
+                sys.stdout.buffer.write(data)
+                sys.stdout.flush()
+    try:
+        status = json.loads(status.decode())
+    except ValueError:
+        print("The build daemon closed the connection")
+        return 1
+    if status.get("error"):
+        print("Build daemon: {}, building in-process".format(status["error"]))
+        return None
+    return status["returncode"]
+
+
+def get_returncode(status):
+    return os.WEXITSTATUS(status) if os.WIFEXITED(status) \
+        else -os.WTERMSIG(status)
+
+
+def fork(function, *args):
+    """
+    Calls function with args in a forked process. The process starts
+    with the modules imported by preload(), and the state PyInstaller
+    keeps between runs and the changes to os.environ do not leak into
+    the next build. It exits with 0 once function returns, with the code
+    of a SystemExit, or with 1 on any other error. Returns its pid
+    :param function:
+    :param args:
+    :return:
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        returncode = 1
+        try:
+            function(*args)
+            returncode = 0
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else 1
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(returncode)
+    return pid
+
+
+def _build(build_kwargs):
+    from .build.build import build
+    try:
+        build(**build_kwargs)
+    except RuntimeError as e:
+        # the error of a build, e.g. no runtime is pinned, is printed
+        # like the in-process build prints it, without a traceback
+        print(e)
+        sys.exit(1)
+
+
+def run_build(build_kwargs):
+    """
+    Runs a build in a forked process, see fork(), and returns its exit
+    status
+    :param build_kwargs:
+    :return:
+    """
+    _, status = os.waitpid(fork(_build, build_kwargs), 0)
+    return get_returncode(status)
+
+
+def _serve_build(conn, request):
+    """
+    Runs the build of request with its output sent to conn, in a process
+    forked from the daemon
+    """
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(conn.fileno(), 1)
+    os.dup2(conn.fileno(), 2)
+    _build(request["kwargs"])
+    print("done!")
+
+
+def read_request(conn):
+    """
+    Reads the JSON request line sent by request_build
+    :param conn:
+    :return:
+    """
+    conn.settimeout(REQUEST_TIMEOUT)
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            raise ConnectionError("client closed the connection")
+        data += chunk
+    conn.settimeout(None)
+    return json.loads(data.decode())
+
+
+def send_status(conn, **status):
+    try:
+        conn.sendall(STATUS_MARKER + json.dumps(status).encode())
+    except OSError:
+        pass
+    conn.close()
+
+
+def serve(socket_path=None, jobs=None):
+    """
+    Accepts builds on a Unix socket until interrupted. Every build runs
+    in a process forked from the daemon, so that it starts with the
+    preloaded modules, and at most jobs of them run at once. Builds
+    waiting for a free slot are queued. A build is killed if its client
+    disconnects
+    :param socket_path:
+    :param jobs: number of concurrent builds, defaults to half the cpus
+    :return:
+    """
+    socket_path = socket_path or get_socket_path()
+    jobs = jobs or max(1, (os.cpu_count() or 1) // 2)
+    missing = preload()
+    if missing:
+        print("Could not preload {}".format(", ".join(missing)))
+
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            # left behind by a daemon which did not exit cleanly
+            os.unlink(socket_path)
+        else:
+            raise RuntimeError(
+                "A daemon is already listening on {}".format(socket_path))
+        finally:
+            probe.close()
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(socket_path)
+    except OSError as e:
+        server.close()
+        raise RuntimeError(
+            "Could not listen on {}: {}".format(socket_path, e))
+    os.chmod(socket_path, 0o600)
+    server.listen()
+    print("Listening on {} with {} build slots".format(socket_path, jobs))
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    running = {}
+    queue = deque()
+    try:
+        while True:
+            clients = [i[0] for i in running.values()] + [i[0] for i in queue]
+            readable, _, _ = select.select([server] + clients, [], [], 0.5)
+            for conn in readable:
+                if conn is server:
+                    continue
+                # a client never sends anything after its request, so
+                # readable means it disconnected
+                if conn.recv(1):
+                    continue
+                for pid, (i, _, _) in running.items():
+                    if i is conn:
+                        os.kill(pid, signal.SIGTERM)
+                for i in [i for i in queue if i[0] is conn]:
+                    queue.remove(i)
+                    conn.close()
+            if server in readable:
+                conn, _ = server.accept()
+                try:
+                    request = read_request(conn)
+                except (OSError, ValueError) as e:
+                    send_status(conn, error="invalid request: {}".format(e))
+                    continue
+                if request.get("version") != __version__ or \
+                        request.get("executable") != sys.executable:
+                    send_status(
+                        conn, error="the daemon runs pyappimage {} on {}"
+                        .format(__version__, sys.executable))
+                    continue
+                if len(running) >= jobs:
+                    conn.sendall("Waiting for one of {} builds to finish\n"
+                                 .format(len(running)).encode())
+                queue.append((conn, request))
+
+            while True:
+                try:
+                    pid, status = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    break
+                if pid == 0:
+                    break
+                conn, request, started_at = running.pop(pid)
+                send_status(conn, returncode=get_returncode(status))
+                print("Built {} in {:.1f}s".format(
+                    request["cwd"], time.time() - started_at))
+
+            while queue and len(running) < jobs:
+                conn, request = queue.popleft()
+
+                def _run(conn=conn, request=request):
+                    # the client only sees the end of the stream once every
+                    # copy of its connection is closed
+                    server.close()
+                    for i in list(running.values()) + list(queue):
+                        i[0].close()
+                    _serve_build(conn, request)
+
+                pid = fork(_run)
+                running[pid] = (conn, request, time.time())
+                print("Building {}".format(request["cwd"]))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in running:
+            os.kill(pid, signal.SIGTERM)
+        server.close()
+        os.unlink(socket_path)
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import hashlib
+import lzma
+import mmap
+import os
+import stat
+import zlib
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from .build.analysis import get_contents_directory, get_file_owner
+from .build.squashfs import SquashfsImage
+from .utils import human_size, parse_size
+
+# bytes of each file compressed to estimate its compressed size. Larger
+# files are sampled in evenly spaced blocks
+SAMPLE_SIZE = 4 * 1024 * 1024
+
+FILE_TYPES = (
+    ("shared library", (".so",)),
+    ("python source", (".py",)),
+    ("python bytecode", (".pyc", ".pyo")),
+    ("archive", (".zip", ".pyz", ".egg", ".whl", ".tar", ".gz")),
+    ("data", (".json", ".txt", ".csv", ".xml", ".yml", ".yaml", ".dat")),
+    ("image", (".png", ".svg", ".jpg", ".jpeg", ".gif", ".ico")),
+)
+
+
+def get_compressors():
+    """
+    Returns a dict of the squashfs codecs whose compressed size can be
+    estimated, with a function compressing a block like mksquashfs does.
+    zstd is estimated when the zstandard module is installed
+    :return:
+    """
+    compressors = {
+        "gzip": lambda data: zlib.compress(data, 9),
+        "xz": lambda data: lzma.compress(data, check=lzma.CHECK_CRC32),
+    }
+    try:
+        import zstandard
+    except ImportError:
+        pass
+    else:
+        compressor = zstandard.ZstdCompressor(level=15)
+        compressors["zstd"] = compressor.compress
+    return compressors
+
+
+def get_file_type(path, head=b""):
+    name = os.path.basename(path)
+    for kind, extensions in FILE_TYPES:
+        for extension in extensions:
+            if name.endswith(extension) or extension + "." in name:
+                return kind
+    if head.startswith(b"\x7fELF"):
+        return "executable"
+    return os.path.splitext(name)[1] or "other"
+
+
+def get_bundle_root(paths):
+    """
+    Returns the directory PyInstaller collected the app to, the one
+    holding an executable of the same name, or None
+    :param paths: relative paths of the files of the AppDir
+    :return:
+    """
+    for path in paths:
+        parts = path.split("/")
+        if len(parts) == 2 and parts[0] == parts[1]:
+            return parts[0]
+    return None
+
+
+def get_owner(path, bundle_root, contents_directory=""):
+    if bundle_root is None or not path.startswith(bundle_root + "/"):
+        return "(appdir)"
+    return get_file_owner(path[len(bundle_root) + 1:].replace("/", os.sep),
+                          contents_directory)
+
+
+def get_bundle_contents(paths, bundle_root):
+    """
+    Returns the contents directory of the bundle, see
+    get_contents_directory()
+    :param paths: relative paths of the files of the AppDir
+    :param bundle_root: as returned by get_bundle_root()
+    :return:
+    """
+    if bundle_root is None:
+        return ""
+    prefix = bundle_root + "/"
+    return get_contents_directory(
+        i[len(prefix):].replace("/", os.sep) for i in paths
+        if i.startswith(prefix))
+
+
+def estimate_compressed(data, block_size, compressors):
+    """
+    Estimates the size of data once compressed in blocks of block_size,
+    with every one of compressors. Blocks which do not shrink are stored
+    as they are, like mksquashfs does
+    :param data: a bytes-like object
+    :param block_size:
+    :param compressors: as returned by get_compressors
+    :return:
+    """
+    size = len(data)
+    blocks = -(-size // block_size)
+    sampled = max(1, min(blocks, SAMPLE_SIZE // block_size))
+    starts = [(blocks * i // sampled) * block_size for i in range(sampled)]
+    sample_size = sum(min(block_size, size - i) for i in starts)
+    estimates = {}
+    for name, compress in compressors.items():
+        compressed = sum(
+            min(len(compress(data[i:i + block_size])),
+                min(block_size, size - i))
+            for i in starts)
+        estimates[name] = int(compressed * size / sample_size)
+    return estimates
+
+
+def scan_file(path, block_size, compressors):
+    """
+    Reads a file once, and returns its digest, its type and the estimated
+    compressed sizes
+    :param path:
+    :param block_size:
+    :param compressors:
+    :return:
+    """
+    with open(path, 'rb') as r:
+        size = os.fstat(r.fileno()).st_size
+        if size == 0:
+            return hashlib.blake2b().hexdigest(), get_file_type(path), \
+                {i: 0 for i in compressors}
+        with mmap.mmap(r.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            digest = hashlib.blake2b(m).hexdigest()
+            estimates = estimate_compressed(m, block_size, compressors)
+            return digest, get_file_type(path, m[:4]), estimates
+
+
+class Composition:
+    def __init__(self, target, kind):
+        self.target = target
+        self.kind = kind
+        # (path, size, type, owner)
+        self.files = []
+        # lists of paths with the same content
+        self.duplicates = []
+        self.duplicate_bytes = 0
+        # estimated size per codec, or the actual compressed size
+        self.compressed = {}
+        self.compression = None
+        self.size = None
+
+    @property
+    def total(self):
+        return sum(i[1] for i in self.files)
+
+    def group(self, index):
+        totals = defaultdict(lambda: [0, 0])
+        for i in self.files:
+            totals[i[index]][0] += 1
+            totals[i[index]][1] += i[1]
+        return sorted(totals.items(), key=lambda x: -x[1][1])
+
+    def to_dict(self, top=20):
+        return {
+            "target": self.target,
+            "kind": self.kind,
+            "size": self.size,
+            "files": len(self.files),
+            "uncompressed": self.total,
+            "compression": self.compression,
+            "compressed": self.compressed,
+            "duplicate_bytes": self.duplicate_bytes,
+            "duplicates": self.duplicates[:top],
+            "packages": {k: {"files": v[0], "bytes": v[1]}
+                         for k, v in self.group(3)},
+            "types": {k: {"files": v[0], "bytes": v[1]}
+                      for k, v in self.group(2)},
+            "shared_libraries": [
+                {"path": i[0], "bytes": i[1]} for i in self.libraries(top)],
+        }
+
+    def libraries(self, top=20):
+        return sorted(
+            (i for i in self.files if i[2] == "shared library"),
+            key=lambda x: -x[1])[:top]
+
+
+def inspect_appdir(appdir, block_size="1M", jobs=None):
+    """
+    Walks appdir, and reads every file once on a pool of threads to
+    hash it and estimate its compressed size per codec. Files which are
+    hardlinked together are counted once
+    :param appdir:
+    :param block_size: squashfs block size used for the estimates
+    :param jobs:
+    :return:
+    """
+    composition = Composition(appdir, "appdir")
+    block_size = parse_size(block_size)
+    compressors = get_compressors()
+    paths = []
+    seen = set()
+    for root, dirs, files in os.walk(appdir):
+        dirs.sort()
+        for f in sorted(files):
+            path = os.path.join(root, f)
+            st = os.lstat(path)
+            if not stat.S_ISREG(st.st_mode) or (st.st_dev, st.st_ino) in seen:
+                continue
+            seen.add((st.st_dev, st.st_ino))
+            paths.append((path, st.st_size))
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        results = list(pool.map(
+            lambda i: scan_file(i[0], block_size, compressors),
+            paths))
+
+    rel_paths = [os.path.relpath(i[0], appdir).replace(os.sep, "/")
+                 for i in paths]
+    bundle_root = get_bundle_root(rel_paths)
+    contents_directory = get_bundle_contents(rel_paths, bundle_root)
+    by_digest = defaultdict(list)
+    compressed = defaultdict(int)
+    for rel, (path, size), (digest, kind, estimates) in zip(
+            rel_paths, paths, results):
+        composition.files.append(
+            (rel, size, kind,
+             get_owner(rel, bundle_root, contents_directory)))
+        if size and digest in by_digest:
+            composition.duplicate_bytes += size
+        else:
+            # squashfs stores duplicate files once
+            for name, value in estimates.items():
+                compressed[name] += value
+        by_digest[digest].append((rel, size))
+    composition.duplicates = sorted(
+        ([i[0] for i in group] for group in by_digest.values()
+         if len(group) > 1 and group[0][1]),
+        key=lambda x: -len(x))
+    composition.compressed = dict(compressed)
+    composition.compression = "estimated, {} blocks".format(
+        human_size(block_size))
+    return composition
+
+
+def inspect_appimage(appimage):
+    """
+    Lists the files of an AppImage from the index of its squashfs image,
+    without extracting it. Files sharing their data blocks are the
+    duplicates mksquashfs found
+    :param appimage:
+    :return:
+    """
+    composition = Composition(appimage, "appimage")
+    with open(appimage, 'rb') as fp:
+        image = SquashfsImage.from_appimage(fp)
+        files = [i for i in image.walk() if i.link is None]
+    files.sort(key=lambda x: x.path)
+    paths = [i.path for i in files]
+    bundle_root = get_bundle_root(paths)
+    contents_directory = get_bundle_contents(paths, bundle_root)
+    by_block = defaultdict(list)
+    for i in files:
+        composition.files.append(
+            (i.path, i.size, get_file_type(i.path),
+             get_owner(i.path, bundle_root, contents_directory)))
+        if i.size and i.stored:
+            by_block[(i.start_block, i.size)].append(i.path)
+    for paths in by_block.values():
+        if len(paths) > 1:
+            composition.duplicates.append(paths)
+    composition.duplicates.sort(key=lambda x: -len(x))
+    composition.duplicate_bytes = sum(
+        size * (len(paths) - 1) for (_, size), paths in by_block.items())
+    composition.size = os.path.getsize(appimage)
+    composition.compression = "squashfs bytes used"
+    composition.compressed = {
+        image.compression: image.superblock["bytes_used"]}
+    return composition
+
+
+def inspect(target, block_size="1M", jobs=None):
+    if os.path.isdir(target):
+        return inspect_appdir(target, block_size=block_size, jobs=jobs)
+    return inspect_appimage(target)
+
+
+def format_composition(composition, top=10):
+    """
+    Returns the lines of the report of composition
+    :param composition:
+    :param top: number of rows in each table
+    :return:
+    """
+    total = composition.total or 1
+    lines = ["{}: {} files, {}".format(
+        composition.target, len(composition.files),
+        human_size(composition.total))]
+    if composition.size is not None:
+        lines.append("AppImage size: {}".format(human_size(composition.size)))
+    for name, size in sorted(composition.compressed.items()):
+        lines.append("{} ({}): {} ({:.1f}%)".format(
+            name, composition.compression, human_size(size),
+            size * 100 / total))
+    lines.append("Duplicate content: {} in {} groups".format(
+        human_size(composition.duplicate_bytes),
+        len(composition.duplicates)))
+
+    def _table(title, rows):
+        lines.append("")
+        lines.append("{:<44} {:>7} {:>11} {:>6}".format(
+            title, "files", "size", "share"))
+        for name, (files, size) in rows[:top]:
+            lines.append("{:<44} {:>7} {:>11} {:>5.1f}%".format(
+                name[-44:], files, human_size(size), size * 100 / total))
+
+    _table("package", composition.group(3))
+    _table("file type", composition.group(2))
+    _table("shared library", [
+        (i[0], (1, i[1])) for i in composition.libraries(top)])
+    if composition.duplicates:
+        lines.append("")
+        lines.append("Duplicates:")
+        for paths in composition.duplicates[:top]:
+            lines.append("  {}".format(", ".join(paths[:4]) + (
+                ", ..." if len(paths) > 4 else "")))
+    return lines
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .bench import benchmark
+from .project import get_appimage_path, get_directories
+from .utils import get_tree_size, human_size
+
+
+def resolve_interpreter(interpreter):
+    """
+    Returns the absolute path of interpreter, a tag like py3.8 naming its
+    version, and its sys.prefix, which tells a virtual environment from
+    the interpreter it was created from
+    :param interpreter: a path, or the name of an executable on PATH
+    :return:
+    """
+    path = shutil.which(interpreter)
+    if path is None:
+        raise FileNotFoundError(
+            "Could not find the interpreter {}".format(interpreter))
+    version, prefix = subprocess.run(
+        [path, "-c", "import sys; "
+                     "print('%d.%d' % sys.version_info[:2]); "
+                     "print(sys.prefix)"],
+        check=True, capture_output=True).stdout.decode().splitlines()
+    return path, "py{}".format(version), prefix
+
+
+def resolve_interpreters(interpreters):
+    """
+    Returns the (path, tag) of every interpreter, see
+    resolve_interpreter(). Names of the same interpreter, like python3
+    and python3.11, are built once. Two other interpreters of the same
+    version would build into the same directories, so they raise a
+    ValueError
+    :param interpreters: list of interpreter paths or names
+    :return:
+    """
+    resolved = []
+    seen = {}
+    for interpreter in interpreters:
+        path, tag, prefix = resolve_interpreter(interpreter)
+        identity = (os.path.realpath(path), prefix)
+        if tag in seen:
+            if seen[tag][1] == identity:
+                continue
+            raise ValueError(
+                "{} and {} are both Python {}, and would build into the "
+                "same directories. List only one of them".format(
+                    seen[tag][0], interpreter, tag[2:]))
+        seen[tag] = (interpreter, identity)
+        resolved.append((path, tag))
+    return resolved
+
+
+def build_interpreter(interpreter, tag, name, use_cache=True,
+                      incremental=False, trace=None, startup_runs=5):
+    """
+    Builds the project in the current directory with interpreter, in the
+    directories of tag. pyappimage is run in that interpreter, as
+    PyInstaller can only freeze the interpreter it runs in. Its output
+    goes to pyappimage-build.log in the build directory of tag, once
+    the build is done, as the build starts by clearing that directory.
+    Returns a dict describing the result
+    :param interpreter: path to the interpreter
+    :param tag:
+    :param name: name of the app
+    :param use_cache:
+    :param incremental:
+    :param trace: path of the build trace, the tag is added to its name
+    :param startup_runs: number of launches to measure the startup time
+    :return:
+    """
+    result = {
+        "interpreter": interpreter,
+        "tag": tag,
+        "status": "failed",
+        "seconds": 0,
+        "appimage": None,
+        "size": None,
+        "appdir_size": None,
+        "startup": None,
+        "log": None,
+    }
+    command = [interpreter, "-m", "pyappimage.cli", "build",
+               "--always-confirm", "--tag", tag]
+    if not use_cache:
+        command.append("--no-cache")
+    if incremental:
+        command.append("--incremental")
+    if trace is not None:
+        root, ext = os.path.splitext(os.path.realpath(trace))
+        command.extend(["--trace", "{}-{}{}".format(root, tag, ext)])
+    env = dict(os.environ)
+    # let the interpreter import this copy of pyappimage
+    package_root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(
+        i for i in (package_root, env.get("PYTHONPATH")) if i)
+
+    started_at = time.time()
+    with tempfile.NamedTemporaryFile(
+            prefix="pyappimage-build-{}-".format(tag), suffix=".log",
+            delete=False) as log:
+        proc = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=log,
+                              stderr=subprocess.STDOUT, env=env)
+    result["seconds"] = time.time() - started_at
+    build_directory, dist_directory = get_directories(name, tag=tag)
+    os.makedirs(build_directory, exist_ok=True)
+    result["log"] = os.path.join(build_directory, "pyappimage-build.log")
+    shutil.move(log.name, result["log"])
+    appimage = get_appimage_path(name, tag=tag)
+    if proc.returncode != 0 or not os.path.exists(appimage):
+        return result
+
+    result["status"] = "ok"
+    result["appimage"] = appimage
+    result["size"] = os.path.getsize(appimage)
+    result["appdir_size"] = get_tree_size(dist_directory)[1]
+    if startup_runs:
+        result["startup"] = benchmark(
+            dist_directory, runs=startup_runs, cold_runs=0)["warm"]["p50"]
+    return result
+
+
+def build_matrix(interpreters, name, jobs=None, use_cache=True,
+                 incremental=False, trace=None, callback=None):
+    """
+    Builds the project in the current directory with every interpreter
+    concurrently. Returns the results in the order of interpreters, with
+    every interpreter built once, see resolve_interpreters()
+    :param interpreters: list of interpreter paths or names
+    :param name: name of the app
+    :param jobs: number of concurrent builds, defaults to all of them
+    :param use_cache:
+    :param incremental:
+    :param trace:
+    :param callback: called with each result as the build finishes
+    :return:
+    """
+    resolved = resolve_interpreters(interpreters)
+    results = {}
+    with ThreadPoolExecutor(max_workers=jobs or len(resolved)) as pool:
+        futures = {
+            pool.submit(build_interpreter, path, tag, name,
+                        use_cache=use_cache, incremental=incremental,
+                        trace=trace): tag
+            for path, tag in resolved
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if callback is not None:
+                callback(result)
+    return [results[tag] for _, tag in resolved]
+
+
+def format_results(results):
+    """
+    Returns the lines of a table summarizing the results of build_matrix
+    :param results:
+    :return:
+    """
+    lines = ["{:<8} {:<7} {:>9} {:>11} {:>11} {:>10}  {}".format(
+        "python", "status", "time", "appimage", "appdir", "startup",
+        "output")]
+    for i in results:
+        lines.append("{:<8} {:<7} {:>8.1f}s {:>11} {:>11} {:>10}  {}".format(
+            i["tag"],
+            i["status"],
+            i["seconds"],
+            human_size(i["size"]) if i["size"] is not None else "-",
+            human_size(i["appdir_size"])
+            if i["appdir_size"] is not None else "-",
+            "{:.1f}ms".format(i["startup"] * 1000)
+            if i["startup"] is not None else "-",
+            i["appimage"] or "see {}".format(i["log"])
+        ))
+    return lines
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os
+import platform
+import re
+
+try:
+    from yaml import CLoader as Loader, CDumper as Dumper
+except ImportError:
+    from yaml import Loader, Dumper
+import yaml
+
+DEFAULT_ICON = os.path.join(os.path.dirname(__file__), "assets", "pyappimage.png")
+
+# files declaring the dependencies and the build of a project
+PROJECT_SPEC_FILES = (
+    "setup.py",
+    "setup.cfg",
+    "pyproject.toml",
+    "MANIFEST.in",
+    "requirements*.txt",
+)
+
+# directories which are never part of a project: build artifacts,
+# virtualenvs and the output of pyappimage
+IGNORED_DIRS = (
+    "__pycache__",
+    "build",
+    "dist",
+    "node_modules",
+    "site-packages",
+    "venv",
+)
+
+
+def is_ignored_directory(name, path=None):
+    """
+    Returns whether the directory called name is skipped when searching
+    or hashing a project. Hidden directories, AppDirs and their build
+    directories, and virtualenvs, which have a pyvenv.cfg, are skipped
+    :param name:
+    :param path: path to the directory, to detect virtualenvs
+    :return:
+    """
+    return (
+        name.startswith(".")
+        or name in IGNORED_DIRS
+        or name.endswith((".AppDir", ".AppDir.BUILD", ".egg-info"))
+        or (path is not None and os.path.exists(os.path.join(path, "pyvenv.cfg")))
+    )
+
+
+def find_config(directory="."):
+    """
+    Looks for pyappimage.yml in directory, and in its pyappimage
+    directory. Returns the directory it was found in and the parsed
+    configuration, or (None, None) if there is none
+    """
+    for path in (directory, os.path.join(directory, "pyappimage")):
+        pyappimage_yml = os.path.join(path, "pyappimage.yml")
+        if os.path.exists(pyappimage_yml):
+            with open(pyappimage_yml, "r") as r:
+                return os.path.normpath(path), yaml.load(r, Loader=Loader)
+    return None, None
+
+
+def get_directories(name, tag=None):
+    """
+    Returns the build directory and the AppDir of the app called name,
+    in the current directory. Builds with a tag, like the python version
+    of a matrix build, get directories of their own
+    """
+    base = name if tag is None else "{}-{}".format(name, tag)
+    return (
+        os.path.realpath("{}.AppDir.BUILD".format(base)),
+        os.path.realpath("{}.AppDir".format(base)),
+    )
+
+
+def get_appimage_path(name, tag=None):
+    base = name if tag is None else "{}-{}".format(name, tag)
+    return os.path.realpath("{}-{}.AppImage".format(base, platform.machine()))
+
+
+def set_config_key(pyappimage_yml, key, value):
+    """
+    Sets the top level key of pyappimage_yml to value, without touching
+    the rest of the file, so that its comments and the order of its keys
+    are kept. Returns False, without writing anything, if the key is
+    written in a form which cannot be replaced line by line
+    """
+    with open(pyappimage_yml, "r") as r:
+        text = r.read()
+    block = yaml.dump({key: value}, Dumper=Dumper, default_flow_style=False)
+    # the key, and the indented or list lines which follow it
+    match = re.search(
+        r"^{}:.*\n?(?:(?:[ \t-].*|[ \t]*)(?:\n|$))*".format(re.escape(key)),
+        text,
+        re.M,
+    )
+    if match is None:
+        if text and not text.endswith("\n"):
+            text += "\n"
+        edited = text + block
+    else:
+        # keep the blank lines and comments which follow the block
+        trailing = re.search(r"(?:\n[ \t]*(?:#.*)?)*\n?$", match.group(0))
+        edited = (
+            text[: match.start()]
+            + block.rstrip("\n")
+            + trailing.group(0)
+            + text[match.end():]
+        )
+    original = yaml.load(text, Loader=Loader) or {}
+    expected = dict(original, **{key: value})
+    if yaml.load(edited, Loader=Loader) != expected:
+        return False
+    with open(pyappimage_yml, "w") as w:
+        w.write(edited)
+    return True
+
+
+def print_config_not_found():
+    print("Could not find a valid pyappimage.yml")
+    print(
+        "Please create pyappimage.yml in ./pyappimage folder or at "
+        "the root directory"
+    )
+    print("\nAlternatively, interactively generate a pyappimage file by:")
+    print("\n\t $ pyappimage generate\n")
+
+
+def has_project_spec(directory="."):
+    return any(
+        os.path.exists(os.path.join(directory, i))
+        for i in ("setup.py", "pyproject.toml")
+    )
+
+
+def find_assets(path, name):
+    """
+    Returns the icon, appdata and desktop file placed next to the
+    pyappimage.yml of the app called name. Missing appdata and desktop
+    files are None, and a missing icon falls back to the default icon
+    """
+    for image_type in ("png", "svg"):
+        _icon = os.path.join(
+            path, "{appname}.{type}".format(appname=name, type=image_type)
+        )
+        if os.path.exists(_icon):
+            icon_path = _icon
+            break
+    else:
+        print(
+            "Warning: No icon file was provided. The default "
+            "Python icon will be used. To add an icon, place a "
+            "{appname}.svg or {appname}.png in {path}".format(
+                appname=name, path=path
+            )
+        )
+        icon_path = DEFAULT_ICON
+
+    _appdata = os.path.join(path, "{}.appdata.xml".format(name))
+    if os.path.exists(_appdata):
+        appdata = _appdata
+    else:
+        print(
+            "Warning: No Appdata file provided. Please add {} "
+            "for desktop integration, and indexing.".format(_appdata)
+        )
+        appdata = None
+    _desktop_file = os.path.join(path, "{}.desktop".format(name))
+    if os.path.exists(_desktop_file):
+        desktop_file = _desktop_file
+    else:
+        desktop_file = None
+    return icon_path, appdata, desktop_file
@@ -1,5 +1,8 @@
+import hashlib
+import mmap
 import os
 import platform
+import shutil
 import sys
 import tempfile
 import traceback
@@ -7,6 +10,9 @@ import traceback
 from .version import __version__
 from pyappimage.constants import CATEGORIES, ENTRYPOINT
 
+# files smaller than this are read in one go instead of being mapped
+MMAP_THRESHOLD = 1024 * 1024
+
 
 def replace_vars(string, vars):
     for var in vars:
@@ -14,6 +20,68 @@ def replace_vars(string, vars):
     return string
 
 
+def human_size(size):
+    """
+    Formats a size in bytes as a human readable string
+    :param size:
+    :return:
+    """
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024:
+            return "{:.1f} {}".format(size, unit)
+        size /= 1024
+    return "{:.1f} TiB".format(size)
+
+
+def get_tree_size(directory):
+    """
+    Returns the number of files in directory and their total size.
+    Symlinks are not followed, nor counted
+    :param directory:
+    :return:
+    """
+    files = size = 0
+    for root, _, filenames in os.walk(directory):
+        for f in filenames:
+            path = os.path.join(root, f)
+            if not os.path.islink(path):
+                files += 1
+                size += os.path.getsize(path)
+    return files, size
+
+
+def hash_file(path, algorithm="blake2b"):
+    """
+    Returns the hex digest of a file. Large files are mapped into
+    memory, so that they are hashed without being copied into Python
+    :param path:
+    :param algorithm: any algorithm of hashlib
+    :return:
+    """
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as r:
+        size = os.fstat(r.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(r.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                digest.update(m)
+        else:
+            digest.update(r.read())
+    return digest.hexdigest()
+
+
+def parse_size(size):
+    """
+    Parses sizes like 500M, 2G or 1024 into bytes
+    :param size:
+    :return:
+    """
+    size = str(size).strip().upper().rstrip("IB")
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+
 def verify_categories(data):
     for category in data.split(";"):
         if category not in CATEGORIES:
@@ -52,3 +120,81 @@ def get_input_else_default(default=None, _type=str, description="", verify=None)
                 continue
         else:
             return data
+
+
+def reflink(src, dest):
+    """
+    Clones src to dest using the FICLONE ioctl, which shares the
+    underlying extents on copy-on-write filesystems like btrfs and xfs.
+    Raises OSError if the filesystem does not support it.
+    :param src:
+    :param dest:
+    :return:
+    """
+    import fcntl
+    ficlone = 0x40049409
+    with open(src, "rb") as r, open(dest, "wb") as w:
+        try:
+            fcntl.ioctl(w.fileno(), ficlone, r.fileno())
+        except OSError:
+            w.close()
+            os.remove(dest)
+            raise
+    shutil.copystat(src, dest)
+
+
+def copy_file(src, dest):
+    """
+    Copies src to dest with copy_file_range, which copies in the kernel
+    and lets filesystems share extents or copy server side. Falls back to
+    shutil.copyfile where copy_file_range is not available.
+    :param src:
+    :param dest:
+    :return:
+    """
+    if not hasattr(os, "copy_file_range"):
+        shutil.copyfile(src, dest)
+        shutil.copystat(src, dest)
+        return
+    with open(src, "rb") as r, open(dest, "wb") as w:
+        remaining = os.fstat(r.fileno()).st_size
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(
+                    r.fileno(), w.fileno(), min(remaining, 1 << 30))
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            # not supported across these filesystems
+            r.seek(0)
+            w.seek(0)
+            w.truncate()
+            shutil.copyfileobj(r, w, 1024 * 1024)
+    shutil.copystat(src, dest)
+
+
+def link_or_copy(src, dest):
+    """
+    Materializes src at dest without copying bytes whenever possible.
+    Tries a hardlink first, then a reflink, and finally falls back to a
+    regular copy. Returns True if the file was linked, False if the
+    bytes were copied.
+    :param src:
+    :param dest:
+    :return:
+    """
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+        return True
+    except OSError:
+        pass
+    try:
+        reflink(src, dest)
+        return True
+    except OSError:
+        pass
+    copy_file(src, dest)
+    return False
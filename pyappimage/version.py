@@ -24,3 +24,7 @@ SOFTWARE.
 """
 
 __version__ = "0.1.a1"
+
+# the install_requires of pyappimage, which container builds also install
+# in their image
+__requirements__ = ("PyInstaller", "click", "halo", "pyyaml", "zstandard")
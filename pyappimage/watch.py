@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+MIT License
+
+Copyright (c) 2020 Srevin Saju
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import shutil
+import struct
+import time
+
+from .daemon import preload, run_build
+from .project import (
+    PROJECT_SPEC_FILES,
+    find_assets,
+    find_config,
+    get_directories,
+    is_ignored_directory,
+)
+from .utils import link_or_copy
+
+# inotify event masks, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE)
+REMOVED = IN_MOVED_FROM | IN_DELETE
+
+EVENT = struct.Struct("iIII")
+
+# seconds to wait for more events after the first one, so that an editor
+# saving several files, or saving through a temporary file, triggers a
+# single update
+DEBOUNCE = 0.2
+
+# files which change the dependencies or the build configuration, and
+# need a full rebuild
+REBUILD_FILES = ("pyappimage.yml",) + PROJECT_SPEC_FILES
+
+# what a change to a file needs
+REBUILD, DATA, SOURCE = "rebuild", "data", "source"
+
+
+class Inotify:
+    """
+    Watches directories with the inotify API of Linux, through ctypes
+    """
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(
+            ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise RuntimeError("Watching needs inotify, which only Linux has")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.watches = {}
+
+    def add_watch(self, directory):
+        wd = self._libc.inotify_add_watch(
+            self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            self.watches[wd] = directory
+
+    def add_tree(self, directory, skip=None):
+        """
+        Watches directory and the directories below it, except the ones
+        for which skip returns True
+        :param directory:
+        :param skip: called with the name and the path of every directory
+        :return:
+        """
+        for root, dirs, _ in os.walk(directory):
+            if skip is not None:
+                dirs[:] = [d for d in dirs
+                           if not skip(d, os.path.join(root, d))]
+            self.add_watch(root)
+
+    def read(self):
+        """
+        Returns the (path, mask) of the pending events
+        :return:
+        """
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT.unpack_from(data, offset)
+                name = data[offset + EVENT.size:
+                            offset + EVENT.size + length].rstrip(b"\0")
+                offset += EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    events.append((None, mask))
+                elif wd in self.watches:
+                    path = self.watches[wd]
+                    if name:
+                        path = os.path.join(path, os.fsdecode(name))
+                    events.append((path, mask))
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+
+    def close(self):
+        os.close(self.fd)
+
+
+def classify(path, project_directory, assets, data):
+    """
+    Returns what a change to path needs: REBUILD, DATA, SOURCE, or None
+    if the build does not depend on it
+    :param path:
+    :param project_directory:
+    :param assets: paths of pyappimage.yml, the icon, the desktop file
+        and the appdata file
+    :param data: as returned by resolve_data()
+    :return:
+    """
+    name = os.path.basename(path)
+    if path in assets or (
+            os.path.dirname(path) == project_directory and
+            any(fnmatch.fnmatch(name, i) for i in REBUILD_FILES)):
+        return REBUILD
+    for src, _ in data:
+        if path == src or path.startswith(src + os.sep):
+            return DATA
+    rel = os.path.relpath(path, project_directory)
+    if rel.startswith(os.pardir) or \
+            any(is_ignored_directory(i) for i in rel.split(os.sep)[:-1]):
+        return None
+    if name.endswith(".py"):
+        return SOURCE
+    return None
+
+
+def get_data_destination(path, data):
+    for src, dest in data:
+        if path == src:
+            return os.path.join(dest, os.path.basename(src))
+        if path.startswith(src + os.sep):
+            return os.path.join(dest, os.path.relpath(path, src))
+    return None
+
+
+def get_installed_path(path, project_directory, site_packages):
+    """
+    Returns where the module at path is installed in site_packages, or
+    None if it is not part of an installed package. Leading directories,
+    like src, are stripped until the module is found
+    :param path:
+    :param project_directory:
+    :param site_packages:
+    :return:
+    """
+    parts = os.path.relpath(path, project_directory).split(os.sep)
+    for i in range(len(parts)):
+        installed = os.path.join(site_packages, *parts[i:])
+        if os.path.isfile(installed):
+            return installed
+    # a new module of an installed package
+    for i in range(len(parts) - 1):
+        installed = os.path.join(site_packages, *parts[i:])
+        if os.path.isfile(
+                os.path.join(os.path.dirname(installed), "__init__.py")):
+            return installed
+    return None
+
+
+def replace_file(src, dest):
+    """
+    Copies src over dest through a temporary file, so that the files
+    dest may be hardlinked to, in the dependency cache, are left alone
+    """
+    tmp = dest + ".pyappimage-watch"
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dest)
+
+
+def load(build_kwargs):
+    """
+    Reads pyappimage.yml again, and returns the updated build_kwargs,
+    the paths of pyappimage.yml and of the assets, and the data of the
+    project
+    """
+    from .build.build import get_variables, resolve_data
+
+    path, config = find_config()
+    if config is None:
+        raise FileNotFoundError("Could not find pyappimage.yml")
+    icon, appdata, desktop_file = find_assets(path, config.get("name"))
+    build_kwargs = dict(
+        build_kwargs, config=config, icon=icon, appdata=appdata,
+        desktop_file=desktop_file)
+    build_directory, dist_directory = get_directories(
+        config.get("name"), tag=build_kwargs.get("tag"))
+    data = resolve_data(
+        config.get("data"), get_variables(build_directory, dist_directory))
+    assets = {
+        os.path.realpath(i)
+        for i in (os.path.join(path, "pyappimage.yml"), icon, appdata,
+                  desktop_file)
+        if i is not None
+    }
+    return build_kwargs, assets, data
+
+
+def watch(build_kwargs, project_directory="."):
+    """
+    Keeps the AppDir of the project up to date. data files are linked
+    into the AppDir as they change. Changed modules of the project are
+    copied over their installed copies, and PyInstaller runs again with
+    its analysis cache, without reinstalling the dependencies. Changes to
+    pyappimage.yml or to the dependencies rebuild everything. Runs until
+    interrupted
+    :param build_kwargs: keyword arguments of pyappimage.build.build.build
+    :param project_directory:
+    :return:
+    """
+    from .build.build import get_site_packages
+
+    project_directory = os.path.realpath(project_directory)
+    preload()
+    inotify = Inotify()
+    build_kwargs, assets, data = load(build_kwargs)
+    build_kwargs.update(incremental=True, package=False)
+    inotify.add_tree(project_directory, skip=is_ignored_directory)
+    for src, _ in data:
+        inotify.add_tree(src if os.path.isdir(src) else os.path.dirname(src))
+    print("Watching {} for changes, press Ctrl+C to stop".format(
+        project_directory))
+
+    try:
+        while True:
+            select.select([inotify.fd], [], [])
+            time.sleep(DEBOUNCE)
+            changes = {}
+            for path, mask in inotify.read():
+                if path is None:
+                    # events were lost
+                    changes[None] = (REBUILD, False)
+                    continue
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and \
+                            not is_ignored_directory(
+                                os.path.basename(path), path):
+                        inotify.add_tree(path, skip=is_ignored_directory)
+                    continue
+                kind = classify(
+                    path, project_directory, assets, data)
+                if kind is not None:
+                    changes[path] = (kind, bool(mask & REMOVED))
+            if not changes:
+                continue
+
+            name = build_kwargs["config"].get("name")
+            site_packages = get_site_packages(
+                get_directories(name, tag=build_kwargs.get("tag"))[0])
+            rebuild = site_packages is None or \
+                any(i[0] == REBUILD for i in changes.values())
+            synced = 0
+            for path, (kind, removed) in sorted(changes.items()):
+                if rebuild:
+                    break
+                if kind == DATA:
+                    dest = get_data_destination(path, data)
+                    if removed or not os.path.exists(path):
+                        if os.path.lexists(dest):
+                            os.remove(dest)
+                    else:
+                        os.makedirs(os.path.dirname(dest), exist_ok=True)
+                        link_or_copy(path, dest)
+                    print("Updated {}".format(dest))
+                    continue
+                installed = get_installed_path(
+                    path, project_directory, site_packages)
+                if installed is None:
+                    rebuild = True
+                    break
+                if removed or not os.path.exists(path):
+                    if os.path.exists(installed):
+                        os.remove(installed)
+                else:
+                    replace_file(path, installed)
+                synced += 1
+
+            if rebuild:
+                print("Dependencies or configuration changed, rebuilding")
+                try:
+                    build_kwargs, assets, data = load(build_kwargs)
+                except FileNotFoundError as e:
+                    print(e)
+                    continue
+                for src, _ in data:
+                    inotify.add_tree(
+                        src if os.path.isdir(src) else os.path.dirname(src))
+                returncode = run_build(dict(build_kwargs, install=True))
+            elif synced:
+                print("{} modules changed, updating the bundle".format(synced))
+                returncode = run_build(dict(build_kwargs, install=False))
+            else:
+                continue
+            if returncode != 0:
+                print("Build failed, waiting for changes")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        inotify.close()
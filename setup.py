@@ -1,5 +1,5 @@
 import os
-from pyappimage.version import __version__
+from pyappimage.version import __requirements__, __version__
 from setuptools import find_packages
 from setuptools import setup
 
@@ -30,7 +30,7 @@ setup(
     platforms=["Linux"],
     include_package_data=True,
     package_data={"pyappimage": ["assets/*"]},
-    install_requires=["PyInstaller", "click", "halo", "pyyaml"],
+    install_requires=list(__requirements__),
     dependency_links=["http://github.com/srevinsaju/zap/archive/master.tar.gz"],
     python_requires=">=3.4",
     entry_points={"console_scripts": ("pyappimage = pyappimage.cli:cli",)},
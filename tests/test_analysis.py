@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from pyappimage.build.analysis import (
+    PYTHON_RUNTIME,
+    SHARED_LIBRARIES,
+    attribute_sizes,
+    find_contents_directory,
+    get_file_owner,
+    propose_exclusions,
+)
+
+
+@pytest.fixture(params=["_internal", ""])
+def bundle(tmp_path, request):
+    """A bundle in the layout of PyInstaller 6, and in the one before"""
+    contents = request.param
+    files = {
+        "app": 100,
+        "base_library.zip": 10,
+        "libssl.so.3": 20,
+        "_cffi_backend.cpython-311-x86_64-linux-gnu.so": 30,
+        "numpy/core/_multiarray_umath.so": 40,
+        "tkinter/__init__.pyc": 50,
+    }
+    for path, size in files.items():
+        if path != "app":
+            path = os.path.join(contents, path)
+        (tmp_path / "app" / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / "app" / path).write_bytes(b"\0" * size)
+    (tmp_path / "analysis").mkdir()
+    return str(tmp_path / "app"), str(tmp_path / "analysis"), contents
+
+
+def test_contents_directory(bundle):
+    path, _, contents = bundle
+    assert find_contents_directory(path) == contents
+
+
+def test_attribute_sizes(bundle):
+    path, analysis, _ = bundle
+    packages, _ = attribute_sizes(path, analysis)
+    assert {k: v.bytes for k, v in packages.items()} == {
+        PYTHON_RUNTIME: 110,
+        SHARED_LIBRARIES: 20,
+        "_cffi_backend": 30,
+        "numpy": 40,
+        "tkinter": 50,
+    }
+
+
+def test_exclusions_count_package_directories(bundle):
+    path, analysis, _ = bundle
+    graph = {"app": ["tkinter"], "tkinter": []}
+    (exclusion,) = propose_exclusions(path, analysis, graph, own_packages={"main"})
+    assert exclusion.module == "tkinter"
+    assert exclusion.bytes == 50
+
+
+def test_file_owner_outside_contents_directory():
+    assert get_file_owner("app", "_internal") == PYTHON_RUNTIME
+    path = os.path.join("_internal", "yaml", "x.py")
+    assert get_file_owner(path, "_internal") == "yaml"
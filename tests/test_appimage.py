@@ -0,0 +1,49 @@
+import hashlib
+
+import pytest
+
+from pyappimage.build import appimage
+
+RUNTIME = b"\x7fELF runtime"
+
+
+@pytest.fixture
+def release(tmp_path, monkeypatch):
+    (tmp_path / "1.0").mkdir()
+    (tmp_path / "1.0" / "runtime-x86_64").write_bytes(RUNTIME)
+    monkeypatch.setattr(
+        appimage, "RUNTIME_URL", tmp_path.as_uri() + "/{release}/runtime-{arch}"
+    )
+    monkeypatch.setenv("PYAPPIMAGE_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("PYAPPIMAGE_RUNTIME", raising=False)
+    monkeypatch.delenv("PYAPPIMAGE_RUNTIME_RELEASE", raising=False)
+    monkeypatch.delenv("PYAPPIMAGE_RUNTIME_SHA256", raising=False)
+    return tmp_path
+
+
+def test_runtime_is_verified_and_cached(release, monkeypatch):
+    sha256 = hashlib.sha256(RUNTIME).hexdigest()
+    monkeypatch.setattr(appimage, "RUNTIMES", {"x86_64": ("1.0", sha256)})
+    runtime = appimage.get_runtime("x86_64")
+    with open(runtime, "rb") as r:
+        assert r.read() == RUNTIME
+    (release / "1.0" / "runtime-x86_64").unlink()
+    assert appimage.get_runtime("x86_64") == runtime
+
+
+def test_runtime_with_another_checksum_is_refused(release, monkeypatch):
+    monkeypatch.setattr(appimage, "RUNTIMES", {"x86_64": ("1.0", "0" * 64)})
+    with pytest.raises(RuntimeError, match="sha256"):
+        appimage.get_runtime("x86_64")
+    assert not list((release / "cache" / "runtime").iterdir())
+
+
+def test_unpinned_runtime_is_not_downloaded(release, monkeypatch):
+    monkeypatch.setattr(appimage, "RUNTIMES", {})
+    with pytest.raises(RuntimeError, match="No AppImage runtime is pinned"):
+        appimage.get_runtime("x86_64")
+    monkeypatch.setenv("PYAPPIMAGE_RUNTIME_RELEASE", "1.0")
+    monkeypatch.setenv(
+        "PYAPPIMAGE_RUNTIME_SHA256", hashlib.sha256(RUNTIME).hexdigest()
+    )
+    assert appimage.get_runtime("x86_64")
@@ -0,0 +1,61 @@
+import os
+import subprocess
+
+import pytest
+
+from pyappimage.constants import APPRUN_MINIMAL
+
+
+@pytest.fixture
+def appdir(tmp_path):
+    directory = tmp_path / "squashfs-root"
+    directory.mkdir()
+    apprun = directory / "AppRun"
+    apprun.write_text(APPRUN_MINIMAL + 'echo "$APPDIR"\n')
+    apprun.chmod(0o755)
+    return directory
+
+
+def run(command, cwd, **env):
+    environ = dict(os.environ)
+    environ.pop("APPDIR", None)
+    environ.update(env)
+    return subprocess.run(
+        command,
+        cwd=str(cwd),
+        env=environ,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    ).stdout.strip()
+
+
+def test_absolute_path(appdir, tmp_path):
+    assert run([str(appdir / "AppRun")], tmp_path) == str(appdir)
+
+
+def test_relative_path(appdir, tmp_path):
+    assert run(["./AppRun"], appdir) == str(appdir)
+    assert run(["squashfs-root/AppRun"], tmp_path) == str(appdir)
+    assert run(["./squashfs-root/AppRun"], tmp_path) == str(appdir)
+
+
+def test_path_lookup(appdir, tmp_path):
+    path = "{}:/usr/bin:/bin".format(appdir)
+    assert run(["AppRun"], tmp_path, PATH=path) == str(appdir)
+
+
+def test_symlink(appdir, tmp_path):
+    bin_directory = tmp_path / "bin"
+    bin_directory.mkdir()
+    (bin_directory / "app").symlink_to(appdir / "AppRun")
+    # readlink -f resolves every symlink of the path
+    expected = os.path.realpath(str(appdir))
+    assert run([str(bin_directory / "app")], tmp_path) == expected
+    assert run(["bin/app"], tmp_path) == expected
+
+
+def test_appdir_of_runtime(appdir, tmp_path):
+    # the runtime sets APPDIR to the mountpoint of the image
+    mountpoint = "/tmp/.mount_app"
+    assert run([str(appdir / "AppRun")], tmp_path, APPDIR=mountpoint) == mountpoint
@@ -0,0 +1,42 @@
+from pyappimage.bench import parse_loader_statistics
+
+# LD_DEBUG=statistics sh -c 'exec /bin/true', one report for the shell and
+# one for the executable it replaced itself with
+SHELL_EXEC = """\
+     26943:\t
+     26943:\truntime linker statistics:
+     26943:\t  total startup time in dynamic loader: 99800 cycles
+     26943:\t            time needed for relocation: 27350 cycles (27.4%)
+     26943:\t                 number of relocations: 181
+     26943:\t      number of relocations from cache: 7
+     26943:\t        number of relative relocations: 281
+     26943:\t           time needed to load objects: 17064 cycles (17.0%)
+     26943:\t
+     26943:\truntime linker statistics:
+     26943:\t  total startup time in dynamic loader: 74571 cycles
+     26943:\t            time needed for relocation: 15741 cycles (21.1%)
+     26943:\t                 number of relocations: 87
+     26943:\t      number of relocations from cache: 7
+     26943:\t        number of relative relocations: 16
+     26943:\t           time needed to load objects: 11624 cycles (15.5%)
+     26943:\t
+     26943:\truntime linker statistics:
+     26943:\t           final number of relocations: 88
+     26943:\tfinal number of relocations from cache: 7
+"""
+
+
+def test_parse_loader_statistics():
+    assert parse_loader_statistics(SHELL_EXEC) == {
+        "executables": 2,
+        "startup_cycles": 99800 + 74571,
+        "relocation_cycles": 27350 + 15741,
+        "load_cycles": 17064 + 11624,
+        # the final count of the process repeats the last report
+        "relocations": 181 + 87,
+        "relative_relocations": 281 + 16,
+    }
+
+
+def test_parse_no_statistics():
+    assert set(parse_loader_statistics("hello\n").values()) == {0}
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from pyappimage.build.cache import get_project_inputs, hash_project
+
+
+@pytest.fixture
+def project(tmp_path):
+    for path in (
+        "setup.py",
+        "requirements.txt",
+        "app.py",
+        "README.md",
+        "pkg/__init__.py",
+        "pkg/data/strings.json",
+        "src/other/__init__.py",
+        "docs/index.md",
+        "pyappimage/pyappimage.yml",
+    ):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(path)
+    return tmp_path
+
+
+def test_project_inputs(project):
+    assert sorted(
+        os.path.relpath(i, project) for i in get_project_inputs(str(project))
+    ) == [
+        "app.py",
+        "pkg/__init__.py",
+        "pkg/data/strings.json",
+        "requirements.txt",
+        "setup.py",
+        "src/other/__init__.py",
+    ]
+
+
+@pytest.mark.parametrize(
+    "output",
+    [
+        "build.json",
+        "app-x86_64.AppImage",
+        "app-x86_64.AppImage.zsync",
+        "app-x86_64.AppImage.sh",
+        "pyappimage-build.log",
+        "pyappimage-build-py3.9.log",
+        "app.AppDir.BUILD/PIP.log",
+        "venv/lib/site.py",
+        "env/pyvenv.cfg",
+        "env/lib/site.py",
+    ],
+)
+def test_outputs_do_not_change_the_key(project, output):
+    key = hash_project(str(project))
+    (project / output).parent.mkdir(parents=True, exist_ok=True)
+    (project / output).write_text("output")
+    assert hash_project(str(project)) == key
+
+
+@pytest.mark.parametrize(
+    "source", ["pkg/data/strings.json", "setup.py", "src/other/__init__.py"]
+)
+def test_sources_change_the_key(project, source):
+    key = hash_project(str(project))
+    (project / source).write_text("changed")
+    assert hash_project(str(project)) != key
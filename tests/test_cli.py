@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# modules which make every command slow to start, imported only by the
+# commands which need them
+HEAVY_MODULES = ("PyInstaller", "halo", "yaml")
+
+
+def get_imported_modules(*args):
+    """
+    Returns the top level packages imported by running pyappimage with
+    args, from the output of python -X importtime
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "pyappimage.cli", *args],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert process.returncode == 0, process.stderr
+    modules = set()
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:") and line.count("|") == 2:
+            modules.add(line.rsplit("|", 1)[1].strip().split(".")[0])
+    return modules
+
+
+def test_version_imports():
+    pytest.importorskip("click")
+    modules = get_imported_modules("--version")
+    assert "pyappimage" in modules
+    assert modules.isdisjoint(HEAVY_MODULES), modules & set(HEAVY_MODULES)
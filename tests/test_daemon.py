@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+from pyappimage.daemon import fork, get_returncode, get_socket_path, request_build
+
+
+def _exit(code):
+    sys.exit(code)
+
+
+def _fail():
+    raise ValueError("build failed")
+
+
+def _set_environ():
+    os.environ["PYAPPIMAGE_TEST_LEAK"] = "1"
+
+
+@pytest.mark.parametrize(
+    "function, args, returncode",
+    [(_set_environ, (), 0), (_exit, (3,), 3), (_fail, (), 1)],
+)
+def test_fork(function, args, returncode):
+    _, status = os.waitpid(fork(function, *args), 0)
+    assert get_returncode(status) == returncode
+    assert "PYAPPIMAGE_TEST_LEAK" not in os.environ
+
+
+def test_socket_path(monkeypatch):
+    monkeypatch.delenv("PYAPPIMAGE_DAEMON_SOCKET", raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.delenv("PYAPPIMAGE_CACHE_DIR", raising=False)
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    monkeypatch.setenv("HOME", "/home/someuser")
+    path = get_socket_path()
+    assert path.startswith("/home/someuser/")
+    # the limit of sun_path is 108 bytes, including the terminating null
+    assert len(path) < 64
+
+
+def test_request_build_without_daemon(tmp_path):
+    assert request_build({}, socket_path=str(tmp_path / "missing.sock")) is None
+    # longer than the kernel accepts for a Unix socket
+    assert request_build({}, socket_path="/tmp/" + "x" * 200) is None
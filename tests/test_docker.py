@@ -0,0 +1,21 @@
+from pyappimage.build.docker import get_requirements, hash_dependencies
+from pyappimage.version import __requirements__
+
+
+def test_requirements():
+    requirements = get_requirements()
+    assert [i.split("==")[0] for i in requirements] == list(__requirements__)
+    # installed here, so pinned to the version of the host
+    assert any(i.startswith("pyyaml==") for i in requirements)
+
+
+def test_dependency_hash(tmp_path, monkeypatch):
+    (tmp_path / "requirements.txt").write_text("requests\n")
+    first = hash_dependencies("sha256:1", str(tmp_path))
+    assert hash_dependencies("sha256:1", str(tmp_path)) == first
+    assert hash_dependencies("sha256:2", str(tmp_path)) != first
+    assert hash_dependencies("sha256:1", str(tmp_path), ["numpy"]) != first
+    monkeypatch.setattr(
+        "pyappimage.build.docker.get_requirements", lambda: ["PyInstaller==4.0"]
+    )
+    assert hash_dependencies("sha256:1", str(tmp_path)) != first
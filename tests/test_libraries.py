@@ -0,0 +1,184 @@
+import os
+import struct
+
+import pytest
+
+from pyappimage.build.libraries import (
+    exclude_libraries,
+    find_unresolved,
+    get_excludelist,
+    get_library_path,
+    is_collected_by_pyinstaller,
+    _is_excluded,
+)
+
+
+def write_elf(path, soname=None, needed=(), runpath=None):
+    """
+    Writes a 64 bit ELF file with only a dynamic section, which is all
+    that the library scan reads
+    """
+    dynstr = b"\0"
+    entries = []
+
+    def _add(tag, string):
+        nonlocal dynstr
+        entries.append((tag, len(dynstr)))
+        dynstr += string.encode() + b"\0"
+
+    if soname is not None:
+        _add(14, soname)
+    for name in needed:
+        _add(1, name)
+    if runpath is not None:
+        _add(29, runpath)
+    dynamic = b"".join(struct.pack("<qQ", *i) for i in entries + [(0, 0)])
+    shstrtab = b"\0.dynstr\0.dynamic\0.shstrtab\0"
+    dynstr_offset = 64
+    dynamic_offset = dynstr_offset + len(dynstr)
+    shstrtab_offset = dynamic_offset + len(dynamic)
+    shoff = shstrtab_offset + len(shstrtab)
+    header = b"\x7fELF\x02\x01\x01" + b"\0" * 9 + struct.pack(
+        "<HHIQQQIHHHHHH", 3, 62, 1, 0, 0, shoff, 0, 64, 0, 0, 64, 4, 3
+    )
+    sections = [
+        (0, 0, 0, 0, 0),
+        (1, 3, dynstr_offset, len(dynstr), 0),
+        (9, 6, dynamic_offset, len(dynamic), 1),
+        (18, 3, shstrtab_offset, len(shstrtab), 0),
+    ]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(
+        header
+        + dynstr
+        + dynamic
+        + shstrtab
+        + b"".join(
+            struct.pack(
+                "<IIQQQQIIQQ", name, kind, 0, 0, offset, size, link, 0, 1, 0
+            )
+            for name, kind, offset, size, link in sections
+        )
+    )
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    directory = tmp_path / "app"
+    write_elf(directory / "app", needed=["libpython3.so", "libc.so.6"])
+    write_elf(
+        directory / "libpython3.so", soname="libpython3.so", needed=["libc.so.6"]
+    )
+    write_elf(
+        directory / "lib-dynload" / "_tkinter.so",
+        needed=["libtk8.6.so", "libX11.so.6", "libc.so.6"],
+    )
+    write_elf(
+        directory / "libtk8.6.so", soname="libtk8.6.so", needed=["libX11.so.6"]
+    )
+    write_elf(
+        directory / "libX11.so.6",
+        soname="libX11.so.6",
+        needed=["libxcb.so.1", "libXau.so.6"],
+    )
+    write_elf(directory / "libGL.so.1", soname="libGL.so.1")
+    return directory
+
+
+def test_default_excludelist():
+    excludelist = get_excludelist()
+    for name in ("libc.so.6", "ld-linux-x86-64.so.2", "libnss_dns.so.2"):
+        assert _is_excluded(name, excludelist)
+    for name in ("libGL.so.1", "libEGL.so.1", "libdrm.so.2"):
+        assert _is_excluded(name, excludelist)
+    for name in ("libX11.so.6", "libxcb.so.1", "libfontconfig.so.1", "libz.so.1"):
+        assert not _is_excluded(name, excludelist)
+
+
+def test_desktop_excludelist():
+    excludelist = get_excludelist(["desktop", "!libz.so.1", "libwayland-*.so.0"])
+    for name in ("libX11.so.6", "libexpat.so.1", "libwayland-egl.so.0"):
+        assert _is_excluded(name, excludelist)
+    assert not _is_excluded("libz.so.1", excludelist)
+
+
+def test_exclude_libraries(bundle):
+    report = exclude_libraries(str(bundle))
+    assert [os.path.basename(i) for i in report.paths] == ["libGL.so.1"]
+    assert (bundle / "libX11.so.6").exists()
+
+
+def test_find_unresolved(bundle):
+    # libXau is neither bundled nor provided by the host by default
+    assert find_unresolved(str(bundle)) == [("libX11.so.6", "libXau.so.6")]
+    exclude_libraries(str(bundle), ["desktop"])
+    assert not (bundle / "libX11.so.6").exists()
+    assert find_unresolved(str(bundle), ["desktop"]) == []
+
+
+def test_libraries_pyinstaller_does_not_collect(tmp_path):
+    write_elf(
+        tmp_path / "_crypt.so",
+        needed=["libcrypt.so.1", "libcidn.so.1", "libxcb.so.1", "libc.so.6"],
+    )
+    assert find_unresolved(str(tmp_path)) == []
+    # they are left for PyInstaller to decide, not removed
+    assert not is_collected_by_pyinstaller("libxcb.so.1")
+    assert not _is_excluded("libxcb.so.1", get_excludelist())
+
+
+@pytest.fixture
+def nested_bundle(tmp_path):
+    directory = tmp_path / "app"
+    write_elf(directory / "app", needed=["libpython3.so", "libc.so.6"])
+    write_elf(directory / "libpython3.so", soname="libpython3.so")
+    # found on the RUNPATH of the file needing it
+    write_elf(
+        directory / "PyQt5" / "QtCore.so",
+        needed=["libQt5Core.so.5", "libicu.so.66"],
+        runpath="$ORIGIN/Qt/lib",
+    )
+    write_elf(
+        directory / "PyQt5" / "Qt" / "lib" / "libQt5Core.so.5",
+        needed=["libicu.so.66"],
+        runpath="$ORIGIN:/opt/qt/lib",
+    )
+    write_elf(directory / "PyQt5" / "Qt" / "lib" / "libicu.so.66")
+    # only found on the library path
+    for extension in ("_multiarray.so", "_umath.so"):
+        write_elf(
+            directory / "numpy" / "core" / extension, needed=["libopenblas.so.0"]
+        )
+    write_elf(
+        directory / "numpy.libs" / "libopenblas.so.0", needed=["libgfortran.so.5"]
+    )
+    write_elf(directory / "scipy.libs" / "libgfortran.so.5")
+    return directory
+
+
+def test_get_library_path(nested_bundle):
+    # ordered by the number of libraries found, after the executable's
+    assert get_library_path(str(nested_bundle)) == [
+        ".",
+        "numpy.libs",
+        "scipy.libs",
+    ]
+
+
+def test_get_library_path_resolves(nested_bundle):
+    library_path = get_library_path(str(nested_bundle))
+    assert find_unresolved(str(nested_bundle), library_path=library_path) == []
+    # the bootloader only adds the directory of the executable
+    assert find_unresolved(str(nested_bundle)) == [
+        ("numpy.libs/libopenblas.so.0", "libgfortran.so.5"),
+        ("numpy/core/_multiarray.so", "libopenblas.so.0"),
+        ("numpy/core/_umath.so", "libopenblas.so.0"),
+    ]
+
+
+def test_get_library_path_host_libraries(nested_bundle):
+    # excluded libraries are loaded from the host, not the bundle
+    assert get_library_path(str(nested_bundle), ["libgfortran.so.5"]) == [
+        ".",
+        "numpy.libs",
+    ]
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+from pyappimage.matrix import resolve_interpreters
+
+TAG = "py{}.{}".format(*sys.version_info[:2])
+
+
+def test_names_of_one_interpreter(tmp_path):
+    for name in ("python3", "python-latest"):
+        (tmp_path / name).symlink_to(sys.executable)
+    assert resolve_interpreters(
+        [str(tmp_path / "python3"), str(tmp_path / "python-latest")]
+    ) == [(str(tmp_path / "python3"), TAG)]
+
+
+def test_interpreters_of_one_version(tmp_path):
+    (tmp_path / "python3").symlink_to(sys.executable)
+    wrapper = tmp_path / "python-wrapper"
+    wrapper.write_text('#!/bin/sh\nexec {} "$@"\n'.format(sys.executable))
+    os.chmod(str(wrapper), 0o755)
+    with pytest.raises(ValueError, match="same directories"):
+        resolve_interpreters([str(tmp_path / "python3"), str(wrapper)])
+
+
+def test_missing_interpreter(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        resolve_interpreters([str(tmp_path / "python2")])
@@ -0,0 +1,43 @@
+import pytest
+import yaml
+
+from pyappimage.project import set_config_key
+
+CONFIG = """\
+# the app
+name: app  # its name
+entrypoint: app:main
+exclude-module:
+  - tkinter  # never used
+
+# built with
+categories:
+  - Utility
+"""
+
+
+def test_set_config_key_keeps_the_rest_of_the_file(tmp_path):
+    path = tmp_path / "pyappimage.yml"
+    path.write_text(CONFIG)
+    assert set_config_key(str(path), "exclude-module", ["tkinter", "IPython"])
+    assert path.read_text() == CONFIG.replace(
+        "  - tkinter  # never used\n", "- tkinter\n- IPython\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        "name: app\nentrypoint: app:main\n",
+        "name: app\nentrypoint: app:main",
+        "name: app\nexclude-module: [tkinter]\nentrypoint: app:main\n",
+        "name: app\nexclude-module: tkinter\n",
+    ],
+)
+def test_set_config_key(tmp_path, config):
+    path = tmp_path / "pyappimage.yml"
+    path.write_text(config)
+    assert set_config_key(str(path), "exclude-module", ["IPython"])
+    data = yaml.safe_load(path.read_text())
+    assert data == dict(yaml.safe_load(config), **{"exclude-module": ["IPython"]})
+    assert path.read_text().startswith("name: app\n")
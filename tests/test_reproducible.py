@@ -0,0 +1,34 @@
+import os
+
+from pyappimage.build.reproducible import keep_source_date_epoch
+
+
+@keep_source_date_epoch()
+def build(epoch):
+    os.environ["SOURCE_DATE_EPOCH"] = epoch
+
+
+def test_unset_epoch_is_removed(monkeypatch):
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    build("1")
+    assert "SOURCE_DATE_EPOCH" not in os.environ
+
+
+def test_epoch_is_restored(monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "100")
+    build("1")
+    assert os.environ["SOURCE_DATE_EPOCH"] == "100"
+    # a second call works too, the decorator makes a new context each time
+    build("2")
+    assert os.environ["SOURCE_DATE_EPOCH"] == "100"
+
+
+def test_epoch_is_restored_on_failure(monkeypatch):
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    try:
+        with keep_source_date_epoch():
+            os.environ["SOURCE_DATE_EPOCH"] = "1"
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert "SOURCE_DATE_EPOCH" not in os.environ
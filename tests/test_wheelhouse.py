@@ -0,0 +1,44 @@
+import pytest
+
+from pyappimage.build.wheelhouse import (
+    BUILD_REQUIREMENTS,
+    _parse_build_requires,
+    get_build_requirements,
+)
+
+PYPROJECT = """\
+[project]
+name = "app"
+requires = ["not-a-build-requirement"]
+
+[build-system]
+requires = [
+    "hatchling>=1.18",  # the backend
+    'hatch-vcs',
+]
+build-backend = "hatchling.build"
+
+[tool.hatch.version]
+source = "vcs"
+"""
+
+
+def test_build_requirements_of_pyproject(tmp_path):
+    (tmp_path / "pyproject.toml").write_text(PYPROJECT)
+    assert get_build_requirements(str(tmp_path)) == list(BUILD_REQUIREMENTS) + [
+        "hatchling>=1.18",
+        "hatch-vcs",
+    ]
+
+
+@pytest.mark.parametrize("pyproject", [None, '[tool.black]\nline-length = 88\n'])
+def test_build_requirements_default_to_setuptools(tmp_path, pyproject):
+    (tmp_path / "setup.py").write_text("")
+    if pyproject is not None:
+        (tmp_path / "pyproject.toml").write_text(pyproject)
+    assert get_build_requirements(str(tmp_path)) == list(BUILD_REQUIREMENTS)
+
+
+def test_parse_build_requires():
+    assert _parse_build_requires(PYPROJECT) == ["hatchling>=1.18", "hatch-vcs"]
+    assert _parse_build_requires("[tool.black]\nline-length = 88\n") is None
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from pyappimage.build.zsync import make_zsync, plan_update, rolling_sums, rsum
+
+BLOCK_SIZE = 2048
+BLOCKS = 8
+
+
+def random_bytes(seed, length):
+    generator = random.Random(seed)
+    return bytes(generator.getrandbits(8) for _ in range(length))
+
+
+@pytest.fixture
+def release(tmp_path):
+    data = random_bytes(0, BLOCKS * BLOCK_SIZE + 100)
+    path = tmp_path / "app.AppImage"
+    path.write_bytes(data)
+    zsync_file = make_zsync(str(path), block_size=BLOCK_SIZE, jobs=1)
+    return data, zsync_file
+
+
+def test_rolling_sums():
+    data = random_bytes(1, 3 * BLOCK_SIZE)
+    assert list(rolling_sums(data, BLOCK_SIZE)) == [
+        rsum(data[i : i + BLOCK_SIZE])
+        for i in range(len(data) - BLOCK_SIZE + 1)
+    ]
+
+
+def test_plan_same_file(tmp_path, release):
+    data, zsync_file = release
+    seed = tmp_path / "seed"
+    seed.write_bytes(data)
+    assert plan_update(zsync_file, str(seed)) == (BLOCKS + 1, BLOCKS + 1, 0, [])
+
+
+def test_plan_changed_block(tmp_path, release):
+    data, zsync_file = release
+    changed = bytearray(data)
+    changed[3 * BLOCK_SIZE + 10] ^= 0xFF
+    seed = tmp_path / "seed"
+    seed.write_bytes(changed)
+    assert plan_update(zsync_file, str(seed)) == (
+        BLOCKS + 1,
+        BLOCKS,
+        BLOCK_SIZE,
+        [(3 * BLOCK_SIZE, 4 * BLOCK_SIZE)],
+    )
+
+
+def test_plan_shifted_blocks(tmp_path, release):
+    data, zsync_file = release
+    # bytes inserted inside block 2 move every later block off alignment
+    seed = tmp_path / "seed"
+    seed.write_bytes(
+        data[: 2 * BLOCK_SIZE + 5] + b"inserted" + data[2 * BLOCK_SIZE + 5 :]
+    )
+    assert plan_update(zsync_file, str(seed))[3] == [
+        (2 * BLOCK_SIZE, 3 * BLOCK_SIZE)
+    ]